@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-frame decode cost of decode_frame()
+
+Usage: python benchmarks/bench_decode.py [number_of_frames]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_frames():
+    tunnelling_request = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2).frame
+    tunnelling_ack = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0).frame
+    connection_request = create_frame(ServiceTypeDescriptor.CONNECTION_REQUEST,
+                                      ('127.0.0.1', 3671), ('10.11.12.13', 3672)).frame
+    return [('tunnelling_request', tunnelling_request),
+            ('tunnelling_ack', tunnelling_ack),
+            ('connection_request', connection_request)]
+
+
+def bench(frame, number):
+    timer = timeit.Timer(lambda: decode_frame(frame))
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main(number):
+    print('{:<25}{:<12}{:>12}'.format('frame', 'buffer', 'ns/frame'))
+    for name, frame in sample_frames():
+        for buffer_name, buffer in (('bytearray', bytearray(frame)),
+                                    ('bytes', bytes(frame)),
+                                    ('memoryview', memoryview(bytes(frame)))):
+            try:
+                cost = bench(buffer, number)
+            except Exception as e:
+                print('{:<25}{:<12}{:>12}'.format(name, buffer_name, type(e).__name__))
+                continue
+            print('{:<25}{:<12}{:>12.0f}'.format(name, buffer_name, cost * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-frame cost of decode_frames() (columnar, numpy) against a decode_frame() loop, and of the
+DPT 9 array codec against a decode() loop
+
+Usage: python benchmarks/bench_decode_frames.py [number_of_frames]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+from knxnet.knxnet import numpy
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_archive(number):
+    frames = []
+    for i in range(number):
+        group = '{0}/{1}/{2}'.format(i % 32, (i >> 5) % 8, (i >> 8) % 256)
+        frames.append(bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, group, 0x07,
+                                         i & 0xff, 2, 0x2, 0x29, i & 0xff).frame))
+    return frames
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(number):
+    frames = sample_archive(number)
+    archive = b''.join(frames)
+    print('{:<35}{:>12}'.format('method', 'ns/frame'))
+    cost = min(timed(lambda: [decode_frame(frame) for frame in frames]) for _ in range(3))
+    print('{:<35}{:>12.0f}'.format('decode_frame loop', cost / number * 1e9))
+    cost = min(timed(lambda: decode_frames(frames)) for _ in range(3))
+    print('{:<35}{:>12.0f}'.format('decode_frames(list of datagrams)', cost / number * 1e9))
+    cost = min(timed(lambda: decode_frames(archive)) for _ in range(3))
+    print('{:<35}{:>12.0f}'.format('decode_frames(concatenated)', cost / number * 1e9))
+
+    dpt = DEFAULT_REGISTRY.get('9')
+    raw = [int(data) for data in decode_frames(archive).data]
+    raw_array = numpy.array(raw, dtype=numpy.uint32)
+    cost = min(timed(lambda: [dpt.decode(data) for data in raw]) for _ in range(3))
+    print('{:<35}{:>12.0f}'.format('DPT 9 decode loop', cost / number * 1e9))
+    cost = min(timed(lambda: dpt.decode_array(raw_array)) for _ in range(3))
+    print('{:<35}{:>12.0f}'.format('DPT 9 decode_array', cost / number * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-frame cost of the Dispatcher against decoding every frame and checking every subscriber
+
+200 subscribers (exact group addresses and a few ranges) over a 3000 group addresses installation.
+
+Usage: python benchmarks/bench_dispatch.py [number_of_frames]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+from knxnet.dispatch import Dispatcher
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+SUBSCRIBERS = 200
+GROUP_ADDRESSES = 3000
+
+
+def installation(seed=1):
+    rand = random.Random(seed)
+    groups = [GroupAddress.from_int(value) for value in rand.sample(range(1, 0x7fff), GROUP_ADDRESSES)]
+    patterns = [str(group) for group in rand.sample(groups, SUBSCRIBERS - 4)] + ['1/2/*', '3/*', '7/0/*', '*']
+    return groups, patterns
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def linear(frames, patterns):
+    """
+    Decode everything, then check every subscriber
+    """
+    subscribers = []
+    for pattern in patterns:
+        parts = [None if part == '*' else int(part) for part in pattern.split('/')]
+        subscribers.append(((parts + [None, None, None])[:3], lambda request: None))
+
+    def run():
+        for frame in frames:
+            request = decode_frame(frame)
+            group = request.dest_addr_group
+            components = (group.main_group, group.middle_group, group.sub_group)
+            for (main_group, middle_group, sub_group), handler in subscribers:
+                if ((main_group is None or main_group == components[0]) and
+                        (middle_group is None or middle_group == components[1]) and
+                        (sub_group is None or sub_group == components[2])):
+                    handler(request)
+    return run
+
+
+def indexed(frames, patterns, lazy=False):
+    dispatcher = Dispatcher(lazy)
+    for pattern in patterns:
+        dispatcher.subscribe(pattern, lambda request: None)
+
+    def run():
+        dispatch = dispatcher.dispatch
+        for frame in frames:
+            dispatch(frame)
+    return run
+
+
+def main(number):
+    groups, patterns = installation()
+    rand = random.Random(2)
+    frames = [bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, rand.choice(groups), 0x07,
+                                 i & 0xff, 2, 0x2, 0x29).frame) for i in range(number)]
+    patterns_without_wildcard = patterns[:-1]
+    print('{:<55}{:>12}'.format('method', 'ns/frame'))
+    for name, subscriptions in (('with a wildcard subscriber', patterns),
+                                ('without wildcard subscriber', patterns_without_wildcard)):
+        for method, run in (('decode + linear check', linear(frames, subscriptions)),
+                            ('Dispatcher', indexed(frames, subscriptions)),
+                            ('Dispatcher(lazy=True)', indexed(frames, subscriptions, True))):
+            cost = min(timed(run) for _ in range(3))
+            print('{:<55}{:>12.0f}'.format(method + ', ' + name, cost / number * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
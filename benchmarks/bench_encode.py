@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Per-frame encode cost of the .frame property and of encode_into()
+
+Usage: python benchmarks/bench_encode.py [number_of_frames]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_frames():
+    return [('tunnelling_request', create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2)),
+            ('tunnelling_ack', create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0)),
+            ('connection_request', create_frame(ServiceTypeDescriptor.CONNECTION_REQUEST,
+                                                ('127.0.0.1', 3671), ('10.11.12.13', 3672)))]
+
+
+def bench(function, number):
+    timer = timeit.Timer(function)
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main(number):
+    print('{:<25}{:<14}{:>12}'.format('frame', 'method', 'ns/frame'))
+    buffer = bytearray(64)
+    for name, knxnet_frame in sample_frames():
+        print('{:<25}{:<14}{:>12.0f}'.format(name, 'frame', bench(lambda: knxnet_frame.frame, number) * 1e9))
+        if hasattr(knxnet_frame, 'encode_into'):
+            cost = bench(lambda: knxnet_frame.encode_into(buffer, 0), number)
+            print('{:<25}{:<14}{:>12.0f}'.format(name, 'encode_into', cost * 1e9))
+    cost = bench(lambda: create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2).frame, number)
+    print('{:<25}{:<14}{:>12.0f}'.format('tunnelling_request', 'create_frame', cost * 1e9))
+    if 'TunnellingRequestCache' in globals():
+        cache = TunnellingRequestCache()
+        cost = bench(lambda: cache.frame('1/4/10', 0x07, 0xab, 2), number)
+        print('{:<25}{:<14}{:>12.0f}'.format('tunnelling_request', 'template', cost * 1e9))
+        template = cache.get('1/4/10', 0x07, 2)
+        cost = bench(lambda: template.encode_into(buffer, 0, 0xab, 0x01), number)
+        print('{:<25}{:<14}{:>12.0f}'.format('tunnelling_request', 'template_into', cost * 1e9))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Load test of concurrent tunnel clients against the local gateway emulator:
+throughput and round trip time percentiles
+
+Usage: python benchmarks/bench_gateway.py [clients] [telegrams_per_client] [window_size] [ack_delay] [loss_rate]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.gateway import GatewayEmulator
+from knxnet.tunnel import TunnelClient
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def run(clients, telegrams, window_size, ack_delay, loss_rate):
+    gateway = await GatewayEmulator.start(tunnel_slots=clients, ack_delay=ack_delay, loss_rate=loss_rate,
+                                          confirm=False, seed=0)
+    tunnels = [await TunnelClient.connect(gateway.addr, window_size=window_size, ack_timeout=0.2, retries=20)
+               for _ in range(clients)]
+    start = time.perf_counter()
+    results = await asyncio.gather(*[
+        tunnel.write_many([('{0}/0/{1}'.format(i % 32, j % 256), j & 0xff, 2) for j in range(telegrams)])
+        for i, tunnel in enumerate(tunnels)])
+    elapsed = time.perf_counter() - start
+    for tunnel in tunnels:
+        await tunnel.disconnect()
+    gateway.close()
+    round_trip_times = [rtt for result in results for rtt in result]
+    print('{:<25}{:>12}'.format('clients', clients))
+    print('{:<25}{:>12}'.format('telegrams', len(round_trip_times)))
+    print('{:<25}{:>12.0f}'.format('telegrams/s', len(round_trip_times) / elapsed))
+    for p in (50, 90, 99, 100):
+        print('{:<25}{:>12.2f}'.format('rtt p{0} (ms)'.format(p), percentile(round_trip_times, p) * 1e3))
+    print('{:<25}{:>12}'.format('dropped', gateway.dropped_requests))
+    print('{:<25}{:>12}'.format('out of sequence', gateway.discarded_requests))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    asyncio.run(run(int(args[0]) if len(args) > 0 else 16,
+                    int(args[1]) if len(args) > 1 else 500,
+                    int(args[2]) if len(args) > 2 else 1,
+                    float(args[3]) if len(args) > 3 else 0.0,
+                    float(args[4]) if len(args) > 4 else 0.0))
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Scaling of decode_frames_parallel() with the number of worker processes
+
+Decodes one archive of concatenated tunnelling requests with decode_frames(), then with
+decode_frames_parallel() for 1, 2, 4... workers up to the number of CPUs, and prints the time,
+the throughput and the speedup over decode_frames().
+
+Usage: python benchmarks/bench_parallel_decode.py [number_of_frames] [max_workers]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+from knxnet.parallel import decode_frames_parallel
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_archive(number):
+    frames = [bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                                 '{0}/{1}/{2}'.format(i % 32, (i >> 5) % 8, (i >> 8) % 256), 0x07,
+                                 i & 0xff, 2, 0x2, 0x29, i & 0xff).frame) for i in range(min(number, 65536))]
+    return b''.join(frames[i % len(frames)] for i in range(number))
+
+
+def timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main(number, max_workers):
+    archive = sample_archive(number)
+    print('{0} frames, {1:.1f} MB, {2} CPUs'.format(number, len(archive) / 1e6, os.cpu_count()))
+    print('{:<25}{:>10}{:>16}{:>10}'.format('method', 'seconds', 'frames/s', 'speedup'))
+    reference = min(timed(lambda: decode_frames(archive)) for _ in range(3))
+    print('{:<25}{:>10.3f}{:>16.0f}{:>10.2f}'.format('decode_frames', reference, number / reference, 1.0))
+    workers = 1
+    while workers <= max_workers:
+        with ProcessPoolExecutor(workers) as executor:
+            decode_frames_parallel(archive, executor=executor, chunks=workers)  # start the processes
+            cost = min(timed(lambda: decode_frames_parallel(archive, workers=workers, executor=executor))
+                       for _ in range(3))
+        print('{:<25}{:>10.3f}{:>16.0f}{:>10.2f}'.format('parallel, {0} workers'.format(workers), cost,
+                                                         number / cost, reference / cost))
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Replay of the group telegrams of a capture file against a gateway, or the local gateway emulator:
+throughput, ack latency percentiles, drops and schedule lag
+
+Usage: python benchmarks/bench_replay.py capture [speed|max] [gateway_ip:port] [window_size]
+The capture is a knxnet.capture file, or a pcap/pcapng file (.pcap, .pcapng, .cap extensions).
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.capture import CaptureReader
+from knxnet.gateway import GatewayEmulator
+from knxnet.pcap import PcapReader
+from knxnet.replay import Replayer, MAX_SPEED
+from knxnet.tunnel import TunnelClient
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+async def run(path, speed, gateway_addr, window_size):
+    gateway = None
+    if gateway_addr is None:
+        gateway = await GatewayEmulator.start(confirm=False)
+        gateway_addr = gateway.addr
+    client = await TunnelClient.connect(gateway_addr, window_size=window_size)
+    try:
+        if os.path.splitext(path)[1].lower() in ('.pcap', '.pcapng', '.cap'):
+            with PcapReader(path) as capture:
+                report = await Replayer(client, speed).replay(capture.decoded(lazy=True))
+        else:
+            with CaptureReader(path) as capture:
+                report = await Replayer(client, speed).replay(capture.records())
+    finally:
+        await client.disconnect()
+    print(report, end='')
+    if gateway is not None:
+        gateway.close()
+        print('{:<25}{:>12}'.format('emulator dropped', gateway.dropped_requests))
+        print('{:<25}{:>12}'.format('out of sequence', gateway.discarded_requests))
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    gateway = None
+    if len(args) > 2:
+        ip, port = args[2].rsplit(':', 1)
+        gateway = (ip, int(port))
+    asyncio.run(run(args[0],
+                    MAX_SPEED if len(args) < 2 or args[1] == 'max' else float(args[1]),
+                    gateway,
+                    int(args[3]) if len(args) > 3 else 1))
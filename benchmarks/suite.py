@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Micro-benchmark suite of the encode/decode hot paths
+
+Measures create_frame() and decode_frame() for every ServiceTypeDescriptor, and the address,
+HPAI and datapoint type codecs, and the process image: time per call, calls per second and peak memory allocated by one call.
+
+Usage:
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --baseline results.json --threshold 10
+
+With --baseline, exits with status 1 if a benchmark is more than --threshold percent slower
+than in the baseline results.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from knxnet.knxnet import *
+from knxnet.image import ProcessImage
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+# create_frame() parameters of each service type
+FRAME_DATA = {
+    ServiceTypeDescriptor.CONNECTION_REQUEST: (('127.0.0.1', 3671), ('10.11.12.13', 3672)),
+    ServiceTypeDescriptor.CONNECTION_RESPONSE: (0x07, 0x00, ('10.11.12.13', 3672)),
+    ServiceTypeDescriptor.CONNECTION_STATE_REQUEST: (0x07, ('127.0.0.1', 3671)),
+    ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE: (0x07, 0x00),
+    ServiceTypeDescriptor.DISCONNECT_REQUEST: (0x07, ('127.0.0.1', 3671)),
+    ServiceTypeDescriptor.DISCONNECT_RESPONSE: (0x07, 0x00),
+    ServiceTypeDescriptor.TUNNELLING_REQUEST: ('1/4/10', 0x07, 0xab, 2),
+    ServiceTypeDescriptor.TUNNELLING_ACK: (0x07, 0x00),
+    ServiceTypeDescriptor.ROUTING_INDICATION: ('1/4/10', 0xab, 2),
+    ServiceTypeDescriptor.ROUTING_LOST_MESSAGE: (3,),
+    ServiceTypeDescriptor.ROUTING_BUSY: (100,),
+}
+
+
+def benchmarks():
+    """
+    :return: list of (name, callable)
+    """
+    out = []
+    for service_type_descriptor, data in sorted(FRAME_DATA.items(), key=lambda item: item[0].value):
+        name = service_type_descriptor.name.lower()
+        frame = bytes(create_frame(service_type_descriptor, *data).frame)
+        out.append(('create_frame/' + name,
+                    lambda s=service_type_descriptor, d=data: create_frame(s, *d).frame))
+        out.append(('decode_frame/' + name, lambda f=frame: decode_frame(f)))
+    frame = bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                               *FRAME_DATA[ServiceTypeDescriptor.TUNNELLING_REQUEST]).frame)
+    out.append(('decode_frame_lazy/dest_addr_group',
+                lambda: decode_frame(frame, lazy=True).dest_addr_group))
+    hpai = Hpai.from_data('10.11.12.13', 3672)
+    hpai_frame = bytes(hpai.frame)
+    out += [('group_address/from_str', lambda: GroupAddress.from_str('1/4/10')),
+            ('group_address/from_bytes', lambda: GroupAddress.from_bytes(b'\x0c\x0a')),
+            ('individual_address/from_str', lambda: IndividualAddress.from_str('5.12.7')),
+            ('hpai/from_frame', lambda: Hpai.from_frame(hpai_frame)),
+            ('hpai/frame', lambda: hpai.frame)]
+    for dpt_id, value in (('1', True), ('5.001', 42.0), ('9', 21.5), ('14', 1234.5), ('232', (255, 128, 0))):
+        dpt = DEFAULT_REGISTRY.get(dpt_id)
+        data = dpt.encode(value)
+        out += [('dpt/encode/' + dpt_id, lambda d=dpt, v=value: d.encode(v)),
+                ('dpt/decode/' + dpt_id, lambda d=dpt, r=data: d.decode(r))]
+    image = ProcessImage()
+    request = decode_frame(frame)
+    image.update(request)
+    out += [('process_image/update', lambda: image.update(request)),
+            ('process_image/read', lambda: image.read(request.dest_addr_group))]
+    return out
+
+
+def measure(function, number, repeat):
+    ns_per_op = min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e9
+    function()  # warm up caches before measuring the allocations of one call
+    tracemalloc.start()  # fresh traces and peak: stop() clears them (no reset_peak() before Python 3.9)
+    try:
+        current, _ = tracemalloc.get_traced_memory()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'ns_per_op': ns_per_op, 'ops_per_s': 1e9 / ns_per_op, 'peak_bytes': peak - current}
+
+
+def run(number, repeat, name_filter=None):
+    results = {}
+    for name, function in benchmarks():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(function, number, repeat)
+    return results
+
+
+def regressions(results, baseline, threshold):
+    """
+    :param threshold: allowed slow down, in percent
+    :return: list of (name, baseline ns/op, ns/op, slow down in percent) over the threshold
+    """
+    out = []
+    for name, result in sorted(results.items()):
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        slow_down = (result['ns_per_op'] / reference['ns_per_op'] - 1) * 100
+        if slow_down > threshold:
+            out.append((name, reference['ns_per_op'], result['ns_per_op'], slow_down))
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='knxnet encode/decode micro-benchmarks')
+    parser.add_argument('--number', type=int, default=5000, help='calls per timing')
+    parser.add_argument('--repeat', type=int, default=7, help='timings per benchmark, the best one is kept')
+    parser.add_argument('--filter', help='only run the benchmarks whose name contains this string')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--threshold', type=float, default=10.0, help='allowed slow down in percent')
+    args = parser.parse_args(argv)
+
+    results = run(args.number, args.repeat, args.filter)
+    print('{:<45}{:>12}{:>14}{:>12}'.format('benchmark', 'ns/op', 'ops/s', 'peak bytes'))
+    for name, result in sorted(results.items()):
+        print('{:<45}{:>12.0f}{:>14.0f}{:>12}'.format(name, result['ns_per_op'], result['ops_per_s'],
+                                                       result['peak_bytes']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'results': results}, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        slow = regressions(results, baseline, args.threshold)
+        for name, reference, ns_per_op, slow_down in slow:
+            print('REGRESSION {0}: {1:.0f} -> {2:.0f} ns/op (+{3:.1f}%)'.format(name, reference, ns_per_op,
+                                                                                slow_down))
+        if slow:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,2 +1,16 @@
 from knxnet import knxnet
-from knxnet import utils
\ No newline at end of file
+from knxnet import utils
+from knxnet import dpt
+from knxnet import tunnel
+from knxnet import gateway
+from knxnet import dispatch
+from knxnet import routing
+from knxnet import image
+from knxnet import pool
+from knxnet import scheduler
+from knxnet import dedup
+from knxnet import parallel
+from knxnet import capture
+from knxnet import pcap
+from knxnet import replay
+from knxnet import metrics
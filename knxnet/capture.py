@@ -0,0 +1,392 @@
+# -*- coding: utf-8 -*-
+
+"""
+Append-only binary capture of raw KNXnet/IP datagrams
+
+File layout, big endian:
+
+    file header   magic 'KNXCAPT\\0', version (H)
+    records       type (B), direction (B), tunnel (H), timestamp in seconds (d), length (I), payload
+                  FRAME records hold one datagram. Every index_interval frames, an INDEX record
+                  describes the frames since the previous one: first and last timestamp (d, d),
+                  offset of their first record (Q), offset of the previous INDEX record (Q),
+                  number of frames (I), number of destination group addresses (I) and the sorted
+                  packed group addresses (H each)
+    footer        FOOTER record written by close(): offset of the last INDEX record (Q), 'KNXCAPTE'
+
+The reader maps the file and loads the chain of INDEX records from the footer, so seeking a time
+range or a group address only walks the frames of the matching index blocks. The frames are
+memoryviews of the mapped file, ready for decode_frame():
+
+    with CaptureWriter('bus.knxcap') as capture:
+        capture.write(datagram, RECEIVED, tunnel=channel_id)
+    with CaptureReader('bus.knxcap') as capture:
+        for timestamp, direction, tunnel, frame in capture.records(start, stop, '1/4/10'):
+            request = decode_frame(frame)
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from knxnet.knxnet import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+MAGIC = b'KNXCAPT\x00'
+FOOTER_MAGIC = b'KNXCAPTE'
+VERSION = 1
+
+# directions
+RECEIVED = 0
+SENT = 1
+
+# record types
+FRAME = 0x01
+INDEX = 0x02
+FOOTER = 0x03
+
+_FILE_HEADER = struct.Struct('>8sH')
+_RECORD = struct.Struct('>BBHdI')
+_INDEX = struct.Struct('>ddQQII')
+_FOOTER = struct.Struct('>Q8s')
+_FOOTER_SIZE = _RECORD.size + _FOOTER.size
+
+
+class _IndexBlock():
+    def __init__(self, first_timestamp, last_timestamp, first_record, count, groups):
+        self.first_timestamp = first_timestamp
+        self.last_timestamp = last_timestamp
+        self.first_record = first_record  # offset of the first FRAME record
+        self.count = count
+        self.groups = groups  # sorted array('H') of the destination group addresses
+
+    def has_group(self, group):
+        i = bisect.bisect_left(self.groups, group)
+        return i < len(self.groups) and self.groups[i] == group
+
+
+def _walk(buf, offset, end):
+    """
+    Iterate over the complete records of buf[offset:end]
+    :return: iterator of (offset, record type, direction, tunnel, timestamp, payload offset, payload length)
+    """
+    while offset + _RECORD.size <= end:
+        record_type, direction, tunnel, timestamp, length = _RECORD.unpack_from(buf, offset)
+        payload = offset + _RECORD.size
+        if payload + length > end:
+            return  # truncated by a crash
+        yield offset, record_type, direction, tunnel, timestamp, payload, length
+        offset = payload + length
+
+
+def _footer_index(buf, size):
+    """
+    :return: offset of the last INDEX record announced by the footer, None if there is no footer
+    """
+    if size < _FILE_HEADER.size + _FOOTER_SIZE:
+        return None
+    offset = size - _FOOTER_SIZE
+    record_type, _, _, _, length = _RECORD.unpack_from(buf, offset)
+    last_index, magic = _FOOTER.unpack_from(buf, offset + _RECORD.size)
+    if record_type != FOOTER or length != _FOOTER.size or magic != FOOTER_MAGIC:
+        return None
+    return last_index
+
+
+def _check_file_header(buf, size, path):
+    if size < _FILE_HEADER.size:
+        raise KnxnetException('{0} is not a capture file'.format(path))
+    magic, version = _FILE_HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise KnxnetException('{0} is not a capture file'.format(path))
+    if version != VERSION:
+        raise KnxnetException('Unsupported capture file version {0}'.format(version))
+
+
+class CaptureWriter():
+    """
+    Append datagrams to a capture file
+    An existing file is appended to. If it was not closed (no footer), its complete records are
+    kept and the frames after its last INDEX record are indexed with the next ones.
+    Timestamps are kept monotonic: a clock going back is clamped to the last timestamp.
+    """
+    INDEX_INTERVAL = 1024  # frames per index block
+
+    def __init__(self, path, index_interval=INDEX_INTERVAL, clock=time.time):
+        """
+        :param path: capture file
+        :param index_interval: frames between two INDEX records
+        :param clock: time source of the timestamps, in seconds
+        """
+        self.path = path
+        self.index_interval = index_interval
+        self.clock = clock
+        self.frames = 0  # frames written by this writer
+        self._last_timestamp = float('-inf')
+        self._last_index = 0  # offset of the last INDEX record, 0 for none
+        self._block_first_record = None
+        self._block_first_timestamp = None
+        self._block_count = 0
+        self._block_groups = set()
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        try:
+            self._open()
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _open(self):
+        size = os.fstat(self._file.fileno()).st_size
+        if size == 0:
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+            self._offset = _FILE_HEADER.size
+            return
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            _check_file_header(buf, size, self.path)
+            last_index = _footer_index(buf, size)
+            if last_index is not None:
+                end = size - _FOOTER_SIZE
+                self._last_index = last_index
+                for _, record_type, _, _, timestamp, _, _ in _walk(buf, last_index, end):
+                    self._last_timestamp = timestamp
+            else:  # not closed: recover the complete records
+                end = _FILE_HEADER.size
+                for offset, record_type, _, _, timestamp, payload, length in _walk(buf, end, size):
+                    end = payload + length
+                    if record_type == INDEX:
+                        self._last_index = offset
+                        self._block_first_record = None
+                        self._block_count = 0
+                        self._block_groups = set()
+                    elif record_type == FRAME:
+                        self._add_to_block(offset, timestamp, buf[payload:payload + length])
+                    self._last_timestamp = timestamp
+        self._file.truncate(end)
+        self._file.seek(end)
+        self._offset = end
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _add_to_block(self, offset, timestamp, frame):
+        if self._block_first_record is None:
+            self._block_first_record = offset
+            self._block_first_timestamp = timestamp
+        self._block_count += 1
+        dest_addr_group = peek_dest_addr_group(frame)
+        if dest_addr_group is not None:
+            self._block_groups.add(dest_addr_group)
+
+    def write(self, frame, direction=RECEIVED, tunnel=0, timestamp=None):
+        """
+        Append one datagram
+        :param frame: bytes, bytearray or memoryview holding one datagram
+        :param direction: RECEIVED or SENT
+        :param tunnel: 16 bits id of the tunnel (e.g. its channel id) or endpoint
+        :param timestamp: in seconds, None for the clock
+        """
+        if timestamp is None:
+            timestamp = self.clock()
+        timestamp = max(timestamp, self._last_timestamp)
+        self._add_to_block(self._offset, timestamp, frame)
+        self._write_record(FRAME, direction, tunnel, timestamp, frame)
+        self.frames += 1
+        if self._block_count >= self.index_interval:
+            self._write_index()
+
+    def _write_record(self, record_type, direction, tunnel, timestamp, payload):
+        self._file.write(_RECORD.pack(record_type, direction, tunnel, timestamp, len(payload)))
+        self._file.write(payload)
+        self._last_timestamp = timestamp
+        offset = self._offset
+        self._offset += _RECORD.size + len(payload)
+        return offset
+
+    def _write_index(self):
+        groups = sorted(self._block_groups)
+        payload = _INDEX.pack(self._block_first_timestamp, self._last_timestamp, self._block_first_record,
+                              self._last_index, self._block_count, len(groups)) + \
+            struct.pack('>{0}H'.format(len(groups)), *groups)
+        self._last_index = self._write_record(INDEX, 0, 0, self._last_timestamp, payload)
+        self._block_first_record = None
+        self._block_count = 0
+        self._block_groups = set()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        """
+        Index the last frames and write the footer
+        """
+        if self._file.closed:
+            return
+        if self._block_count:
+            self._write_index()
+        if self._last_index:
+            self._write_record(FOOTER, 0, 0, self._last_timestamp, _FOOTER.pack(self._last_index, FOOTER_MAGIC))
+        self._file.close()
+
+
+class CaptureReader():
+    """
+    Memory mapped reader of a capture file
+    The index blocks are loaded when the file is opened: from the footer, or by walking the file
+    if it was not closed (its frames after the last INDEX record are then one more block).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+        self.buffer = memoryview(self._mmap)  # the whole file, e.g. for decode_frames(buffer, frame_offsets())
+        self._blocks = []
+        try:
+            _check_file_header(self.buffer, len(self.buffer), path)
+            self._load_index()
+        except BaseException:
+            self.close()
+            raise
+        self._first_timestamps = [block.first_timestamp for block in self._blocks]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """
+        Close the file. The frames, arrays and iterators still using buffer keep the mapping alive:
+        it is unmapped by the garbage collector once they are released.
+        """
+        self._blocks = []
+        try:
+            self.buffer.release()
+        except BufferError:
+            pass  # buffer is still exported, e.g. to a struct.iter_unpack() iterator
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # frames still referenced keep the mapping until they are released
+        self._file.close()
+
+    def _load_index(self):
+        buf = self.buffer
+        last_index = _footer_index(buf, len(buf))
+        if last_index is not None:
+            while last_index:
+                block, last_index = self._read_index(last_index)
+                self._blocks.append(block)
+            self._blocks.reverse()
+            return
+        first_record = None
+        count = 0
+        groups = set()
+        first_timestamp = last_timestamp = None
+        for offset, record_type, _, _, timestamp, payload, length in _walk(buf, _FILE_HEADER.size, len(buf)):
+            if record_type == INDEX:
+                self._blocks.append(self._read_index(offset)[0])
+                first_record = None
+            elif record_type == FRAME:
+                if first_record is None:
+                    first_record, first_timestamp, count, groups = offset, timestamp, 0, set()
+                count += 1
+                last_timestamp = timestamp
+                dest_addr_group = peek_dest_addr_group(buf[payload:payload + length])
+                if dest_addr_group is not None:
+                    groups.add(dest_addr_group)
+        if first_record is not None:
+            self._blocks.append(_IndexBlock(first_timestamp, last_timestamp, first_record, count,
+                                            array('H', sorted(groups))))
+
+    def _read_index(self, offset):
+        """
+        :return: (_IndexBlock, offset of the previous INDEX record)
+        """
+        record_type, _, _, _, length = _RECORD.unpack_from(self.buffer, offset)
+        if record_type != INDEX:
+            raise KnxnetException('Invalid capture index (offset {0})'.format(offset))
+        payload = offset + _RECORD.size
+        first_timestamp, last_timestamp, first_record, previous, count, group_count = \
+            _INDEX.unpack_from(self.buffer, payload)
+        groups = array('H', struct.unpack_from('>{0}H'.format(group_count), self.buffer, payload + _INDEX.size))
+        return _IndexBlock(first_timestamp, last_timestamp, first_record, count, groups), previous
+
+    def __len__(self):
+        return sum(block.count for block in self._blocks)
+
+    @property
+    def start_time(self):
+        return self._blocks[0].first_timestamp if self._blocks else None
+
+    @property
+    def end_time(self):
+        return self._blocks[-1].last_timestamp if self._blocks else None
+
+    def records(self, start=None, stop=None, dest_addr_group=None):
+        """
+        Iterate over the frames of a time range, and/or to a group address
+        Only the index blocks which overlap the time range and hold the group address are walked.
+        :param start: in seconds, None from the first frame
+        :param stop: in seconds (excluded), None up to the last frame
+        :param dest_addr_group: GroupAddress object, string or packed 16 bits group address
+        :return: iterator of (timestamp, direction, tunnel, frame), frame being a memoryview of the file
+        """
+        if dest_addr_group is not None and not isinstance(dest_addr_group, int):
+            if not isinstance(dest_addr_group, GroupAddress):
+                dest_addr_group = GroupAddress.from_str(dest_addr_group)
+            dest_addr_group = dest_addr_group.value
+        first = 0
+        if start is not None:  # blocks are in time order: skip the blocks which end before start
+            first = max(0, bisect.bisect_right(self._first_timestamps, start) - 1)
+        buf = self.buffer
+        for block in self._blocks[first:]:
+            if stop is not None and block.first_timestamp >= stop:
+                return
+            if start is not None and block.last_timestamp < start:
+                continue
+            if dest_addr_group is not None and not block.has_group(dest_addr_group):
+                continue
+            count = 0
+            for _, record_type, direction, tunnel, timestamp, payload, length in \
+                    _walk(buf, block.first_record, len(buf)):
+                if record_type != FRAME:
+                    continue
+                count += 1
+                if (start is None or timestamp >= start) and (stop is None or timestamp < stop):
+                    frame = buf[payload:payload + length]
+                    if dest_addr_group is None or peek_dest_addr_group(frame) == dest_addr_group:
+                        yield timestamp, direction, tunnel, frame
+                if count == block.count:
+                    break
+
+    def frames(self, start=None, stop=None, dest_addr_group=None):
+        """
+        :return: iterator of the frames of records(), memoryviews of the file
+        """
+        return (frame for _, _, _, frame in self.records(start, stop, dest_addr_group))
+
+    def frame_offsets(self):
+        """
+        :return: position of every frame in buffer, for decode_frames(reader.buffer, offsets)
+        """
+        return [payload for _, record_type, _, _, _, payload, _ in _walk(self.buffer, _FILE_HEADER.size,
+                                                                          len(self.buffer))
+                if record_type == FRAME]
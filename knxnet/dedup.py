@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+Suppression of duplicated telegrams on the receive path
+
+The same telegram reaches the application more than once when a KNX device repeats it (no ack
+on the line, cEMI repeat flag set) or when several tunnels or routers deliver it. The
+Deduplicator keeps the telegrams of the last seconds and drops the copies which arrive within a
+time window:
+
+    deduplicator = Deduplicator(window=0.2)
+    dispatcher = Dispatcher(deduplicator=deduplicator)  # between decode_frame() and the handlers
+    tunnel_client.add_handler(deduplicator.filter(on_telegram))
+"""
+
+import collections
+import time
+
+from knxnet.knxnet import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class Deduplicator():
+    """
+    Time window table of the recent telegrams, keyed by source, destination, APCI and data
+    A telegram is a duplicate when an identical one (same source, destination, APCI and data)
+    arrived less than window seconds before, or less than repeat_window seconds if its cEMI repeat
+    flag is set: copies are dropped even when other sources write to the same group address in
+    between. The entries older than both windows are evicted as telegrams arrive and the table
+    holds at most capacity entries, the oldest are evicted first.
+    The window starts with the first copy, so the same value written again later is not dropped.
+    """
+    WINDOW = 0.2  # seconds, copies delivered by several tunnels or routers
+    REPEAT_WINDOW = 2.0  # seconds, repetitions of the sending device
+    CAPACITY = 4096  # entries, a few seconds of a busy installation
+
+    def __init__(self, window=WINDOW, repeat_window=REPEAT_WINDOW, clock=time.monotonic, capacity=CAPACITY):
+        """
+        :param window: seconds during which an identical telegram is a duplicate
+        :param repeat_window: seconds during which an identical telegram with the repeat flag is a duplicate
+        :param clock: time source, in seconds
+        :param capacity: maximum number of telegrams kept
+        """
+        self.window = window
+        self.repeat_window = repeat_window
+        self.clock = clock
+        self.capacity = capacity
+        self.accepted = 0
+        self.suppressed = 0  # duplicates dropped, repeated ones included
+        self.suppressed_repeats = 0  # duplicates dropped which had the repeat flag
+        # (destination key, source, apci, data, data_size) -> timestamp, oldest first
+        self._recent = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._recent)
+
+    def accept(self, request, timestamp=None):
+        """
+        :param request: TunnellingRequest, TunnellingRequestView or RoutingIndication
+        :param timestamp: arrival time in seconds of the clock, None for now
+        :return: True if the telegram is new, False if it is a duplicate
+        """
+        dest_addr = request.dest_addr_group
+        dest = dest_addr.value | 0x10000 if isinstance(dest_addr, GroupAddress) else dest_addr.value
+        source_addr = request.source_addr
+        source = 0 if source_addr is None else source_addr.value
+        data = request.data
+        if not isinstance(data, int):
+            data = bytes(data)  # no view on a datagram
+        now = self.clock() if timestamp is None else timestamp
+        self._expire(now)
+        key = (dest, source, request.apci, data, request.data_size)
+        last = self._recent.get(key)
+        if last is not None:
+            repeat = not request.control_field_1 & 0x20  # CemiFrame.repeat, also on a TunnellingRequestView
+            if now - last < (self.repeat_window if repeat else self.window):
+                self.suppressed += 1
+                if repeat:
+                    self.suppressed_repeats += 1
+                return False
+            del self._recent[key]
+        self._recent[key] = now
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+        self.accepted += 1
+        return True
+
+    def _expire(self, now):
+        horizon = now - max(self.window, self.repeat_window)
+        recent = self._recent
+        while recent:
+            key = next(iter(recent))
+            if recent[key] > horizon:
+                break
+            del recent[key]
+
+    def filter(self, handler):
+        """
+        :param handler: callable(request)
+        :return: callable(request) calling handler with the new telegrams only
+        """
+        def deduplicated(request):
+            if self.accept(request):
+                handler(request)
+        return deduplicated
+
+    def clear(self):
+        self._recent.clear()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Group address subscriptions, dispatched from the raw datagrams
+
+The Dispatcher reads the service type and the destination group address straight from the
+datagram bytes, and only decodes the tunnelling requests and routing indications which have
+subscribers:
+
+    dispatcher = Dispatcher()
+    dispatcher.subscribe('1/4/10', on_temperature)  # exact group address
+    dispatcher.subscribe('1/4/*', on_floor)         # middle group range
+    dispatcher.subscribe('1/*', on_building)        # main group range
+    dispatcher.subscribe('*', on_everything)
+    dispatcher.dispatch(datagram)
+"""
+
+from knxnet.knxnet import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+# subscription levels: exact group address, middle group range, main group range, wildcard.
+# The key of a group address in each level is its packed value shifted right by the level shift
+EXACT = 0
+MIDDLE = 8
+MAIN = 11
+WILDCARD = 16
+
+
+class Dispatcher():
+    """
+    Index of handlers by group address
+    Handlers are called with the decoded TunnellingRequest (a TunnellingRequestView if lazy) or
+    RoutingIndication, in subscription order: exact, then middle range, main range and wildcard
+    subscriptions. The handlers of each group address are resolved once and cached, a dispatch
+    is one dict lookup.
+    """
+
+    def __init__(self, lazy=False, deduplicator=None):
+        """
+        :param lazy: hand TunnellingRequestView objects to the handlers, see decode_frame()
+        :param deduplicator: knxnet.dedup.Deduplicator dropping the duplicated telegrams before the handlers
+        """
+        self.lazy = lazy
+        self.deduplicator = deduplicator
+        self._subscriptions = {EXACT: {}, MIDDLE: {}, MAIN: {}, WILDCARD: {}}  # level -> key -> [handler]
+        self._handlers = {}  # packed group address -> tuple of handlers, cache of _subscriptions
+
+    @staticmethod
+    def parse_pattern(pattern):
+        """
+        :param pattern: GroupAddress object, '1/4/10', '1/4/*', '1/*', '1/*/*' or '*'
+        :return: (level, key)
+        """
+        if isinstance(pattern, GroupAddress):
+            return EXACT, pattern.value
+        parts = pattern.split('/')
+        while len(parts) > 1 and parts[-1] == '*':
+            parts.pop()
+        if parts == ['*']:
+            return WILDCARD, 0
+        if '*' in parts or len(parts) > 3:
+            raise KnxnetException('Invalid subscription pattern {0}'.format(pattern))
+        try:
+            if len(parts) == 3:
+                return EXACT, GroupAddress.from_str(pattern).value
+            if len(parts) == 2:
+                return MIDDLE, GroupAddress(int(parts[0]), int(parts[1]), 0).value >> MIDDLE
+            return MAIN, GroupAddress(int(parts[0]), 0, 0).value >> MAIN
+        except (ValueError, KnxnetUtilsException):
+            raise KnxnetException('Invalid subscription pattern {0}'.format(pattern))
+
+    def subscribe(self, pattern, handler):
+        """
+        :param pattern: see parse_pattern()
+        :param handler: callable(request)
+        """
+        level, key = self.parse_pattern(pattern)
+        self._subscriptions[level].setdefault(key, []).append(handler)
+        self._handlers.clear()
+
+    def unsubscribe(self, pattern, handler):
+        level, key = self.parse_pattern(pattern)
+        handlers = self._subscriptions[level].get(key)
+        if handlers is not None and handler in handlers:
+            handlers.remove(handler)
+            if not handlers:
+                del self._subscriptions[level][key]
+            self._handlers.clear()
+
+    def handlers(self, group_address):
+        """
+        :param group_address: packed 16 bits group address
+        :return: tuple of the handlers subscribed to it
+        """
+        handlers = self._handlers.get(group_address)
+        if handlers is None:
+            handlers = ()
+            for level, subscriptions in self._subscriptions.items():
+                handlers += tuple(subscriptions.get(group_address >> level, ()))
+            self._handlers[group_address] = handlers
+        return handlers
+
+    def dispatch(self, frame):
+        """
+        Call the handlers of a datagram, decoding it only if there are some
+        :param frame: bytes, bytearray or memoryview holding one datagram
+        :return: number of handlers called
+        """
+        dest_addr_group = peek_dest_addr_group(frame)
+        if dest_addr_group is None:
+            return 0
+        handlers = self.handlers(dest_addr_group)
+        if handlers:
+            request = decode_frame(frame, self.lazy)
+            if self.deduplicator is not None and not self.deduplicator.accept(request):
+                return 0
+            for handler in handlers:
+                handler(request)
+        return len(handlers)
+
+    def dispatch_request(self, request):
+        """
+        Call the handlers of an already decoded TunnellingRequest or RoutingIndication, for instance
+        as a TunnelClient handler
+        :return: number of handlers called
+        """
+        if not isinstance(request.dest_addr_group, GroupAddress):
+            return 0
+        handlers = self.handlers(request.dest_addr_group.value)
+        if handlers and self.deduplicator is not None and not self.deduplicator.accept(request):
+            return 0
+        for handler in handlers:
+            handler(request)
+        return len(handlers)
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+
+"""
+KNX datapoint types (DPT)
+
+A Dpt converts between a physical value and the raw data of a TunnellingRequest: an unsigned
+integer holding the payload bytes (big endian), or the 6 bits packed with the APCI when
+data_size is 1. Codecs are registered in a DptRegistry by DPT id ('9' or '9.001'), and group
+addresses can be assigned a DPT id so that their telegrams are converted without naming it.
+
+    DEFAULT_REGISTRY.assign('1/4/10', '9.001')
+    request = TunnellingRequest.create_from_value('1/4/10', channel_id, 21.5)
+    request.value()  # 21.5
+"""
+
+import datetime
+import math
+import struct
+
+from knxnet.utils import GroupAddress
+
+try:
+    import numpy
+except ImportError:  # numpy is only required by the array codecs (encode_array, decode_array)
+    numpy = None
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class Dpt():
+    """
+    Codec of one datapoint type
+    encode(value) returns the raw data, decode(data) returns the value. Both are plain functions
+    stored on the instance, built once when the codec is created.
+    encode_array(values) and decode_array(data) do the same on whole numpy arrays (raw data as
+    uint32), they are None when the DPT has no array codec.
+    """
+
+    def __init__(self, dpt_id, name, data_size, encode, decode, encode_array=None, decode_array=None):
+        """
+        :param dpt_id: main number ('9') or main number and subtype ('9.001')
+        :param name: short description
+        :param data_size: TunnellingRequest data size (1 for values of 6 bits or less, else 1 + payload bytes)
+        :param encode: function value -> raw data (int)
+        :param decode: function raw data (int) -> value
+        :param encode_array: function numpy array of values -> numpy uint32 array of raw data
+        :param decode_array: function numpy array of raw data -> numpy array of values
+        """
+        self.dpt_id = dpt_id
+        self.name = name
+        self.data_size = data_size
+        self.encode = encode
+        self.decode = decode
+        self.encode_array = encode_array if numpy is not None else None
+        self.decode_array = decode_array if numpy is not None else None
+
+    def __repr__(self):
+        return 'KNX DPT {0} ({1})'.format(self.dpt_id, self.name)
+
+
+class DptRegistry():
+    """
+    Dpt codecs by DPT id, and DPT id of group addresses
+    A subtype id ('9.001') which is not registered resolves to its main number ('9').
+    """
+
+    def __init__(self, dpts=()):
+        self._dpts = {}
+        self._group_dpts = {}  # GroupAddress -> Dpt
+        for dpt in dpts:
+            self.register(dpt)
+
+    def register(self, dpt):
+        self._dpts[dpt.dpt_id] = dpt
+
+    def get(self, dpt_id):
+        """
+        :param dpt_id: '9.001', '9', 9 or a Dpt object
+        """
+        if isinstance(dpt_id, Dpt):
+            return dpt_id
+        dpt_id = str(dpt_id)
+        dpt = self._dpts.get(dpt_id)
+        if dpt is None:
+            dpt = self._dpts.get(dpt_id.split('.')[0])
+            if dpt is None:
+                raise KnxnetDptException('Unknown datapoint type {0}'.format(dpt_id))
+        return dpt
+
+    def assign(self, group_address, dpt_id):
+        """
+        :param group_address: GroupAddress object, or string
+        """
+        self._group_dpts[_group_address(group_address)] = self.get(dpt_id)
+
+    def unassign(self, group_address):
+        self._group_dpts.pop(_group_address(group_address), None)
+
+    def get_for_group(self, group_address):
+        dpt = self._group_dpts.get(_group_address(group_address))
+        if dpt is None:
+            raise KnxnetDptException('No datapoint type assigned to {0}'.format(group_address))
+        return dpt
+
+    def resolve(self, dpt_id, group_address):
+        """
+        The given DPT if any, else the one assigned to the group address
+        """
+        if dpt_id is not None:
+            return self.get(dpt_id)
+        return self.get_for_group(group_address)
+
+    def __contains__(self, dpt_id):
+        return str(dpt_id) in self._dpts
+
+
+class KnxnetDptException(Exception):
+    pass
+
+
+def _group_address(group_address):
+    if isinstance(group_address, GroupAddress):
+        return group_address
+    return GroupAddress.from_str(group_address)
+
+
+def _check_range(value, min_value, max_value, dpt_id):
+    if value < min_value or value > max_value:
+        raise KnxnetDptException('DPT {0} value must be {1} <= value <= {2}'.format(dpt_id, min_value, max_value))
+
+
+def _integer(dpt_id, name, size, signed=False, scale=None, max_value=None):
+    """
+    size bytes (un)signed integer. With scale=(raw max, value max), raw 0..raw max maps to 0..value max
+    :param max_value: largest unsigned value when the type does not use all the bits of its size
+    """
+    bits = size * 8
+    mask = (1 << bits) - 1
+    if signed:
+        min_raw, max_raw = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    else:
+        min_raw, max_raw = 0, mask if max_value is None else max_value
+    sign_bit = 1 << (bits - 1)
+
+    if scale is None:
+        def encode(value):
+            _check_range(value, min_raw, max_raw, dpt_id)
+            return value & mask
+
+        if signed:
+            def decode(data):
+                return data - (1 << bits) if data & sign_bit else data
+        else:
+            def decode(data):
+                return data
+    else:
+        raw_max, value_max = scale
+
+        def encode(value):
+            _check_range(value, 0, value_max, dpt_id)
+            return int(round(value * raw_max / value_max))
+
+        def decode(data):
+            return data * value_max / raw_max
+    return Dpt(dpt_id, name, size + 1, encode, decode)
+
+
+def _float(dpt_id, name):
+    """
+    4 bytes IEEE 754 float
+    """
+    layout = struct.Struct('>f')
+
+    def encode(value):
+        return int.from_bytes(layout.pack(value), 'big')
+
+    def decode(data):
+        return layout.unpack(data.to_bytes(4, 'big'))[0]
+    return Dpt(dpt_id, name, 5, encode, decode, _encode_float_array, _decode_float_array)
+
+
+def _encode_float_array(values):
+    return numpy.asarray(values, dtype=numpy.float32).view(numpy.uint32)
+
+
+def _decode_float_array(data):
+    return numpy.asarray(data, dtype=numpy.uint32).view(numpy.float32)
+
+
+def encode_knx_float(value):
+    """
+    KNX 2 bytes float (DPT 9): MEEEEMMM MMMMMMMM, value = 0.01 * M * 2^E, M 12 bits two's complement
+    """
+    if not math.isfinite(value):
+        raise KnxnetDptException('DPT 9 values must be finite')
+    mantissa = int(round(value * 100))
+    exponent = 0
+    while mantissa < -2048 or mantissa > 2047:
+        exponent += 1
+        if exponent > 15:
+            raise KnxnetDptException('DPT 9 value must be -671088.64 <= value <= 670760.96')
+        mantissa = int(round(value * 100 / (1 << exponent)))
+    return ((0x8000 if mantissa < 0 else 0) | (exponent << 11) | (mantissa & 0x7ff))
+
+
+def decode_knx_float(data):
+    mantissa = data & 0x7ff
+    if data & 0x8000:
+        mantissa -= 2048
+    return 0.01 * mantissa * (1 << ((data >> 11) & 0xf))
+
+
+def encode_knx_float_array(values):
+    """
+    encode_knx_float() of a whole array, rounded the same way
+    :return: numpy uint32 array
+    """
+    scaled = numpy.asarray(values, dtype=numpy.float64) * 100
+    if not numpy.isfinite(scaled).all():
+        raise KnxnetDptException('DPT 9 values must be finite')
+    mantissa = numpy.rint(scaled)
+    exponent = numpy.zeros(scaled.shape, dtype=numpy.uint32)
+    for i in range(1, 17):
+        over = (mantissa < -2048) | (mantissa > 2047)
+        if not over.any():
+            break
+        if i == 16:
+            raise KnxnetDptException('DPT 9 value must be -671088.64 <= value <= 670760.96')
+        exponent[over] = i
+        mantissa[over] = numpy.rint(scaled[over] / (1 << i))
+    mantissa = mantissa.astype(numpy.int64)
+    return (numpy.where(mantissa < 0, 0x8000, 0).astype(numpy.uint32) | (exponent << 11) |
+            (mantissa & 0x7ff).astype(numpy.uint32))
+
+
+_knx_float_table = None
+
+
+def decode_knx_float_array(data):
+    """
+    decode_knx_float() of a whole array, through a lookup table of the 65536 raw values
+    :return: numpy float64 array
+    """
+    global _knx_float_table
+    if _knx_float_table is None:
+        raw = numpy.arange(0x10000, dtype=numpy.int64)
+        mantissa = (raw & 0x7ff) - numpy.where(raw & 0x8000, 2048, 0)
+        _knx_float_table = 0.01 * mantissa * (1 << ((raw >> 11) & 0xf))
+    return _knx_float_table[numpy.asarray(data) & 0xffff]
+
+
+def _string(dpt_id, name, encoding):
+    """
+    14 characters string, zero padded
+    """
+    def encode(value):
+        raw = value.encode(encoding)
+        if len(raw) > 14:
+            raise KnxnetDptException('DPT {0} strings are at most 14 characters'.format(dpt_id))
+        return int.from_bytes(raw.ljust(14, b'\x00'), 'big')
+
+    def decode(data):
+        return data.to_bytes(14, 'big').rstrip(b'\x00').decode(encoding)
+    return Dpt(dpt_id, name, 15, encode, decode)
+
+
+def _character(dpt_id, name, encoding):
+    def encode(value):
+        raw = value.encode(encoding)
+        if len(raw) != 1:
+            raise KnxnetDptException('DPT {0} value must be one character'.format(dpt_id))
+        return raw[0]
+
+    def decode(data):
+        return bytes((data,)).decode(encoding)
+    return Dpt(dpt_id, name, 2, encode, decode)
+
+
+def _boolean_encode(value):
+    return 1 if value else 0
+
+
+def _boolean_decode(data):
+    return bool(data & 1)
+
+
+def _control_encode(value_bits):
+    """
+    (control, value) pairs: control is 1 bit above value_bits bits of value
+    """
+    def encode(value):
+        control, data = value
+        _check_range(data, 0, (1 << value_bits) - 1, 'control')
+        return ((1 if control else 0) << value_bits) | data
+    return encode
+
+
+def _control_decode(value_bits):
+    def decode(data):
+        return bool((data >> value_bits) & 1), data & ((1 << value_bits) - 1)
+    return decode
+
+
+def _time_encode(value):
+    """
+    (weekday, hour, minute, second), weekday 0 = no day, 1 = monday
+    """
+    weekday, hour, minute, second = value
+    _check_range(weekday, 0, 7, 10)
+    _check_range(hour, 0, 23, 10)
+    _check_range(minute, 0, 59, 10)
+    _check_range(second, 0, 59, 10)
+    return (((weekday << 5) | hour) << 16) | (minute << 8) | second
+
+
+def _time_decode(data):
+    return (data >> 21) & 0x7, (data >> 16) & 0x1f, (data >> 8) & 0x3f, data & 0x3f
+
+
+def _date_encode(value):
+    """
+    datetime.date between 1990 and 2089
+    """
+    _check_range(value.year, 1990, 2089, 11)
+    return (value.day << 16) | (value.month << 8) | (value.year % 100)
+
+
+def _date_decode(data):
+    year = data & 0x7f
+    return datetime.date(year + (1900 if year >= 90 else 2000), (data >> 8) & 0xf, (data >> 16) & 0x1f)
+
+
+def _rgb_encode(value):
+    red, green, blue = value
+    for component in value:
+        _check_range(component, 0, 255, 232)
+    return (red << 16) | (green << 8) | blue
+
+
+def _rgb_decode(data):
+    return (data >> 16) & 0xff, (data >> 8) & 0xff, data & 0xff
+
+
+def _scene_control_encode(value):
+    """
+    (learn, scene number)
+    """
+    learn, scene = value
+    _check_range(scene, 0, 63, 18)
+    return (0x80 if learn else 0) | scene
+
+
+def _scene_control_decode(data):
+    return bool(data & 0x80), data & 0x3f
+
+
+STANDARD_DPTS = [
+    Dpt('1', '1 bit boolean', 1, _boolean_encode, _boolean_decode),
+    Dpt('2', '1 bit controlled', 1, _control_encode(1), _control_decode(1)),
+    Dpt('3', '3 bit controlled', 1, _control_encode(3), _control_decode(3)),
+    _character('4', 'character', 'ascii'),
+    _character('4.002', 'character ISO 8859-1', 'latin-1'),
+    _integer('5', '8 bit unsigned', 1),
+    _integer('5.001', 'scaling', 1, scale=(255, 100)),
+    _integer('5.003', 'angle', 1, scale=(255, 360)),
+    _integer('6', '8 bit signed', 1, signed=True),
+    _integer('7', '2 bytes unsigned', 2),
+    _integer('8', '2 bytes signed', 2, signed=True),
+    Dpt('9', '2 bytes float', 3, encode_knx_float, decode_knx_float, encode_knx_float_array, decode_knx_float_array),
+    Dpt('10', 'time of day', 4, _time_encode, _time_decode),
+    Dpt('11', 'date', 4, _date_encode, _date_decode),
+    _integer('12', '4 bytes unsigned', 4),
+    _integer('13', '4 bytes signed', 4, signed=True),
+    _float('14', '4 bytes float'),
+    _string('16', 'string ASCII', 'ascii'),
+    _string('16.001', 'string ISO 8859-1', 'latin-1'),
+    _integer('17', 'scene number', 1, max_value=63),  # 2 reserved bits
+    Dpt('18', 'scene control', 2, _scene_control_encode, _scene_control_decode),
+    _integer('20', '1 byte enumeration', 1),
+    Dpt('232', 'RGB', 4, _rgb_encode, _rgb_decode),
+]
+
+DEFAULT_REGISTRY = DptRegistry(STANDARD_DPTS)
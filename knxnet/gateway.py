@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import random
+
+from knxnet.knxnet import *
+from knxnet.tunnel import L_DATA_REQ, L_DATA_IND, L_DATA_CON, \
+    APCI_GROUP_VALUE_READ, APCI_GROUP_VALUE_RESPONSE, APCI_GROUP_VALUE_WRITE
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+logger = logging.getLogger(__name__)
+
+E_NO_ERROR = 0x00
+E_CONNECTION_ID = 0x21
+E_NO_MORE_CONNECTIONS = 0x24
+
+
+class _Tunnel():
+    def __init__(self, channel_id, addr):
+        self.channel_id = channel_id
+        self.addr = addr
+        self.expected_sequence_counter = 0x0  # next sequence counter expected from the client
+        self.sequence_counter = 0x0  # next sequence counter sent to the client
+
+
+class GatewayEmulator(asyncio.DatagramProtocol):
+    """
+    Local KNXnet/IP tunnelling gateway for tests and load tests, no KNX hardware needed
+    It answers connection, connection state, disconnect and tunnelling requests over UDP.
+    Group value writes are stored and forwarded as L_Data.ind to the other tunnels, as if
+    they were on the same KNX line, and group value reads are answered from the stored values.
+    Requests sent to the clients are not repeated if their ack is lost.
+
+        gateway = await GatewayEmulator.start(tunnel_slots=8, ack_delay=0.005, loss_rate=0.01)
+        client = await TunnelClient.connect(gateway.addr)
+    """
+
+    def __init__(self, tunnel_slots=4, ack_delay=0, loss_rate=0.0, confirm=True, seed=None):
+        """
+        :param tunnel_slots: number of simultaneous tunnel connections
+        :param ack_delay: seconds between a tunnelling request and its ack
+        :param loss_rate: probability to drop an incoming tunnelling request (0.0 to 1.0)
+        :param confirm: send the L_Data.con of each L_Data.req back to its tunnel
+        :param seed: seed of the loss random generator
+        """
+        self.tunnel_slots = tunnel_slots
+        self.ack_delay = ack_delay
+        self.loss_rate = loss_rate
+        self.confirm = confirm
+        self.transport = None
+        self.tunnels = {}  # channel_id -> _Tunnel
+        self.values = {}  # GroupAddress -> (data, data_size)
+        self.received_requests = 0
+        self.dropped_requests = 0  # lost on purpose, see loss_rate
+        self.discarded_requests = 0  # out of sequence, not acked
+        self._random = random.Random(seed)
+
+    @classmethod
+    async def start(cls, local_addr=('127.0.0.1', 0), **kwargs):
+        """
+        Open the gateway UDP endpoint
+        :param local_addr: (ip, port) to bind, port 0 picks a free port
+        :param kwargs: see GatewayEmulator.__init__
+        """
+        loop = asyncio.get_running_loop()
+        gateway = cls(**kwargs)
+        await loop.create_datagram_endpoint(lambda: gateway, local_addr=local_addr)
+        return gateway
+
+    @property
+    def addr(self):
+        """
+        (ip, port) the gateway is listening on
+        """
+        return self.transport.get_extra_info('sockname')[:2]
+
+    def close(self):
+        self.transport.close()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        try:
+            frame = decode_frame(data)
+        except KnxnetException as e:
+            logger.debug('Invalid frame from %s: %s', addr, e)
+            return
+        service_type_descriptor = frame.header.service_type_descriptor
+        if service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST:
+            self._tunnelling_request_received(frame)
+        elif service_type_descriptor is ServiceTypeDescriptor.CONNECTION_REQUEST:
+            self._connection_request_received(frame, addr)
+        elif service_type_descriptor is ServiceTypeDescriptor.CONNECTION_STATE_REQUEST:
+            status = E_NO_ERROR if frame.channel_id in self.tunnels else E_CONNECTION_ID
+            self._send(create_frame(ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE, frame.channel_id, status),
+                       self._control_addr(frame.control_endpoint, addr))
+        elif service_type_descriptor is ServiceTypeDescriptor.DISCONNECT_REQUEST:
+            status = E_NO_ERROR if self.tunnels.pop(frame.channel_id, None) is not None else E_CONNECTION_ID
+            self._send(create_frame(ServiceTypeDescriptor.DISCONNECT_RESPONSE, frame.channel_id, status),
+                       self._control_addr(frame.control_endpoint, addr))
+
+    def _connection_request_received(self, frame, addr):
+        control_addr = self._control_addr(frame.control_endpoint, addr)
+        free_channels = [i for i in range(1, 256) if i not in self.tunnels]
+        if len(self.tunnels) >= self.tunnel_slots or not free_channels:
+            self._send(create_frame(ServiceTypeDescriptor.CONNECTION_RESPONSE, 0, E_NO_MORE_CONNECTIONS,
+                                    ('0.0.0.0', 0)), control_addr)
+            return
+        channel_id = free_channels[0]
+        self.tunnels[channel_id] = _Tunnel(channel_id, self._control_addr(frame.data_endpoint, addr))
+        self._send(create_frame(ServiceTypeDescriptor.CONNECTION_RESPONSE, channel_id, E_NO_ERROR, self.addr),
+                   control_addr)
+
+    def _tunnelling_request_received(self, frame):
+        tunnel = self.tunnels.get(frame.channel_id)
+        if tunnel is None or frame.data_service != L_DATA_REQ:
+            return
+        self.received_requests += 1
+        if self.loss_rate and self._random.random() < self.loss_rate:
+            self.dropped_requests += 1
+            return
+        sequence_counter = frame.sequence_counter
+        if sequence_counter == tunnel.expected_sequence_counter:
+            tunnel.expected_sequence_counter = (sequence_counter + 1) & 0xff
+            process = True
+        elif sequence_counter == (tunnel.expected_sequence_counter - 1) & 0xff:
+            process = False  # repeated request, our ack was lost
+        else:
+            self.discarded_requests += 1
+            return
+        ack = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, tunnel.channel_id, E_NO_ERROR, sequence_counter)
+        if self.ack_delay:
+            asyncio.get_running_loop().call_later(self.ack_delay, self._send, ack, tunnel.addr)
+        else:
+            self._send(ack, tunnel.addr)
+        if process:
+            self._process(frame, tunnel)
+
+    def _process(self, frame, tunnel):
+        if self.confirm:
+            self._send_to_tunnel(tunnel, frame.dest_addr_group, frame.data, frame.data_size, frame.apci, L_DATA_CON)
+        if frame.apci in (APCI_GROUP_VALUE_WRITE, APCI_GROUP_VALUE_RESPONSE):
+            self.values[frame.dest_addr_group] = (frame.data, frame.data_size)
+        for other in list(self.tunnels.values()):
+            if other is not tunnel:
+                self._send_to_tunnel(other, frame.dest_addr_group, frame.data, frame.data_size, frame.apci, L_DATA_IND)
+        if frame.apci == APCI_GROUP_VALUE_READ and frame.dest_addr_group in self.values:
+            data, data_size = self.values[frame.dest_addr_group]
+            for receiver in list(self.tunnels.values()):
+                self._send_to_tunnel(receiver, frame.dest_addr_group, data, data_size,
+                                     APCI_GROUP_VALUE_RESPONSE, L_DATA_IND)
+
+    def _send_to_tunnel(self, tunnel, dest_addr_group, data, data_size, apci, data_service):
+        self._send(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, dest_addr_group, tunnel.channel_id,
+                                data, data_size, apci, data_service, tunnel.sequence_counter), tunnel.addr)
+        tunnel.sequence_counter = (tunnel.sequence_counter + 1) & 0xff
+
+    def _send(self, knxnet_frame, addr):
+        self.transport.sendto(knxnet_frame.frame, addr)
+
+    @staticmethod
+    def _control_addr(endpoint, addr):
+        """
+        Address to answer to: the announced endpoint, or the datagram source through NAT
+        """
+        if endpoint.ip_addr == '0.0.0.0' or endpoint.port == 0:
+            return addr
+        return endpoint.ip_addr, endpoint.port
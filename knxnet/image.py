@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Process image: the last value of every group address
+
+The image is kept in flat arrays indexed by the packed 16 bits group address, so an update is a
+few array stores and a lookup is a few array loads, without any object per group address:
+
+    image = ProcessImage(max_age=60)
+    tunnel_client.add_handler(image.update)
+    image.read('1/4/10')   # raw data of the last write or response, None if unknown or too old
+    image.value('1/4/10')  # decoded with the DPT assigned to the group address
+"""
+
+import time
+from array import array
+
+from knxnet.knxnet import *
+from knxnet.knxnet import _check_data_width
+from knxnet.dpt import DEFAULT_REGISTRY
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+GROUP_ADDRESSES = 0x10000
+# payloads of data_size up to 9 (8 bytes) are kept in the data array, longer ones in a dict,
+# as they were given: integer, or bytes for extended frames
+MAX_ARRAY_DATA_SIZE = 9
+
+_APCI_GROUP_VALUE_RESPONSE = 0x1
+_APCI_GROUP_VALUE_WRITE = 0x2
+
+
+class ProcessImage():
+    """
+    Last value, timestamp and source of every group address, updated from the group value writes
+    and responses seen on the bus
+    read() answers from the image while the value is younger than max_age, so that a TunnelClient
+    created with process_image= only sends a group value read on the bus when the image is stale.
+    """
+
+    def __init__(self, max_age=None, clock=time.monotonic):
+        """
+        :param max_age: default freshness window of read(), in seconds, None for no limit
+        :param clock: time source of the timestamps, in seconds
+        """
+        self.max_age = max_age
+        self.clock = clock
+        self.hits = 0  # read() answered from the image
+        self.misses = 0  # read() with no fresh value
+        self._data = array('Q', bytes(8 * GROUP_ADDRESSES))
+        self._data_size = array('B', bytes(GROUP_ADDRESSES))  # 0: no value
+        self._timestamp = array('d', bytes(8 * GROUP_ADDRESSES))
+        self._source_addr = array('H', bytes(2 * GROUP_ADDRESSES))
+        self._long_data = {}  # packed group address -> data, for data_size > MAX_ARRAY_DATA_SIZE
+
+    @staticmethod
+    def _packed(dest_addr_group):
+        if isinstance(dest_addr_group, GroupAddress):
+            return dest_addr_group.value
+        if isinstance(dest_addr_group, int):
+            return dest_addr_group
+        return GroupAddress.from_str(dest_addr_group).value
+
+    def update(self, request, timestamp=None):
+        """
+        Store the data of a group value write or response
+        :param request: TunnellingRequest, TunnellingRequestView or RoutingIndication
+        :return: True if the image was updated (group value reads and individual destinations are not)
+        """
+        if request.apci != _APCI_GROUP_VALUE_WRITE and request.apci != _APCI_GROUP_VALUE_RESPONSE:
+            return False
+        dest_addr_group = request.dest_addr_group
+        if not isinstance(dest_addr_group, GroupAddress):
+            return False
+        self.set(dest_addr_group.value, request.data, request.data_size, request.source_addr, timestamp)
+        return True
+
+    def set(self, dest_addr_group, data, data_size, source_addr=None, timestamp=None):
+        """
+        Store a value, e.g. one written by this application
+        :param dest_addr_group: GroupAddress object, string or packed 16 bits group address
+        :param data: raw data, as in TunnellingRequest
+        :param source_addr: IndividualAddress object, None for 0.0.0
+        :param timestamp: in seconds of the clock, None for now
+        """
+        index = self._packed(dest_addr_group)
+        if data_size < 1 or data_size > CemiFrame.MAX_DATA_SIZE:
+            raise KnxnetException('Data size must be 1 <= data_size <= {0}'.format(CemiFrame.MAX_DATA_SIZE))
+        if data_size > MAX_ARRAY_DATA_SIZE:
+            self._long_data[index] = data if isinstance(data, int) else bytes(data)  # no view on a datagram
+            self._data[index] = 0
+        else:
+            if not isinstance(data, int):
+                data = int.from_bytes(data, 'big')
+            if data_size == 1:
+                data &= 0x3f
+            _check_data_width(data, data_size)
+            self._data[index] = data
+            self._long_data.pop(index, None)
+        self._data_size[index] = data_size
+        self._timestamp[index] = self.clock() if timestamp is None else timestamp
+        self._source_addr[index] = 0 if source_addr is None else source_addr.value
+
+    def invalidate(self, dest_addr_group):
+        """
+        Forget the value of a group address, the next read() goes to the bus
+        """
+        index = self._packed(dest_addr_group)
+        self._data_size[index] = 0
+        self._long_data.pop(index, None)
+
+    def clear(self):
+        for index in self:
+            self._data_size[index] = 0
+        self._long_data.clear()
+
+    def __contains__(self, dest_addr_group):
+        return self._data_size[self._packed(dest_addr_group)] != 0
+
+    def __iter__(self):
+        """
+        Iterate over the packed group addresses which have a value
+        """
+        data_size = self._data_size
+        return (index for index in range(GROUP_ADDRESSES) if data_size[index])
+
+    def __len__(self):
+        return GROUP_ADDRESSES - self._data_size.tobytes().count(0)
+
+    def get(self, dest_addr_group):
+        """
+        :return: (data, data_size) of the group address whatever its age, None if unknown
+        """
+        index = self._packed(dest_addr_group)
+        data_size = self._data_size[index]
+        if not data_size:
+            return None
+        if data_size > MAX_ARRAY_DATA_SIZE:
+            return self._long_data[index], data_size
+        return self._data[index], data_size
+
+    def read(self, dest_addr_group, max_age=None):
+        """
+        Serve a group value read from the image
+        :param max_age: freshness window, in seconds, None for the max_age of the image
+        :return: the data of the group address if it is fresh enough, else None
+        """
+        index = self._packed(dest_addr_group)
+        data_size = self._data_size[index]
+        if max_age is None:
+            max_age = self.max_age
+        if not data_size or (max_age is not None and self.clock() - self._timestamp[index] > max_age):
+            self.misses += 1
+            return None
+        self.hits += 1
+        if data_size > MAX_ARRAY_DATA_SIZE:
+            return self._long_data[index]
+        return self._data[index]
+
+    def value(self, dest_addr_group, dpt=None, registry=DEFAULT_REGISTRY):
+        """
+        Decode the value of a group address with its datapoint type, see CemiFrame.value()
+        :return: the decoded value, None if unknown
+        """
+        entry = self.get(dest_addr_group)
+        if entry is None:
+            return None
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_int(self._packed(dest_addr_group))
+        return registry.resolve(dpt, dest_addr_group).decode(entry[0])
+
+    def timestamp(self, dest_addr_group):
+        """
+        :return: time of the last update, in seconds of the clock, None if unknown
+        """
+        index = self._packed(dest_addr_group)
+        return self._timestamp[index] if self._data_size[index] else None
+
+    def age(self, dest_addr_group):
+        """
+        :return: seconds since the last update, None if unknown
+        """
+        timestamp = self.timestamp(dest_addr_group)
+        return None if timestamp is None else self.clock() - timestamp
+
+    def source_addr(self, dest_addr_group):
+        """
+        :return: IndividualAddress of the last writer, None if unknown
+        """
+        index = self._packed(dest_addr_group)
+        return IndividualAddress.from_int(self._source_addr[index]) if self._data_size[index] else None
@@ -1,9 +1,18 @@
 # -*- coding: utf-8 -*-
 
 from knxnet.utils import *
+from knxnet.dpt import DEFAULT_REGISTRY, KnxnetDptException
 
-from abc import ABCMeta, abstractmethod, abstractclassmethod, abstractproperty
+from abc import ABCMeta, abstractmethod, abstractclassmethod
+from collections import OrderedDict
 from enum import Enum
+from functools import cached_property
+import struct
+
+try:
+    import numpy
+except ImportError:  # numpy is only required by the batch API (decode_frames)
+    numpy = None
 
 __author__ = "Adrien Lescourt"
 __copyright__ = "HES-SO 2015, Project EMG4B"
@@ -13,17 +22,110 @@ __email__ = "adrien.lescourt@gmail.com"
 __status__ = "Prototype"
 
 
+_metrics = None  # knxnet.metrics.MetricsCollector, see knxnet.metrics.install()
+
+
 def create_frame(service_type_descriptor, *data):
+    if _metrics is not None:
+        return _metrics.create_frame(service_type_descriptor, data)
+    return _create_frame(service_type_descriptor, data)
+
+
+def _create_frame(service_type_descriptor, data):
     frametype = ServiceTypeDescriptor.to_class(service_type_descriptor)
     if frametype is not None:
         return frametype.create_from_data(*data)
 
 
-def decode_frame(frame):
+def decode_frame(frame, lazy=False):
+    """
+    Decode a KNXnet/IP datagram
+    The header is parsed once and handed to the frame class, which reads the body
+    through offsets into the given buffer, without any intermediate copy.
+    :param frame: bytes, bytearray or memoryview holding one datagram
+    :param lazy: return a TunnellingRequestView for tunnelling requests, which decodes its fields
+                 on first access. The other service types are decoded as usual
+    """
+    if _metrics is not None:
+        return _metrics.decode_frame(frame, lazy)
+    return _decode_frame(frame, lazy)
+
+
+def _decode_frame(frame, lazy):
+    if frame is None:
+        raise KnxnetException('Frame is None')
+    if lazy and len(frame) >= 21 and frame[2] == 0x04 and frame[3] == 0x20:
+        return TunnellingRequestView(frame)
     header = KnxnetHeader.create_from_frame(frame)
-    frametype = ServiceTypeDescriptor.to_class(ServiceTypeDescriptor(header.service_type_descriptor))
+    frametype = _FRAME_CLASSES.get(header.service_type_descriptor)
     if frametype is not None:
-        return frametype.create_from_frame(frame)
+        return frametype.create_from_frame(frame, header)
+
+
+def peek_dest_addr_group(frame):
+    """
+    Read the destination group address of a tunnelling request or routing indication straight from
+    the datagram, without decoding it
+    :param frame: bytes, bytearray or memoryview holding one datagram
+    :return: packed 16 bits group address, None for other service types and individual destinations
+    """
+    if len(frame) < 17:
+        return None
+    # cemi: shift from the offsets of a tunnelling request without additional info
+    if frame[2] == 0x04 and frame[3] == 0x20:  # tunnelling request
+        cemi = frame[11]
+    elif frame[2] == 0x05 and frame[3] == 0x30:  # routing indication, no connection header
+        cemi = frame[7] - 4
+    else:
+        return None
+    if len(frame) < 21 + cemi or not frame[13 + cemi] & 0x80:  # individual destination
+        return None
+    return (frame[16 + cemi] << 8) | frame[17 + cemi]
+
+
+def decode_frames(buffers, offsets=None):
+    """
+    Decode many KNXnet/IP datagrams at once into columns of numpy arrays
+    No object is allocated per frame: the fields are gathered with vectorized indexing
+    over the datagrams. Requires numpy.
+    :param buffers: iterable of datagrams, or one bytes-like buffer holding concatenated datagrams
+    :param offsets: position of each datagram in the concatenated buffer. If None, the datagrams
+                    are expected back to back and are walked with their announced length
+    :return: FrameColumns object
+    """
+    if numpy is None:
+        raise KnxnetException('decode_frames requires numpy')
+    if isinstance(buffers, (bytes, bytearray, memoryview)):
+        if offsets is None:
+            offsets = _frame_offsets(buffers)
+        data = numpy.frombuffer(buffers, dtype=numpy.uint8)
+        offsets = numpy.asarray(offsets, dtype=numpy.int64)
+        lengths = None
+    else:
+        buffers = list(buffers)
+        lengths = numpy.fromiter((len(b) for b in buffers), dtype=numpy.int64, count=len(buffers))
+        data = numpy.frombuffer(b''.join(buffers), dtype=numpy.uint8)
+        offsets = numpy.zeros(len(buffers), dtype=numpy.int64)
+        numpy.cumsum(lengths[:-1], out=offsets[1:])
+    return FrameColumns.create_from_buffer(data, offsets, lengths)
+
+
+def _frame_offsets(buffer):
+    """
+    Offsets of back to back datagrams in buffer, found with the header frame_length
+    """
+    offsets = []
+    offset = 0
+    end = len(buffer)
+    while offset < end:
+        if end - offset < 6:
+            raise KnxnetException('Frame size is < 6 (offset {0})'.format(offset))
+        frame_length = (buffer[offset + 4] << 8) | buffer[offset + 5]
+        if frame_length < 6:
+            raise KnxnetException('Invalid frame length (offset {0})'.format(offset))
+        offsets.append(offset)
+        offset += frame_length
+    return offsets
 
 
 class ServiceTypeDescriptor(Enum):
@@ -35,19 +137,13 @@ class ServiceTypeDescriptor(Enum):
     DISCONNECT_RESPONSE = 0x020a
     TUNNELLING_REQUEST = 0x0420
     TUNNELLING_ACK = 0x0421
+    ROUTING_INDICATION = 0x0530
+    ROUTING_LOST_MESSAGE = 0x0531
+    ROUTING_BUSY = 0x0532
 
     @staticmethod
     def to_class(x):
-        return {
-            ServiceTypeDescriptor.CONNECTION_REQUEST: ConnectionRequest,
-            ServiceTypeDescriptor.CONNECTION_RESPONSE: ConnectionResponse,
-            ServiceTypeDescriptor.CONNECTION_STATE_REQUEST: ConnectionStateRequest,
-            ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE: ConnectionStateResponse,
-            ServiceTypeDescriptor.DISCONNECT_REQUEST: DisconnectRequest,
-            ServiceTypeDescriptor.DISCONNECT_RESPONSE: DisconnectResponse,
-            ServiceTypeDescriptor.TUNNELLING_REQUEST: TunnellingRequest,
-            ServiceTypeDescriptor.TUNNELLING_ACK: TunnellingAck
-            }[x]
+        return _FRAME_CLASSES.get(x)
 
 
 class KnxnetFrame():
@@ -60,7 +156,7 @@ class KnxnetFrame():
         return str([hex(h) for h in self.frame])
 
     @abstractclassmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         pass
 
     @abstractclassmethod
@@ -71,14 +167,53 @@ class KnxnetFrame():
     def __str__(self):
         pass
 
-    @abstractproperty
-    def frame(self):
+    @abstractmethod
+    def _fields(self):
+        """
+        Values packed with the frame layout, in order
+        """
         pass
 
+    def _layout(self):
+        """
+        Precompiled struct.Struct describing the whole frame
+        """
+        return self._STRUCT
+
+    @property
+    def frame(self):
+        layout = self._layout()
+        frame = bytearray(layout.size)
+        layout.pack_into(frame, 0, *self._fields())
+        return frame
+
+    def encode_into(self, buffer, offset=0):
+        """
+        Encode the frame directly into a caller-supplied buffer
+        :param buffer: writable buffer (bytearray, memoryview, ...)
+        :param offset: position of the first frame byte in the buffer
+        :return: number of bytes written
+        """
+        layout = self._layout()
+        layout.pack_into(buffer, offset, *self._fields())
+        return layout.size
+
+    @staticmethod
+    def _check_header(frame, header):
+        """
+        Parse the header if the caller did not already do it, and check the announced length
+        """
+        if header is None:
+            header = KnxnetHeader.create_from_frame(frame)
+        if len(frame) != header.frame_length:
+            raise KnxnetException('Invalid frame: effective total length != announced total length')
+        return header
+
 
 class KnxnetHeader(KnxnetFrame):
     HEADER_LENGTH = 0x06
     VERSION = 0x10
+    _STRUCT = struct.Struct('>BBHH')
 
     def __init__(self, header_length, version, service_type_descriptor, frame_length):
         super().__init__()
@@ -88,14 +223,13 @@ class KnxnetHeader(KnxnetFrame):
         self.frame_length = frame_length
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if len(frame) < 6:
             raise KnxnetException('Frame size is < 6')
-        header_length = frame[0]
-        version = frame[1]
-        service_type_descriptor = ServiceTypeDescriptor((frame[2] << 8) | frame[3])
-        frame_length = (frame[4] << 8) | frame[5]
-        return cls(header_length, version, service_type_descriptor, frame_length)
+        service_type_descriptor = _SERVICE_TYPES.get((frame[2] << 8) | frame[3])
+        if service_type_descriptor is None:
+            raise KnxnetException('Unknown service type descriptor')
+        return cls(frame[0], frame[1], service_type_descriptor, (frame[4] << 8) | frame[5])
 
     @classmethod
     def create_from_data(cls, service_type_descriptor, frame_length):
@@ -104,19 +238,12 @@ class KnxnetHeader(KnxnetFrame):
                    service_type_descriptor,
                    frame_length)
 
-    @property
-    def frame(self):
+    def _fields(self):
         """
-        Create the KNXnet header frame (6 bytes)
+        KNXnet header fields (6 bytes)
         """
-        frame = bytearray()
-        frame.append(self.header_length)
-        frame.append(self.version)
-        frame.append((self.service_type_descriptor.value >> 8) & 0xff)
-        frame.append(self.service_type_descriptor.value & 0xff)
-        frame.append((self.frame_length >> 8) & 0xff)
-        frame.append(self.frame_length & 0xff)
-        return frame
+        # Enum._value_ avoids the (slow) Enum.value descriptor on the encode path
+        return self.header_length, self.version, self.service_type_descriptor._value_, self.frame_length
 
     def __str__(self):
         out = '{:<25}'.format('header_length')
@@ -133,16 +260,29 @@ class KnxnetHeader(KnxnetFrame):
         return super().__repr__()
 
 
-class TunnellingRequest(KnxnetFrame):
+class CemiFrame(KnxnetFrame):
     """
-    TunnellingRequest KNXnet/IP frame
+    Base of the KNXnet/IP frames carrying a cEMI L_Data message: TunnellingRequest and RoutingIndication
     """
-
-    def __init__(self, knxnet_header, dest_addr_group, channel_id, data, data_size, apci, data_service, sequence_counter):
+    # struct format of the fields before the cEMI message, and offset of the cEMI message code
+    _PREFIX = '>BBHH'
+    CEMI_OFFSET = 6
+    # (additional info length, data size) -> struct.Struct of the whole frame, see _layout()
+    _STRUCTS = {}
+    # priority, bits 2 and 3 of control field 1
+    PRIORITY_SYSTEM = 0x0
+    PRIORITY_NORMAL = 0x1
+    PRIORITY_URGENT = 0x2
+    PRIORITY_LOW = 0x3
+    STANDARD_FRAME_MAX_DATA_SIZE = 15  # longer payloads need an extended frame
+    MAX_DATA_SIZE = 255
+    NO_SOURCE_ADDR = IndividualAddress.from_int(0)  # filled by the gateway
+
+    def __init__(self, knxnet_header, dest_addr_group, data, data_size, apci, data_service, source_addr=None,
+                 control_field_1=0xbc, control_field_2=0xe0, additional_info=b''):
         super().__init__()
         self.header = knxnet_header
-        self.dest_addr_group = dest_addr_group
-        self.channel_id = channel_id
+        self.dest_addr_group = dest_addr_group  # IndividualAddress if the destination address type is individual
         self.data_service = data_service  # See Data Service under
         """
         FROM NETWORK LAYER TO DATA LINK LAYER
@@ -157,113 +297,486 @@ class TunnellingRequest(KnxnetFrame):
         – L_Data.con 0x2E Data Service. Primitive used for local confirmation that a frame was sent (does not indicate a successful receive though)
         – L_Raw.con 0x2F )
         """
-        self.data = data
+        self.data = data  # int, or the payload bytes (memoryview over the datagram for decoded extended frames)
         self.data_size = data_size
         self.apci = apci  # (0x0 == group value read; 0x1 == group value response; 0x2 == group value write)
+        self.source_addr = source_addr if source_addr is not None else self.NO_SOURCE_ADDR
+        self.control_field_1 = control_field_1
+        self.control_field_2 = control_field_2
+        self.additional_info = additional_info  # raw additional info blocks (type id, length, data)
+
+    @classmethod
+    def _decode_cemi(cls, frame):
+        """
+        cEMI fields of a datagram, in __init__ order: dest_addr_group, data, data_size, apci, data_service,
+        source_addr, control_field_1, control_field_2, additional_info
+        """
+        start = cls.CEMI_OFFSET
+        data_service = frame[start]
+        additional_info_length = frame[start + 1]
+        cemi = start - 10 + additional_info_length  # shift from the tunnelling request offsets without additional info
+        additional_info = b''
+        if additional_info_length:
+            if len(frame) < 21 + cemi:
+                raise KnxnetException('Invalid frame: additional info exceeds the frame length')
+            additional_info = memoryview(frame)[start + 2:start + 2 + additional_info_length]
+        control_field_1 = frame[12 + cemi]
+        control_field_2 = frame[13 + cemi]
+        source_addr = IndividualAddress.from_int((frame[14 + cemi] << 8) | frame[15 + cemi])
+        if control_field_2 & 0x80:
+            dest_addr_group = GroupAddress.from_int((frame[16 + cemi] << 8) | frame[17 + cemi])
+        else:
+            dest_addr_group = IndividualAddress.from_int((frame[16 + cemi] << 8) | frame[17 + cemi])
+        data_size = frame[18 + cemi]
+        if data_size == 0 or len(frame) < 20 + cemi + data_size:
+            raise KnxnetException('Invalid frame: data size does not match the frame length')
+        apci = ((frame[19 + cemi] & 3) << 2) | (frame[20 + cemi] >> 6)
+        data = _data_from_frame(frame, cemi, data_size)
+        return (dest_addr_group, data, data_size, apci, data_service, source_addr, control_field_1, control_field_2,
+                additional_info)
+
+    @classmethod
+    def _encode_cemi(cls, dest_addr_group, data_size, source_addr, priority, repeat, hop_count):
+        """
+        :return: (dest_addr_group, source_addr, control_field_1, control_field_2) of create_from_data() parameters
+        """
+        if not isinstance(dest_addr_group, (GroupAddress, IndividualAddress)):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        if source_addr is not None and not isinstance(source_addr, IndividualAddress):
+            source_addr = IndividualAddress.from_str(source_addr)
+        if not 0 <= hop_count <= 7:
+            raise KnxnetException('Hop count must be 0 <= hop count <= 7')
+        control_field_1 = ((0x80 if data_size <= cls.STANDARD_FRAME_MAX_DATA_SIZE else 0x00) |  # frame type
+                           (0x00 if repeat else 0x20) |
+                           0x10 |  # broadcast (not system broadcast)
+                           ((priority & 3) << 2))
+        control_field_2 = (0x80 if isinstance(dest_addr_group, GroupAddress) else 0x00) | (hop_count << 4)
+        return dest_addr_group, source_addr, control_field_1, control_field_2
+
+    def value(self, dpt=None, registry=DEFAULT_REGISTRY):
+        """
+        Decode the data with its datapoint type
+        :param dpt: DPT id ('9.001') or Dpt object. None uses the DPT assigned to dest_addr_group in registry
+        """
+        return registry.resolve(dpt, self.dest_addr_group).decode(self.data)
+
+    @property
+    def extended_frame(self):
+        return not self.control_field_1 & 0x80
+
+    @property
+    def repeat(self):
+        return not self.control_field_1 & 0x20
+
+    @property
+    def system_broadcast(self):
+        return not self.control_field_1 & 0x10
+
+    @property
+    def priority(self):
+        return (self.control_field_1 >> 2) & 3
+
+    @property
+    def ack_request(self):
+        return bool(self.control_field_1 & 0x02)
+
+    @property
+    def confirm_error(self):
+        """
+        Negative L_Data.con: the frame was not sent on the bus
+        """
+        return bool(self.control_field_1 & 0x01)
+
+    @property
+    def hop_count(self):
+        return (self.control_field_2 >> 4) & 7
+
+    @property
+    def extended_frame_format(self):
+        return self.control_field_2 & 0xf
+
+    @property
+    def payload(self):
+        """
+        Payload bytes following the APCI, empty when data_size is 1
+        """
+        if self.data_size == 1:
+            return b''
+        if isinstance(self.data, int):
+            return _payload_bytes(self.data, self.data_size)
+        return self.data
+
+    def additional_info_blocks(self):
+        """
+        :return: list of (type id, data) of the additional info blocks
+        """
+        out = []
+        info = memoryview(self.additional_info)
+        offset = 0
+        while offset + 2 <= len(info):
+            length = info[offset + 1]
+            out.append((info[offset], info[offset + 2:offset + 2 + length]))
+            offset += 2 + length
+        return out
+
+    def _layout(self):
+        key = (len(self.additional_info), self.data_size)
+        layout = self._STRUCTS.get(key)
+        if layout is None:
+            additional_info_length, data_size = key
+            if not 0 < data_size <= self.MAX_DATA_SIZE:
+                raise KnxnetException('Invalid data size (must be 1 to 255)')
+            if additional_info_length > 0xff:
+                raise KnxnetException('Additional info is longer than 255 bytes')
+            additional_info_format = '{0}s'.format(additional_info_length) if additional_info_length else ''
+            payload_format = 'B' if data_size == 2 else '{0}s'.format(data_size - 1) if data_size > 2 else ''
+            layout = struct.Struct(self._PREFIX + 'BB' + additional_info_format + 'BBHHBBB' + payload_format)
+            self._STRUCTS[key] = layout
+        return layout
+
+    def _cemi_fields(self):
+        """
+        Values packed from the cEMI message code on
+        """
+        fields = (self.data_service, len(self.additional_info))
+        if self.additional_info:
+            fields += (bytes(self.additional_info),)
+        fields += (
+            self.control_field_1,
+            self.control_field_2,
+            self.source_addr.value,
+            self.dest_addr_group.value,
+            self.data_size,
+            (self.apci >> 2) & 3)  # The last 2 bits are the two msb for the APCI command
+        if self.data_size == 1:  # 6 bits or less
+            return fields + (((self.apci & 3) << 6) | (self.data & 0x3f),)  # the fist 2 bits are lsb APCI, then data
+        if self.data_size == 2:  # 1 byte
+            data = self.data
+            return fields + ((self.apci & 3) << 6, (data & 0xff) if isinstance(data, int) else data[0])
+        return fields + ((self.apci & 3) << 6, _payload_bytes(self.data, self.data_size))
+
+    def _cemi_str(self):
+        out = '{:<25}'.format('dest_addr_group')
+        out += '{:>10}\n'.format(str(self.dest_addr_group))
+        out += '{:<25}'.format('source_addr')
+        out += '{:>10}\n'.format(str(self.source_addr))
+        out += '{:<25}'.format('data_service')
+        out += '{:>10}\n'.format(hex(self.data_service))
+        out += '{:<25}'.format('control_field_1')
+        out += '{:>10}\n'.format(hex(self.control_field_1))
+        out += '{:<25}'.format('control_field_2')
+        out += '{:>10}\n'.format(hex(self.control_field_2))
+        out += '{:<25}'.format('data')
+        out += '{:>10}\n'.format(hex(self.data) if isinstance(self.data, int) else bytes(self.data).hex())
+        out += '{:<25}'.format('data_size')
+        out += '{:>10}\n'.format(hex(self.data_size))
+        out += '{:<25}'.format('apci')
+        out += '{:>10}\n'.format(hex(self.apci))
+        return out
+
+
+class TunnellingRequest(CemiFrame):
+    """
+    TunnellingRequest KNXnet/IP frame, carrying a cEMI L_Data message
+    """
+    # KNXnet header, connection header (structure length, channel id, sequence counter, reserved),
+    # cEMI (message code, additional info length, [additional info], control field 1, control field 2,
+    # source address, destination address, data size, APCI msb, APCI lsb + data, [payload])
+    _PREFIX = '>BBHH' + 'BBBB'
+    CEMI_OFFSET = 10
+    _STRUCTS = {
+        (0, 1): struct.Struct('>BBHH' + 'BBBB' + 'BBBBHHBBB'),
+        (0, 2): struct.Struct('>BBHH' + 'BBBB' + 'BBBBHHBBBB')
+    }
+
+    def __init__(self, knxnet_header, dest_addr_group, channel_id, data, data_size, apci, data_service, sequence_counter,
+                 source_addr=None, control_field_1=0xbc, control_field_2=0xe0, additional_info=b''):
+        super().__init__(knxnet_header, dest_addr_group, data, data_size, apci, data_service, source_addr,
+                         control_field_1, control_field_2, additional_info)
+        self.channel_id = channel_id
         self.sequence_counter = sequence_counter
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         """
         Create the Tunnelling request object from a frame
-        :param frame: knx tunnelling request datagram frame (list of bytes)
+        :param frame: knx tunnelling request datagram frame (bytes, bytearray or memoryview)
+        :param header: KnxnetHeader already decoded from this frame, if any
         """
         if frame is None:
             raise KnxnetException('Tunnelling request frame is None')
-        if len(frame) < 16:
-            raise KnxnetException('Tunnelling request length is < 16')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[1]
-        sequence_counter = raw_body[2]
-        data_service = raw_body[4]
-        dest_addr_group = GroupAddress.from_bytes(raw_body[10:12])
-        data_size = raw_body[12]
-        if data_size > 2:
-            raise KnxnetException('Invalid frame: Unsupported datapoint type (data size > 2')
-        apci = (raw_body[13] & 3 << 2) | (raw_body[14] >> 6)
-        # only two datapoint types are supported:
-        data = 0
-        if data_size == 1:  # boolean
-            data = raw_body[14] & 1
-        elif data_size == 2:  # 8 bits unsigned
-            data = raw_body[15]
-        return cls(header, dest_addr_group, channel_id, data, data_size, apci, data_service, sequence_counter)
+        if len(frame) < 21:
+            raise KnxnetException('Tunnelling request length is < 21')
+        header = cls._check_header(frame, header)
+        # body offsets are relative to the start of the datagram (6 bytes header)
+        channel_id = frame[7]
+        sequence_counter = frame[8]
+        (dest_addr_group, data, data_size, apci, data_service, source_addr, control_field_1, control_field_2,
+         additional_info) = cls._decode_cemi(frame)
+        return cls(header, dest_addr_group, channel_id, data, data_size, apci, data_service, sequence_counter,
+                   source_addr, control_field_1, control_field_2, additional_info)
 
     @classmethod
-    def create_from_data(cls, dest_addr_group, channel_id, data, data_size, apci=0x2, data_service=0x11, sequence_counter=0x0):
+    def create_from_data(cls, dest_addr_group, channel_id, data, data_size, apci=0x2, data_service=0x11,
+                         sequence_counter=0x0, source_addr=None, priority=CemiFrame.PRIORITY_LOW, repeat=False,
+                         hop_count=6, additional_info=b''):
         """
         Create the Tunnelling request object from data
-        :param dest_addr_group: GroupAddress object, or string
+        :param dest_addr_group: GroupAddress object, or string. IndividualAddress object for a point to point frame
         :param channel_id: 1 byte with channel ID
-        :param data: effective data
-        :param data_size: data size in byte
+        :param data: effective data, the payload bytes as a big endian unsigned integer, or as bytes
+        :param data_size: data size in byte: 1 for 6 bits or less, else 1 + payload length (up to 255, extended
+                          frame above 15)
         :param apci: APCI command. 0x2 is group value write    0 is group value read
+        :param source_addr: IndividualAddress object, or string. None is 0.0.0, filled by the gateway
+        :param priority: TunnellingRequest.PRIORITY_*
+        :param repeat: repeat the frame on the bus if it is not acknowledged
+        :param hop_count: routing counter, 0 to 7
+        :param additional_info: raw cEMI additional info blocks
         """
-        frame_length = 0x14 + data_size
+        dest, source_addr, control_field_1, control_field_2 = cls._encode_cemi(dest_addr_group, data_size, source_addr,
+                                                                               priority, repeat, hop_count)
+        frame_length = 0x14 + len(additional_info) + data_size
         header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.TUNNELLING_REQUEST, frame_length)
-        if isinstance(dest_addr_group, GroupAddress):
-            dest = dest_addr_group
-        else:
-            dest = GroupAddress.from_str(dest_addr_group)
-        return cls(header, dest, channel_id, data, data_size, apci, data_service, sequence_counter)
+        return cls(header, dest, channel_id, data, data_size, apci, data_service, sequence_counter,
+                   source_addr, control_field_1, control_field_2, additional_info)
 
-    @property
-    def frame(self):
-        # KNXnet header
-        frame = self.header.frame
-        # Connection header
-        frame.append(0x04)  # structure length
-        frame.append(self.channel_id & 0xff)  # channel id
-        frame.append(self.sequence_counter)  # sequence counter
-        frame.append(0x00)  # reserved
-        # cEMI
-        frame.append(self.data_service) #frame.append(0x11)  # message code = data service transmitting
-        frame.append(0x00)  # no additionnal info
-        frame.append(0xbc)  # control byte
-        frame.append(0xe0)  # DRL byte
-        frame.append(0x00)  # Source address (filled by gateway)
-        frame.append(0x00)
-        frame += self.dest_addr_group.frame  # destination address group
-        frame.append(self.data_size)  # routing (4 bits) + data size (4 bits)
-        frame.append(0x0 | ((self.apci >> 2) & 3))  # The last 2 bits are the two msb for the APCI command
-        # only two datapoint types are supported:
-        if self.data_size == 1:  # boolean
-            frame.append(((self.apci & 3) << 6) | (self.data & 1))  # the fist 2 bits are lsb APCI, bit 0 is data
-        elif self.data_size == 2:  # 8 bits unsigned
-            frame.append((self.apci & 3) << 6)  # the fist 2 bits are lsb APCI
-            frame.append(self.data & 0xFF)  # data
-        return frame
+    @classmethod
+    def create_from_value(cls, dest_addr_group, channel_id, value, dpt=None, apci=0x2, data_service=0x11,
+                          sequence_counter=0x0, registry=DEFAULT_REGISTRY):
+        """
+        Create the Tunnelling request object from a physical value, encoded by its datapoint type
+        :param dpt: DPT id ('9.001') or Dpt object. None uses the DPT assigned to dest_addr_group in registry
+        """
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        codec = registry.resolve(dpt, dest_addr_group)
+        return cls.create_from_data(dest_addr_group, channel_id, codec.encode(value), codec.data_size, apci,
+                                    data_service, sequence_counter)
+
+    def _fields(self):
+        header = self.header
+        return (
+            header.header_length, header.version, header.service_type_descriptor._value_, header.frame_length,
+            0x04,  # structure length
+            self.channel_id & 0xff,
+            self.sequence_counter,
+            0x00) + self._cemi_fields()  # reserved
 
     def __str__(self):
         out = str(self.header)
-        out += '{:<25}'.format('dest_addr_group')
-        out += '{:>10}\n'.format(str(self.dest_addr_group))
         out += '{:<25}'.format('channel_id')
         out += '{:>10}\n'.format(hex(self.channel_id))
         out += '{:<25}'.format('sequence_counter')
         out += '{:>10}\n'.format(hex(self.sequence_counter))
-        out += '{:<25}'.format('data_service')
-        out += '{:>10}\n'.format(hex(self.data_service))
-        out += '{:<25}'.format('data')
-        out += '{:>10}\n'.format(hex(self.data))
-        out += '{:<25}'.format('data_size')
-        out += '{:>10}\n'.format(hex(self.data_size))
-        out += '{:<25}'.format('apci')
-        out += '{:>10}\n'.format(hex(self.apci))
+        out += self._cemi_str()
         return out
 
     def __repr__(self):
         return super().__repr__()
 
 
+class TunnellingRequestTemplate():
+    """
+    TunnellingRequest frame pre-encoded for a fixed destination group, channel id, data size,
+    APCI and data service. Only the sequence counter and the data bytes are patched per telegram.
+    """
+    SEQUENCE_COUNTER_OFFSET = 8
+
+    def __init__(self, dest_addr_group, channel_id, data_size, apci=0x2, data_service=0x11):
+        request = TunnellingRequest.create_from_data(dest_addr_group, channel_id, 0, data_size, apci, data_service)
+        self.dest_addr_group = request.dest_addr_group
+        self.channel_id = channel_id
+        self.data_size = data_size
+        self.apci = apci
+        self.data_service = data_service
+        self._frame = bytes(request.frame)
+        self._apci_lsb = (apci & 3) << 6
+
+    def __len__(self):
+        return len(self._frame)
+
+    def encode_into(self, buffer, offset, data, sequence_counter=0x0):
+        """
+        Copy the pre-encoded frame into buffer and patch the sequence counter and the data
+        :return: number of bytes written
+        """
+        size = len(self._frame)
+        buffer[offset:offset + size] = self._frame
+        buffer[offset + self.SEQUENCE_COUNTER_OFFSET] = sequence_counter
+        if self.data_size == 1:  # 6 bits or less, shares its byte with the APCI lsb
+            buffer[offset + 20] = self._apci_lsb | (data & 0x3f)
+        elif self.data_size == 2:  # 1 byte
+            buffer[offset + 21] = data & 0xff
+        else:
+            buffer[offset + 21:offset + size] = _payload_bytes(data, self.data_size)
+        return size
+
+    def frame(self, data, sequence_counter=0x0):
+        """
+        Ready to send frame for this data and sequence counter
+        """
+        frame = bytearray(self._frame)
+        self.encode_into(frame, 0, data, sequence_counter)
+        return frame
+
+
+class TunnellingRequestCache():
+    """
+    LRU bounded cache of TunnellingRequestTemplate, keyed by
+    (dest_addr_group, channel_id, data_size, apci, data_service)
+    """
+
+    def __init__(self, max_templates=256):
+        if max_templates < 1:
+            raise KnxnetException('The cache must hold at least one template')
+        self.max_templates = max_templates
+        self._templates = OrderedDict()
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, dest_addr_group, channel_id, data_size, apci=0x2, data_service=0x11):
+        """
+        Get the template, pre-encoding it if it is not cached
+        :param dest_addr_group: GroupAddress object, or string
+        """
+        key = (dest_addr_group, channel_id, data_size, apci, data_service)
+        template = self._templates.get(key)
+        if template is None:
+            template = TunnellingRequestTemplate(dest_addr_group, channel_id, data_size, apci, data_service)
+            self._templates[key] = template
+            if len(self._templates) > self.max_templates:
+                self._templates.popitem(last=False)
+        else:
+            self._templates.move_to_end(key)
+        return template
+
+    def frame(self, dest_addr_group, channel_id, data, data_size, apci=0x2, data_service=0x11, sequence_counter=0x0):
+        """
+        Same parameters as TunnellingRequest.create_from_data(), returns the ready to send frame
+        """
+        return self.get(dest_addr_group, channel_id, data_size, apci, data_service).frame(data, sequence_counter)
+
+    def clear(self):
+        self._templates.clear()
+
+
+class TunnellingRequestView():
+    """
+    Lazy TunnellingRequest over the datagram buffer, see decode_frame(frame, lazy=True)
+    Single byte fields are read from the buffer on each access, the other fields are decoded
+    on first access and cached. Only the announced length and the additional info length are
+    checked up front, so that every field is in the frame, the rest of the validation is done
+    by materialize().
+    """
+
+    def __init__(self, frame):
+        length = len(frame)
+        if length != ((frame[4] << 8) | frame[5]):
+            raise KnxnetException('Invalid frame: effective total length != announced total length')
+        if length < 21 + frame[11]:
+            raise KnxnetException('Invalid frame: additional info exceeds the frame length')
+        self._frame = frame
+
+    def __repr__(self):
+        return str([hex(h) for h in self._frame])
+
+    def __str__(self):
+        return str(self.materialize())
+
+    @property
+    def frame(self):
+        return self._frame
+
+    @property
+    def channel_id(self):
+        return self._frame[7]
+
+    @property
+    def sequence_counter(self):
+        return self._frame[8]
+
+    @property
+    def data_service(self):
+        return self._frame[10]
+
+    @property
+    def _cemi(self):
+        """
+        Offset of the cEMI fields past the additional info
+        """
+        return self._frame[11]
+
+    @property
+    def control_field_1(self):
+        return self._frame[12 + self._cemi]
+
+    @property
+    def control_field_2(self):
+        return self._frame[13 + self._cemi]
+
+    @property
+    def data_size(self):
+        return self._frame[18 + self._cemi]
+
+    @property
+    def apci(self):
+        frame = self._frame
+        cemi = frame[11]
+        return ((frame[19 + cemi] & 3) << 2) | (frame[20 + cemi] >> 6)
+
+    @cached_property
+    def header(self):
+        return KnxnetHeader.create_from_frame(self._frame)
+
+    @cached_property
+    def dest_addr_group(self):
+        frame = self._frame
+        cemi = frame[11]
+        value = (frame[16 + cemi] << 8) | frame[17 + cemi]
+        if frame[13 + cemi] & 0x80:
+            return GroupAddress.from_int(value)
+        return IndividualAddress.from_int(value)
+
+    @cached_property
+    def source_addr(self):
+        frame = self._frame
+        cemi = frame[11]
+        return IndividualAddress.from_int((frame[14 + cemi] << 8) | frame[15 + cemi])
+
+    @cached_property
+    def data(self):
+        frame = self._frame
+        cemi = frame[11]
+        data_size = frame[18 + cemi]
+        if data_size == 0 or len(frame) < 20 + cemi + data_size:
+            raise KnxnetException('Invalid frame: data size does not match the frame length')
+        return _data_from_frame(frame, cemi, data_size)
+
+    def value(self, dpt=None, registry=DEFAULT_REGISTRY):
+        """
+        See TunnellingRequest.value()
+        """
+        return registry.resolve(dpt, self.dest_addr_group).decode(self.data)
+
+    def materialize(self):
+        """
+        Fully decoded and validated TunnellingRequest
+        """
+        return self._materialized
+
+    @cached_property
+    def _materialized(self):
+        return TunnellingRequest.create_from_frame(self._frame, self.header)
+
+
 class TunnellingAck(KnxnetFrame):
     """
     Tunnelling ack KNXnet/IP frame
     """
+    # KNXnet header, structure length, channel id, sequence counter, status
+    _STRUCT = struct.Struct('>BBHH' + 'BBBB')
 
     def __init__(self, knxnet_header, channel_id, status, sequence_counter):
         super().__init__()
@@ -273,20 +786,13 @@ class TunnellingAck(KnxnetFrame):
         self.sequence_counter = sequence_counter
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Tunnelling ack frame is None')
         if len(frame) != 10:
             raise KnxnetException('Tunnelling ack length must be 10 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[1]
-        sequence_counter = raw_body[2]
-        status = raw_body[3]
-        return cls(header, channel_id, status, sequence_counter)
+        header = cls._check_header(frame, header)
+        return cls(header, frame[7], frame[9], frame[8])
 
     @classmethod
     def create_from_data(cls, channel_id, status, sequence_counter=0x0):
@@ -294,14 +800,8 @@ class TunnellingAck(KnxnetFrame):
         header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.TUNNELLING_ACK, frame_length)
         return cls(header, channel_id, status, sequence_counter)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(0x04)  # structure length
-        frame.append(self.channel_id)
-        frame.append(self.sequence_counter)
-        frame.append(self.status)
-        return frame
+    def _fields(self):
+        return self.header._fields() + (0x04, self.channel_id, self.sequence_counter, self.status)
 
     def __str__(self):
         out = str(self.header)
@@ -321,6 +821,8 @@ class ConnectionRequest(KnxnetFrame):
     """
     Connection_request KNXnet/IP frame
     """
+    # KNXnet header, control endpoint, data endpoint, CRI
+    _STRUCT = struct.Struct('>BBHH' + Hpai.LAYOUT + Hpai.LAYOUT + 'BBBB')
 
     def __init__(self, knxnet_header, control_endpoint, data_endpoint):
         super().__init__()
@@ -329,18 +831,14 @@ class ConnectionRequest(KnxnetFrame):
         self.data_endpoint = data_endpoint
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Connection request frame is None')
         if len(frame) < 24:
             raise KnxnetException('Connection request length must >= 24 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        control_endpoint = Hpai.from_frame(raw_body[:8])
-        data_endpoint = Hpai.from_frame(raw_body[8:16])
+        header = cls._check_header(frame, header)
+        control_endpoint = Hpai.from_frame(frame, 6)
+        data_endpoint = Hpai.from_frame(frame, 14)
         return cls(header, control_endpoint, data_endpoint)
 
     @classmethod
@@ -361,19 +859,11 @@ class ConnectionRequest(KnxnetFrame):
             data_endpt = Hpai.from_data(data_endpoint[0], data_endpoint[1])
         return cls(header, ctrl_endpt, data_endpt)
 
-    @property
-    def frame(self):
-        # KNXnet header
-        frame = self.header.frame
-        # HPAI
-        frame += self.control_endpoint.frame
-        frame += self.data_endpoint.frame
-        # CRI (Connection request info) to be defined
-        frame.append(0x04)  # structure length
-        frame.append(0x04)  # Tunnel Connection
-        frame.append(0x02)  # KNX Tunnel link layer
-        frame.append(0x00)  # Reserved
-        return frame
+    def _fields(self):
+        # CRI (Connection request info) to be defined: structure length, tunnel connection,
+        # KNX tunnel link layer, reserved
+        return (self.header._fields() + self.control_endpoint.fields() + self.data_endpoint.fields() +
+                (0x04, 0x04, 0x02, 0x00))
 
     def __str__(self):
         out = str(self.header)
@@ -391,6 +881,8 @@ class ConnectionResponse(KnxnetFrame):
     """
     Connection_response KNXnet/IP frame
     """
+    # KNXnet header, channel id, status, data endpoint, CRD
+    _STRUCT = struct.Struct('>BBHH' + 'BB' + Hpai.LAYOUT + 'BBBB')
 
     def __init__(self, knxnet_header, channel_id, status, data_endpoint):
         super().__init__()
@@ -400,20 +892,14 @@ class ConnectionResponse(KnxnetFrame):
         self.data_endpoint = data_endpoint
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Connection response frame is None')
         if len(frame) < 18:
             raise KnxnetException('Connection response length must be >= 18 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[0]
-        status = raw_body[1]
-        data_endpoint = Hpai.from_frame(raw_body[2:10])
-        return cls(header, channel_id, status, data_endpoint)
+        header = cls._check_header(frame, header)
+        data_endpoint = Hpai.from_frame(frame, 8)
+        return cls(header, frame[6], frame[7], data_endpoint)
 
     @classmethod
     def create_from_data(cls, channel_id, status, data_endpoint):
@@ -430,18 +916,10 @@ class ConnectionResponse(KnxnetFrame):
             data_endpt = Hpai.from_data(data_endpoint[0], data_endpoint[1])
         return cls(header, channel_id, status, data_endpt)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(self.channel_id)
-        frame.append(self.status)
-        frame += self.data_endpoint.frame
+    def _fields(self):
         # CRD (connection response data) is to be defined
-        frame.append(0x04)
-        frame.append(0x04)
-        frame.append(0xff)
-        frame.append(0xff)
-        return frame
+        return (self.header._fields() + (self.channel_id, self.status) + self.data_endpoint.fields() +
+                (0x04, 0x04, 0xff, 0xff))
 
     def __str__(self):
         out = str(self.header)
@@ -461,6 +939,8 @@ class ConnectionStateRequest(KnxnetFrame):
     """
     Connection state request KNXnet/IP frame
     """
+    # KNXnet header, channel id, reserved, control endpoint
+    _STRUCT = struct.Struct('>BBHH' + 'BB' + Hpai.LAYOUT)
 
     def __init__(self, knxnet_header, channel_id, control_endpoint):
         super().__init__()
@@ -469,19 +949,14 @@ class ConnectionStateRequest(KnxnetFrame):
         self.control_endpoint = control_endpoint
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Connection state request frame is None')
         if len(frame) != 16:
             raise KnxnetException('Connection state request length must be 16 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[0]
-        control_endpoint = Hpai.from_frame(raw_body[2:10])
-        return cls(header, channel_id, control_endpoint)
+        header = cls._check_header(frame, header)
+        control_endpoint = Hpai.from_frame(frame, 8)
+        return cls(header, frame[6], control_endpoint)
 
     @classmethod
     def create_from_data(cls, channel_id, control_endpoint):
@@ -497,13 +972,8 @@ class ConnectionStateRequest(KnxnetFrame):
             ctrl_endpt = Hpai.from_data(control_endpoint[0], control_endpoint[1])
         return cls(header, channel_id, ctrl_endpt)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(self.channel_id)
-        frame.append(0x00)
-        frame += self.control_endpoint.frame
-        return frame
+    def _fields(self):
+        return self.header._fields() + (self.channel_id, 0x00) + self.control_endpoint.fields()
 
     def __str__(self):
         out = str(self.header)
@@ -521,6 +991,8 @@ class ConnectionStateResponse(KnxnetFrame):
     """
     Connection state response KNXnet/IP frame
     """
+    # KNXnet header, channel id, status
+    _STRUCT = struct.Struct('>BBHH' + 'BB')
 
     def __init__(self, knxnet_header, channel_id, status):
         super().__init__()
@@ -529,19 +1001,13 @@ class ConnectionStateResponse(KnxnetFrame):
         self.status = status
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Connection state response frame is None')
         if len(frame) != 8:
             raise KnxnetException('Connection state response length must be 8 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[0]
-        status = raw_body[1]
-        return cls(header, channel_id, status)
+        header = cls._check_header(frame, header)
+        return cls(header, frame[6], frame[7])
 
     @classmethod
     def create_from_data(cls, channel_id, status):
@@ -549,12 +1015,8 @@ class ConnectionStateResponse(KnxnetFrame):
         header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE, frame_length)
         return cls(header, channel_id, status)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(self.channel_id)
-        frame.append(self.status)
-        return frame
+    def _fields(self):
+        return self.header._fields() + (self.channel_id, self.status)
 
     def __str__(self):
         out = str(self.header)
@@ -572,6 +1034,8 @@ class DisconnectRequest(KnxnetFrame):
     """
     Disconnect request KNXnet/IP frame
     """
+    # KNXnet header, channel id, reserved, control endpoint
+    _STRUCT = struct.Struct('>BBHH' + 'BB' + Hpai.LAYOUT)
 
     def __init__(self, knxnet_header, channel_id, control_endpoint):
         super().__init__()
@@ -580,19 +1044,14 @@ class DisconnectRequest(KnxnetFrame):
         self.control_endpoint = control_endpoint
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Disconnect request frame is None')
         if len(frame) != 16:
             raise KnxnetException('Disconnect request length must be 16 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[0]
-        control_endpoint = Hpai.from_frame(raw_body[2:10])
-        return cls(header, channel_id, control_endpoint)
+        header = cls._check_header(frame, header)
+        control_endpoint = Hpai.from_frame(frame, 8)
+        return cls(header, frame[6], control_endpoint)
 
     @classmethod
     def create_from_data(cls, channel_id, control_endpoint):
@@ -608,13 +1067,8 @@ class DisconnectRequest(KnxnetFrame):
             ctrl_endpt = Hpai.from_data(control_endpoint[0], control_endpoint[1])
         return cls(header, channel_id, ctrl_endpt)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(self.channel_id)
-        frame.append(0x00)
-        frame += self.control_endpoint.frame
-        return frame
+    def _fields(self):
+        return self.header._fields() + (self.channel_id, 0x00) + self.control_endpoint.fields()
 
     def __str__(self):
         out = str(self.header)
@@ -632,6 +1086,8 @@ class DisconnectResponse(KnxnetFrame):
     """
     Disconnect response KNXnet/IP frame
     """
+    # KNXnet header, channel id, status
+    _STRUCT = struct.Struct('>BBHH' + 'BB')
 
     def __init__(self, knxnet_header, channel_id, status):
         super().__init__()
@@ -640,19 +1096,13 @@ class DisconnectResponse(KnxnetFrame):
         self.status = status
 
     @classmethod
-    def create_from_frame(cls, frame):
+    def create_from_frame(cls, frame, header=None):
         if frame is None:
             raise KnxnetException('Disconnect response frame is None')
         if len(frame) != 8:
             raise KnxnetException('Disconnect response length must be 8 bytes')
-        raw_header = frame[:6]
-        raw_body = frame[6:]
-        header = KnxnetHeader.create_from_frame(raw_header)
-        if len(frame) != header.frame_length:
-            raise KnxnetException('Invalid frame: effective total length != announced total length')
-        channel_id = raw_body[0]
-        status = raw_body[1]
-        return cls(header, channel_id, status)
+        header = cls._check_header(frame, header)
+        return cls(header, frame[6], frame[7])
 
     @classmethod
     def create_from_data(cls, channel_id, status):
@@ -660,12 +1110,8 @@ class DisconnectResponse(KnxnetFrame):
         header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.DISCONNECT_RESPONSE, frame_length)
         return cls(header, channel_id, status)
 
-    @property
-    def frame(self):
-        frame = self.header.frame
-        frame.append(self.channel_id)
-        frame.append(self.status)
-        return frame
+    def _fields(self):
+        return self.header._fields() + (self.channel_id, self.status)
 
     def __str__(self):
         out = str(self.header)
@@ -679,9 +1125,351 @@ class DisconnectResponse(KnxnetFrame):
         return super().__repr__()
 
 
+class RoutingIndication(CemiFrame):
+    """
+    Routing indication KNXnet/IP frame, a cEMI L_Data message multicast to the KNXnet/IP routers
+    """
+    # KNXnet header, cEMI (message code, additional info length, [additional info], control field 1,
+    # control field 2, source address, destination address, data size, APCI msb, APCI lsb + data, [payload])
+    _PREFIX = '>BBHH'
+    CEMI_OFFSET = 6
+    _STRUCTS = {}
+
+    @classmethod
+    def create_from_frame(cls, frame, header=None):
+        """
+        Create the Routing indication object from a frame
+        :param frame: knx routing indication datagram frame (bytes, bytearray or memoryview)
+        :param header: KnxnetHeader already decoded from this frame, if any
+        """
+        if frame is None:
+            raise KnxnetException('Routing indication frame is None')
+        if len(frame) < 17:
+            raise KnxnetException('Routing indication length is < 17')
+        header = cls._check_header(frame, header)
+        return cls(header, *cls._decode_cemi(frame))
+
+    @classmethod
+    def create_from_data(cls, dest_addr_group, data, data_size, apci=0x2, data_service=0x29, source_addr=None,
+                         priority=CemiFrame.PRIORITY_LOW, repeat=False, hop_count=6, additional_info=b''):
+        """
+        Create the Routing indication object from data
+        Same parameters as TunnellingRequest.create_from_data(), without channel id and sequence counter.
+        The data service of routed frames is L_Data.ind (0x29).
+        """
+        dest, source_addr, control_field_1, control_field_2 = cls._encode_cemi(dest_addr_group, data_size, source_addr,
+                                                                               priority, repeat, hop_count)
+        frame_length = 0x10 + len(additional_info) + data_size
+        header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.ROUTING_INDICATION, frame_length)
+        return cls(header, dest, data, data_size, apci, data_service, source_addr, control_field_1, control_field_2,
+                   additional_info)
+
+    @classmethod
+    def create_from_value(cls, dest_addr_group, value, dpt=None, apci=0x2, registry=DEFAULT_REGISTRY, **kwargs):
+        """
+        Create the Routing indication object from a physical value, encoded by its datapoint type
+        :param dpt: DPT id ('9.001') or Dpt object. None uses the DPT assigned to dest_addr_group in registry
+        :param kwargs: see create_from_data()
+        """
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        codec = registry.resolve(dpt, dest_addr_group)
+        return cls.create_from_data(dest_addr_group, codec.encode(value), codec.data_size, apci, **kwargs)
+
+    def _fields(self):
+        header = self.header
+        return (header.header_length, header.version, header.service_type_descriptor._value_,
+                header.frame_length) + self._cemi_fields()
+
+    def __str__(self):
+        return str(self.header) + self._cemi_str()
+
+    def __repr__(self):
+        return super().__repr__()
+
+
+class RoutingLostMessage(KnxnetFrame):
+    """
+    Routing lost message KNXnet/IP frame: a router dropped routing indications, its queue was full
+    """
+    # KNXnet header, structure length, device state, number of lost messages
+    _STRUCT = struct.Struct('>BBHH' + 'BBH')
+
+    def __init__(self, knxnet_header, device_state, lost_messages):
+        super().__init__()
+        self.header = knxnet_header
+        self.device_state = device_state
+        self.lost_messages = lost_messages
+
+    @classmethod
+    def create_from_frame(cls, frame, header=None):
+        if frame is None:
+            raise KnxnetException('Routing lost message frame is None')
+        if len(frame) != 10:
+            raise KnxnetException('Routing lost message length must be 10 bytes')
+        header = cls._check_header(frame, header)
+        return cls(header, frame[7], (frame[8] << 8) | frame[9])
+
+    @classmethod
+    def create_from_data(cls, lost_messages, device_state=0x00):
+        frame_length = 10
+        header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.ROUTING_LOST_MESSAGE, frame_length)
+        return cls(header, device_state, lost_messages)
+
+    def _fields(self):
+        return self.header._fields() + (0x04, self.device_state, self.lost_messages)
+
+    def __str__(self):
+        out = str(self.header)
+        out += '{:<25}'.format('device_state')
+        out += '{:>10}\n'.format(hex(self.device_state))
+        out += '{:<25}'.format('lost_messages')
+        out += '{:>10}\n'.format(str(self.lost_messages))
+        return out
+
+    def __repr__(self):
+        return super().__repr__()
+
+
+class RoutingBusy(KnxnetFrame):
+    """
+    Routing busy KNXnet/IP frame: a router asks the senders to pause for wait_time milliseconds
+    """
+    # KNXnet header, structure length, device state, routing busy wait time (ms), routing busy control field
+    _STRUCT = struct.Struct('>BBHH' + 'BBHH')
+
+    def __init__(self, knxnet_header, device_state, wait_time, control_field):
+        super().__init__()
+        self.header = knxnet_header
+        self.device_state = device_state
+        self.wait_time = wait_time
+        self.control_field = control_field  # 0x0000: all the devices must pause
+
+    @classmethod
+    def create_from_frame(cls, frame, header=None):
+        if frame is None:
+            raise KnxnetException('Routing busy frame is None')
+        if len(frame) != 12:
+            raise KnxnetException('Routing busy length must be 12 bytes')
+        header = cls._check_header(frame, header)
+        return cls(header, frame[7], (frame[8] << 8) | frame[9], (frame[10] << 8) | frame[11])
+
+    @classmethod
+    def create_from_data(cls, wait_time, device_state=0x00, control_field=0x0000):
+        """
+        :param wait_time: pause asked to the senders, in milliseconds
+        """
+        frame_length = 12
+        header = KnxnetHeader.create_from_data(ServiceTypeDescriptor.ROUTING_BUSY, frame_length)
+        return cls(header, device_state, wait_time, control_field)
+
+    def _fields(self):
+        return self.header._fields() + (0x06, self.device_state, self.wait_time, self.control_field)
+
+    def __str__(self):
+        out = str(self.header)
+        out += '{:<25}'.format('device_state')
+        out += '{:>10}\n'.format(hex(self.device_state))
+        out += '{:<25}'.format('wait_time')
+        out += '{:>10}\n'.format(str(self.wait_time))
+        out += '{:<25}'.format('control_field')
+        out += '{:>10}\n'.format(hex(self.control_field))
+        return out
+
+    def __repr__(self):
+        return super().__repr__()
+
+
+class FrameColumns():
+    """
+    Result of decode_frames(): one numpy array per field, one row per datagram
+    Tunnelling request fields are 0 in the rows of other service types.
+    """
+    _FIELDS = ('offset', 'frame_length', 'service_type_descriptor', 'channel_id', 'sequence_counter', 'data_service',
+               'dest_addr_group', 'apci', 'data_size', 'data', 'source_addr', 'priority', 'hop_count')
+
+    def __init__(self, offset, frame_length, service_type_descriptor, channel_id, sequence_counter, data_service,
+                 dest_addr_group, apci, data_size, data, source_addr, priority, hop_count):
+        self.offset = offset
+        self.frame_length = frame_length
+        self.service_type_descriptor = service_type_descriptor  # raw 16 bits value
+        self.channel_id = channel_id
+        self.sequence_counter = sequence_counter
+        self.data_service = data_service
+        self.dest_addr_group = dest_addr_group  # packed 16 bits group address
+        self.apci = apci
+        self.data_size = data_size
+        self.data = data
+        self.source_addr = source_addr  # packed 16 bits individual address
+        self.priority = priority
+        self.hop_count = hop_count
+
+    @classmethod
+    def create_from_buffer(cls, data, offsets, lengths=None):
+        """
+        Gather the columns from concatenated datagrams
+        :param data: numpy uint8 array holding the datagrams
+        :param offsets: numpy int64 array, position of each datagram in data
+        :param lengths: effective length of each datagram, checked against the announced one if given
+        """
+        count = len(offsets)
+        end = len(data)
+        cls._check(offsets + 6 > end, offsets, 'Frame size is < 6')
+        service_type_descriptor = (data[offsets + 2].astype(numpy.uint16) << 8) | data[offsets + 3]
+        frame_length = (data[offsets + 4].astype(numpy.uint16) << 8) | data[offsets + 5]
+        cls._check(offsets + frame_length > end, offsets, 'Invalid frame: announced total length exceeds the buffer')
+        if lengths is not None:
+            cls._check(lengths != frame_length, offsets,
+                       'Invalid frame: effective total length != announced total length')
+        cls._check(~numpy.isin(service_type_descriptor, list(_SERVICE_TYPES)), offsets,
+                   'Unknown service type descriptor')
+
+        is_tunnelling = service_type_descriptor == ServiceTypeDescriptor.TUNNELLING_REQUEST.value
+        cls._check(is_tunnelling & (frame_length < 21), offsets, 'Tunnelling request length is < 21')
+        t = offsets[is_tunnelling]
+        t_frame_length = frame_length[is_tunnelling].astype(numpy.int64)
+        # cEMI offsets below are for no additional info, c shifts them past it
+        additional_info_length = data[t + 11].astype(numpy.int64)
+        cls._check(t_frame_length < 21 + additional_info_length, t,
+                   'Invalid frame: additional info exceeds the frame length')
+        c = t + additional_info_length
+        t_data_size = data[c + 18]
+        cls._check((t_data_size == 0) | (t_frame_length < 20 + additional_info_length + t_data_size), t,
+                   'Invalid frame: data size does not match the frame length')
+        t_apci = ((data[c + 19] & 3) << 2) | (data[c + 20] >> 6)
+        # data size 1: 6 bits of byte 20, else the payload bytes from byte 21, big endian.
+        # Payloads longer than 4 bytes do not fit the data column and are left to 0
+        t_data = numpy.where(t_data_size == 1, data[c + 20] & 0x3f, 0).astype(numpy.uint32)
+        payload_size = numpy.where(t_data_size <= 5, t_data_size.astype(numpy.int64) - 1, 0)
+        for i in range(4):
+            byte = data[numpy.minimum(c + 21 + i, end - 1)].astype(numpy.uint32)
+            t_data = numpy.where(i < payload_size, (t_data << 8) | byte, t_data)
+
+        def column(values, dtype):
+            out = numpy.zeros(count, dtype=dtype)
+            out[is_tunnelling] = values
+            return out
+
+        return cls(offsets,
+                   frame_length,
+                   service_type_descriptor,
+                   column(data[t + 7], numpy.uint8),
+                   column(data[t + 8], numpy.uint8),
+                   column(data[t + 10], numpy.uint8),
+                   column((data[c + 16].astype(numpy.uint16) << 8) | data[c + 17], numpy.uint16),
+                   column(t_apci, numpy.uint8),
+                   column(t_data_size, numpy.uint8),
+                   column(t_data, numpy.uint32),
+                   column((data[c + 14].astype(numpy.uint16) << 8) | data[c + 15], numpy.uint16),
+                   column((data[c + 12] >> 2) & 3, numpy.uint8),
+                   column((data[c + 13] >> 4) & 7, numpy.uint8))
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Merge the columns of consecutive parts of an archive, in order
+        :param parts: iterable of FrameColumns objects
+        """
+        parts = list(parts)
+        if not parts:
+            return decode_frames(b'')
+        return cls(*[numpy.concatenate([getattr(part, field) for part in parts]) for field in cls._FIELDS])
+
+    def values(self, dpt=None, registry=DEFAULT_REGISTRY):
+        """
+        Physical values of the data column, decoded with the array codec of their datapoint type
+        The rows which are not tunnelling requests of the DPT data size are NaN.
+        :param dpt: DPT id ('9.001') or Dpt object. None uses the DPT assigned in registry to the
+                    dest_addr_group of each row, the rows of other group addresses or of DPTs
+                    without array codec are NaN
+        :return: numpy float64 array
+        """
+        out = numpy.full(len(self), numpy.nan)
+        is_tunnelling = self.service_type_descriptor == ServiceTypeDescriptor.TUNNELLING_REQUEST.value
+        if dpt is not None:
+            self._decode_values(out, is_tunnelling, registry.get(dpt))
+            return out
+        for group in numpy.unique(self.dest_addr_group[is_tunnelling]):
+            try:
+                codec = registry.get_for_group(GroupAddress.from_int(int(group)))
+            except KnxnetDptException:
+                continue
+            if codec.decode_array is None:
+                continue
+            self._decode_values(out, is_tunnelling & (self.dest_addr_group == group), codec)
+        return out
+
+    def _decode_values(self, out, rows, codec):
+        if codec.decode_array is None:
+            raise KnxnetException('DPT {0} has no array codec'.format(codec.dpt_id))
+        rows = rows & (self.data_size == codec.data_size)
+        out[rows] = codec.decode_array(self.data[rows])
+
+    @staticmethod
+    def _check(invalid, offsets, message):
+        if invalid.any():
+            raise KnxnetException('{0} (offset {1})'.format(message, offsets[numpy.argmax(invalid)]))
+
+    def __len__(self):
+        return len(self.offset)
+
+
 class KnxnetException(Exception):
     pass
 
 
+def _data_from_frame(frame, cemi, data_size):
+    """
+    Data of a tunnelling request datagram
+    :param cemi: additional info length, the cEMI fields are shifted by it
+    """
+    if data_size == 1:  # 6 bits or less, shares its byte with the APCI lsb
+        return frame[20 + cemi] & 0x3f
+    if data_size == 2:  # 1 byte
+        return frame[21 + cemi]
+    if data_size <= TunnellingRequest.STANDARD_FRAME_MAX_DATA_SIZE:  # payload bytes, big endian
+        return int.from_bytes(frame[21 + cemi:20 + cemi + data_size], 'big')
+    return memoryview(frame)[21 + cemi:20 + cemi + data_size]  # extended frame, the payload is not copied
+
+
+def _check_data_width(data, data_size):
+    """
+    Raise a KnxnetException if the int data does not fit in its data_size - 1 payload bytes
+    The 6 bits of data size 1 are masked, by the encoder as by the process image.
+    """
+    if isinstance(data, int) and data_size > 1 and (data < 0 or data >> (8 * (data_size - 1))):
+        raise KnxnetException('Data does not fit in {0} bytes (data size {1})'.format(data_size - 1, data_size))
+
+
+def _payload_bytes(data, data_size):
+    """
+    data_size - 1 payload bytes of data, big endian
+    :param data: int, or bytes-like payload
+    """
+    length = data_size - 1
+    if not isinstance(data, int):
+        if len(data) != length:
+            raise KnxnetException('Payload length must be data size - 1')
+        return bytes(data)
+    return (data & ((1 << (length * 8)) - 1)).to_bytes(length, 'big')
+
+
+_SERVICE_TYPES = {service_type.value: service_type for service_type in ServiceTypeDescriptor}
+
+_FRAME_CLASSES = {
+    ServiceTypeDescriptor.CONNECTION_REQUEST: ConnectionRequest,
+    ServiceTypeDescriptor.CONNECTION_RESPONSE: ConnectionResponse,
+    ServiceTypeDescriptor.CONNECTION_STATE_REQUEST: ConnectionStateRequest,
+    ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE: ConnectionStateResponse,
+    ServiceTypeDescriptor.DISCONNECT_REQUEST: DisconnectRequest,
+    ServiceTypeDescriptor.DISCONNECT_RESPONSE: DisconnectResponse,
+    ServiceTypeDescriptor.TUNNELLING_REQUEST: TunnellingRequest,
+    ServiceTypeDescriptor.TUNNELLING_ACK: TunnellingAck,
+    ServiceTypeDescriptor.ROUTING_INDICATION: RoutingIndication,
+    ServiceTypeDescriptor.ROUTING_LOST_MESSAGE: RoutingLostMessage,
+    ServiceTypeDescriptor.ROUTING_BUSY: RoutingBusy
+}
+
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+
+"""
+Instrumentation of the KNXnet/IP layer: frames, bytes, decode errors and latencies
+
+Nothing is measured until a collector is installed: create_frame(), decode_frame() and the
+transports then only test one module global. Once installed, the collector counts:
+
+    - the frames built by create_frame() and decoded by decode_frame(), per service type, with
+      histograms of the time spent in them
+    - the decode errors, per reason (message of the KnxnetException)
+    - the datagrams and bytes sent and received by TunnelClient and RoutingEndpoint, per service type
+    - the ack round trip times of TunnelClient
+
+    collector = install()
+    ...
+    collector.decoded['TUNNELLING_REQUEST'], collector.decode_errors, collector.snapshot()  # pull API
+    body = collector.render_prometheus()  # Prometheus text exposition format
+    uninstall()
+"""
+
+import bisect
+import struct
+import time
+
+import knxnet.knxnet
+from knxnet.knxnet import *
+from knxnet.knxnet import _SERVICE_TYPES, _create_frame, _decode_frame
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def install(collector=None):
+    """
+    Start collecting, process wide
+    :param collector: MetricsCollector, None for a new one
+    :return: the installed collector
+    """
+    if collector is None:
+        collector = MetricsCollector()
+    knxnet.knxnet._metrics = collector
+    return collector
+
+
+def uninstall():
+    """
+    Stop collecting, the instrumentation costs nothing again
+    """
+    knxnet.knxnet._metrics = None
+
+
+def installed():
+    """
+    :return: the installed MetricsCollector, None if there is none
+    """
+    return knxnet.knxnet._metrics
+
+
+def _service_type(frame):
+    """
+    :return: name of the service type of a datagram, read from its header
+    """
+    if frame is None or len(frame) < 4:
+        return 'INVALID'
+    service_type = _SERVICE_TYPES.get((frame[2] << 8) | frame[3])
+    return 'UNKNOWN' if service_type is None else service_type.name
+
+
+class Histogram():
+    """
+    Cumulative histogram with fixed bucket upper bounds, as Prometheus histograms
+    """
+    def __init__(self, buckets):
+        """
+        :param buckets: increasing upper bounds, the +Inf bucket is implicit
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # per bucket, not cumulative, last is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def cumulative_counts(self):
+        """
+        :return: list of (upper bound, observations <= upper bound), ending with (inf, count)
+        """
+        out = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+
+class MetricsCollector():
+    """
+    Counters and histograms filled by the instrumented code once installed, see install()
+    The counters are plain dicts, keyed by service type name (see ServiceTypeDescriptor), by
+    (direction, service type name) or by decode error reason.
+    """
+    # seconds, create_frame() and decode_frame() of one datagram take a few microseconds
+    CODEC_BUCKETS = (1e-06, 2.5e-06, 5e-06, 1e-05, 2.5e-05, 5e-05, 0.0001, 0.00025, 0.001)
+    # seconds, tunnelling acks come back within a few milliseconds on a LAN, the timeout is 1 s
+    ROUND_TRIP_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self, codec_buckets=CODEC_BUCKETS, round_trip_buckets=ROUND_TRIP_BUCKETS, clock=time.perf_counter):
+        """
+        :param codec_buckets: upper bounds of the encode and decode time histograms, in seconds
+        :param round_trip_buckets: upper bounds of the ack round trip time histogram, in seconds
+        :param clock: time source of the encode and decode times, in seconds
+        """
+        self.codec_buckets = tuple(codec_buckets)
+        self.round_trip_buckets = tuple(round_trip_buckets)
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.encoded = {}  # service type -> frames built by create_frame()
+        self.decoded = {}  # service type -> frames decoded by decode_frame()
+        self.decode_errors = {}  # reason -> decode_frame() calls which raised
+        self.frames = {}  # ('sent' or 'received', service type) -> datagrams of the transports
+        self.bytes = {'sent': 0, 'received': 0}
+        self.encode_time = {}  # service type -> Histogram
+        self.decode_time = {}  # service type -> Histogram
+        self.round_trip = Histogram(self.round_trip_buckets)
+
+    # instrumentation hooks
+
+    def create_frame(self, service_type_descriptor, data):
+        start = self.clock()
+        frame = _create_frame(service_type_descriptor, data)
+        elapsed = self.clock() - start
+        name = getattr(service_type_descriptor, 'name', 'UNKNOWN')
+        self.encoded[name] = self.encoded.get(name, 0) + 1
+        histogram = self.encode_time.get(name)
+        if histogram is None:
+            histogram = self.encode_time[name] = Histogram(self.codec_buckets)
+        histogram.observe(elapsed)
+        return frame
+
+    def decode_frame(self, frame, lazy):
+        start = self.clock()
+        try:
+            decoded = _decode_frame(frame, lazy)
+        except KnxnetException as e:
+            self._decode_error(str(e))
+            raise
+        except (IndexError, ValueError, struct.error) as e:  # truncated or corrupted datagram
+            self._decode_error(type(e).__name__)
+            raise
+        elapsed = self.clock() - start
+        name = _service_type(frame)
+        self.decoded[name] = self.decoded.get(name, 0) + 1
+        histogram = self.decode_time.get(name)
+        if histogram is None:
+            histogram = self.decode_time[name] = Histogram(self.codec_buckets)
+        histogram.observe(elapsed)
+        return decoded
+
+    def _decode_error(self, reason):
+        self.decode_errors[reason] = self.decode_errors.get(reason, 0) + 1
+
+    def frame_sent(self, frame):
+        self._transported('sent', frame)
+
+    def frame_received(self, frame):
+        self._transported('received', frame)
+
+    def _transported(self, direction, frame):
+        key = (direction, _service_type(frame))
+        self.frames[key] = self.frames.get(key, 0) + 1
+        self.bytes[direction] += len(frame)
+
+    def ack_received(self, round_trip_time):
+        """
+        :param round_trip_time: seconds between a tunnelling request and its ack
+        """
+        self.round_trip.observe(round_trip_time)
+
+    # pull API
+
+    def snapshot(self):
+        """
+        :return: copy of the metrics as plain dicts and numbers, e.g. to serialise to JSON
+        """
+        def histograms(by_service_type):
+            return {name: self._histogram_snapshot(histogram) for name, histogram in by_service_type.items()}
+
+        return {
+            'encoded': dict(self.encoded),
+            'decoded': dict(self.decoded),
+            'decode_errors': dict(self.decode_errors),
+            'frames': {direction: {name: count for (d, name), count in self.frames.items() if d == direction}
+                       for direction in ('sent', 'received')},
+            'bytes': dict(self.bytes),
+            'encode_time': histograms(self.encode_time),
+            'decode_time': histograms(self.decode_time),
+            'round_trip': self._histogram_snapshot(self.round_trip),
+        }
+
+    @staticmethod
+    def _histogram_snapshot(histogram):
+        return {'buckets': histogram.cumulative_counts(), 'sum': histogram.sum, 'count': histogram.count}
+
+    def render_prometheus(self, namespace='knxnet'):
+        """
+        :return: the metrics in the Prometheus text exposition format (version 0.0.4)
+        """
+        out = []
+
+        def family(name, metric_type, help_text):
+            out.append('# HELP {0}_{1} {2}\n'.format(namespace, name, help_text))
+            out.append('# TYPE {0}_{1} {2}\n'.format(namespace, name, metric_type))
+
+        def sample(name, labels, value):
+            out.append('{0}_{1}{2} {3}\n'.format(namespace, name, _labels(labels), _number(value)))
+
+        def histogram(name, labels, values):
+            for bound, count in values.cumulative_counts():
+                sample(name + '_bucket', labels + (('le', _number(bound)),), count)
+            sample(name + '_sum', labels, values.sum)
+            sample(name + '_count', labels, values.count)
+
+        family('encoded_frames_total', 'counter', 'Frames built by create_frame()')
+        for name, count in sorted(self.encoded.items()):
+            sample('encoded_frames_total', (('service_type', name),), count)
+        family('decoded_frames_total', 'counter', 'Frames decoded by decode_frame()')
+        for name, count in sorted(self.decoded.items()):
+            sample('decoded_frames_total', (('service_type', name),), count)
+        family('decode_errors_total', 'counter', 'Datagrams decode_frame() rejected')
+        for reason, count in sorted(self.decode_errors.items()):
+            sample('decode_errors_total', (('reason', reason),), count)
+        family('frames_total', 'counter', 'Datagrams sent and received by the tunnel and routing transports')
+        for (direction, name), count in sorted(self.frames.items()):
+            sample('frames_total', (('direction', direction), ('service_type', name)), count)
+        family('bytes_total', 'counter', 'Bytes sent and received by the tunnel and routing transports')
+        for direction, count in sorted(self.bytes.items()):
+            sample('bytes_total', (('direction', direction),), count)
+        family('encode_seconds', 'histogram', 'Time spent in create_frame()')
+        for name, values in sorted(self.encode_time.items()):
+            histogram('encode_seconds', (('service_type', name),), values)
+        family('decode_seconds', 'histogram', 'Time spent in decode_frame()')
+        for name, values in sorted(self.decode_time.items()):
+            histogram('decode_seconds', (('service_type', name),), values)
+        family('ack_round_trip_seconds', 'histogram', 'Time between a tunnelling request and its ack')
+        histogram('ack_round_trip_seconds', (), self.round_trip)
+        return ''.join(out)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{0}="{1}"'.format(name, _escape(value)) for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parallel decode of large archives of concatenated KNXnet/IP datagrams
+
+The archive is copied once to shared memory and cut into chunks. Each worker process finds the
+datagrams of its chunk and decodes them with decode_frames(), and sends back the FrameColumns of
+the chunk: a few numpy arrays, no object per datagram. The columns are merged in archive order.
+
+    columns = decode_frames_parallel(archive, workers=8)
+
+Without the offsets of the datagrams, a worker does not know where the first datagram of its chunk
+starts: it looks for the first position from which a chain of valid KNXnet/IP headers starts, and
+walks the datagrams from there. The chunks are then stitched in order: each one must start where
+the previous one ended, else the datagrams between the end of the previous chunk and the first
+datagram start both walks share are walked and decoded again, so the result is the same as walking
+the whole archive from its beginning. Only those few datagrams at the chunk edges are decoded by the
+calling process.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from knxnet.knxnet import *
+from knxnet.knxnet import numpy, FrameColumns, _SERVICE_TYPES
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+CHUNKS_PER_WORKER = 4  # several chunks per worker even out the load
+SYNC_FRAMES = 4  # valid headers in a row to trust a position as a datagram start
+
+
+def decode_frames_parallel(buffer, offsets=None, workers=None, chunks=None, executor=None):
+    """
+    decode_frames() of concatenated datagrams, across a process pool. Requires numpy.
+    :param buffer: bytes-like, datagrams back to back (or at offsets)
+    :param offsets: position of each datagram in buffer, e.g. from a capture index. If None, the
+                    datagrams are expected back to back
+    :param workers: number of processes, None for the number of CPUs
+    :param chunks: number of chunks, None for CHUNKS_PER_WORKER per worker
+    :param executor: concurrent.futures executor to reuse, None to start a process pool for this call
+    :return: FrameColumns object
+    """
+    if numpy is None:
+        raise KnxnetException('decode_frames_parallel requires numpy')
+    workers = workers or os.cpu_count() or 1
+    chunks = max(1, chunks or workers * CHUNKS_PER_WORKER)
+    size = len(buffer)
+    if size == 0:
+        return decode_frames(b'')
+    memory = shared_memory.SharedMemory(create=True, size=size)
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    try:
+        memory.buf[:size] = buffer
+        if offsets is not None:
+            offsets = numpy.asarray(offsets, dtype=numpy.int64)
+            futures = [executor.submit(_decode_chunk, memory.name, size, chunk)
+                       for chunk in numpy.array_split(offsets, min(chunks, max(1, len(offsets))))]
+            parts = [future.result() for future in futures]
+        else:
+            parts = _decode_walked_chunks(executor, memory, size, chunks)
+    finally:
+        if own_executor:
+            executor.shutdown()
+        memory.close()
+        memory.unlink()
+    return FrameColumns.concatenate(parts)
+
+
+def _decode_walked_chunks(executor, memory, size, chunks):
+    bounds = [size * i // chunks for i in range(chunks + 1)]
+    futures = [executor.submit(_walk_chunk, memory.name, size, bounds[i], bounds[i + 1], i == 0)
+               for i in range(chunks)]
+    parts = []
+    end = 0  # end of the last datagram of the previous chunks
+    for i, future in enumerate(futures):
+        first, chunk_end, columns = future.result()
+        if first != end:
+            if end >= bounds[i + 1]:
+                continue  # the previous chunk ended past this one: no datagram starts in it
+            # false sync: walk from the end of the previous chunk until the walk of the chunk is met
+            chunk_end, stitched, columns = _stitch(memory, size, end, bounds[i + 1], chunk_end, columns)
+            if stitched is not None:
+                parts.append(stitched)
+        if columns is not None:
+            parts.append(columns)
+        end = chunk_end
+    if end != size:
+        raise KnxnetException('Frame size is < 6 (offset {0})'.format(end))
+    return parts
+
+
+def _stitch(memory, size, start, stop, chunk_end, columns):
+    """
+    Walk the datagrams from start, the end of the previous chunk, up to the first one the walk of
+    the chunk found too: from there on, both walks are the same
+    :return: (end of the last datagram, FrameColumns of the walked datagrams or None,
+              FrameColumns of the chunk from the meeting datagram on or None)
+    """
+    known = numpy.empty(0, dtype=numpy.int64) if columns is None else columns.offset
+    buf = memory.buf
+    offsets = []
+    offset = start
+    index = len(known)
+    while offset < stop:
+        index = numpy.searchsorted(known, offset)
+        if index < len(known) and known[index] == offset:
+            break
+        offsets.append(offset)
+        offset = _next_frame(buf, size, offset)
+    else:
+        index = len(known)
+        chunk_end = offset
+    del buf
+    stitched = None
+    if offsets:
+        stitched = _decode_chunk(memory.name, size, numpy.array(offsets, dtype=numpy.int64), memory)
+    if index == len(known):
+        return chunk_end, stitched, None
+    if index:
+        columns = FrameColumns(*[getattr(columns, field)[index:] for field in FrameColumns._FIELDS])
+    return chunk_end, stitched, columns
+
+
+def _attach(name, memory):
+    if memory is not None:
+        return memory, False
+    return shared_memory.SharedMemory(name), True
+
+
+def _decode_chunk(name, size, offsets, memory=None):
+    """
+    Worker: decode the datagrams at offsets
+    """
+    memory, attached = _attach(name, memory)
+    try:
+        data = numpy.frombuffer(memory.buf, dtype=numpy.uint8, count=size)
+        try:
+            columns, error = FrameColumns.create_from_buffer(data, offsets), None
+        except KnxnetException as e:
+            columns, error = None, str(e)
+        # the shared memory can not be closed while an array uses it, raised outside of the except
+        # block so that no traceback keeps the array alive
+        del data
+        if error is not None:
+            raise KnxnetException(error)
+        return columns
+    finally:
+        if attached:
+            memory.close()
+
+
+def _walk_chunk(name, size, start, stop, anchored, memory=None):
+    """
+    Worker: find and decode the datagrams which start in [start, stop)
+    :param anchored: a datagram starts at start, else look for the first one
+    :return: (offset of the first datagram, end of the last datagram, FrameColumns or None)
+             first is None if no datagram start was found
+    """
+    memory, attached = _attach(name, memory)
+    try:
+        buf = memory.buf
+        first = start if anchored else _sync(buf, size, start, stop)
+        if first is None:
+            return None, None, None
+        offsets = []
+        offset = first
+        while offset < stop:
+            offsets.append(offset)
+            offset = _next_frame(buf, size, offset)
+        del buf
+        if not offsets:
+            return first, offset, None
+        columns = _decode_chunk(name, size, numpy.array(offsets, dtype=numpy.int64), memory)
+        return first, offset, columns
+    except KnxnetException:
+        if anchored:
+            raise
+        return None, None, None  # resynchronised on garbage, the chunk is walked again from the right start
+    finally:
+        if attached:
+            memory.close()
+
+
+def _next_frame(buf, size, offset):
+    """
+    :return: offset of the datagram following the one at offset
+    """
+    if size - offset < 6:
+        raise KnxnetException('Frame size is < 6 (offset {0})'.format(offset))
+    frame_length = (buf[offset + 4] << 8) | buf[offset + 5]
+    if frame_length < 6:
+        raise KnxnetException('Invalid frame length (offset {0})'.format(offset))
+    return offset + frame_length
+
+
+def _sync(buf, size, start, stop):
+    """
+    :return: first position of [start, stop) followed by SYNC_FRAMES valid headers (or by the end of buf)
+    """
+    for candidate in range(start, stop):
+        offset = candidate
+        for _ in range(SYNC_FRAMES):
+            if offset == size:
+                return candidate
+            if not _is_header(buf, size, offset):
+                break
+            offset += (buf[offset + 4] << 8) | buf[offset + 5]
+        else:
+            return candidate
+    return None
+
+
+def _is_header(buf, size, offset):
+    if size - offset < 6 or buf[offset] != 0x06 or buf[offset + 1] != 0x10:
+        return False
+    frame_length = (buf[offset + 4] << 8) | buf[offset + 5]
+    return frame_length >= 6 and offset + frame_length <= size and \
+        ((buf[offset + 2] << 8) | buf[offset + 3]) in _SERVICE_TYPES
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+
+"""
+Streaming import and export of KNXnet/IP traffic in pcap and pcapng files (Wireshark, tcpdump)
+
+The reader walks the file one packet at a time, whatever its size, and yields the UDP payloads
+sent to or from the KNXnet/IP ports or the KNXnet/IP routing multicast group:
+
+    with PcapReader('site.pcapng') as capture:
+        for timestamp, src_addr, dst_addr, frame in capture.datagrams():
+            ...
+        for timestamp, knx_frame in capture.decoded(lazy=True):  # decode_frame() of every datagram
+            ...
+
+The writer wraps the datagrams in IPv4/UDP packets (LINKTYPE_RAW) which Wireshark dissects as
+KNXnet/IP:
+
+    with PcapWriter('export.pcap') as capture:
+        capture.write(frame, src_addr=('192.168.1.20', 50000), dst_addr=('192.168.1.10', 3671))
+
+Supported: pcap (both byte orders, micro and nanosecond timestamps) and pcapng (sections of both
+byte orders, enhanced, simple and obsolete packet blocks, if_tsresol). Link layers: Ethernet with
+VLAN tags, Linux cooked capture v1 and v2, BSD loopback and raw IPv4/IPv6. IPv4 fragments are
+skipped, they can not be reassembled without buffering.
+"""
+
+import socket
+import struct
+import time
+
+from knxnet.knxnet import *
+from knxnet.routing import ROUTING_MULTICAST_ADDR, ROUTING_PORT
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+# link types, see https://www.tcpdump.org/linktypes.html
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LOOP = 108
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+_PCAP_MAGIC = 0xa1b2c3d4
+_PCAP_MAGIC_NS = 0xa1b23c4d
+_PCAPNG_SHB = 0x0a0d0d0a
+_PCAPNG_BYTE_ORDER_MAGIC = 0x1a2b3c4d
+_PCAPNG_IDB = 0x00000001
+_PCAPNG_PB = 0x00000002  # obsolete packet block
+_PCAPNG_SPB = 0x00000003
+_PCAPNG_EPB = 0x00000006
+_IF_TSRESOL = 9
+
+_ETHERTYPE_IPV4 = 0x0800
+_ETHERTYPE_IPV6 = 0x86dd
+_ETHERTYPE_VLAN = (0x8100, 0x88a8, 0x9100)
+_IPPROTO_UDP = 17
+_IPV6_EXTENSION_HEADERS = (0, 43, 60)  # hop-by-hop, routing and destination options
+
+_ROUTING_MULTICAST = socket.inet_aton(ROUTING_MULTICAST_ADDR)
+_SNAPLEN = 65535
+
+
+class PcapReader():
+    """
+    Generator of the KNXnet/IP datagrams of a pcap or pcapng file, in constant memory
+    """
+    PORTS = (ROUTING_PORT,)
+
+    def __init__(self, file, ports=PORTS):
+        """
+        :param file: path, or binary file object open for reading (not necessarily seekable)
+        :param ports: UDP ports of the KNXnet/IP traffic, a datagram is kept if its source or its
+                      destination port is one of them, or if it is sent to the routing multicast group
+        """
+        self._own_file = not hasattr(file, 'read')
+        self.file = open(file, 'rb') if self._own_file else file
+        self.ports = frozenset(ports)
+        self.packets = 0  # packets read, KNXnet/IP or not
+        self.skipped = 0  # UDP fragments and link types which are not supported
+        self.decode_errors = 0  # datagrams decoded() failed to decode
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __iter__(self):
+        return self.datagrams()
+
+    def close(self):
+        if self._own_file:
+            self.file.close()
+
+    def _read(self, size):
+        data = self.file.read(size)
+        if len(data) != size:
+            if not data:
+                return None
+            raise KnxnetException('Truncated capture file: {0} bytes instead of {1}'.format(len(data), size))
+        return data
+
+    def packets_raw(self):
+        """
+        :return: iterator of (timestamp in seconds, link type, bytes of the captured packet), for every packet
+        """
+        head = self._read(4)
+        if head is None:
+            return
+        magic_le, = struct.unpack('<I', head)
+        if magic_le == _PCAPNG_SHB:
+            yield from self._pcapng_packets()
+        elif magic_le in (_PCAP_MAGIC, _PCAP_MAGIC_NS):
+            yield from self._pcap_packets('<', magic_le == _PCAP_MAGIC_NS)
+        elif struct.unpack('>I', head)[0] in (_PCAP_MAGIC, _PCAP_MAGIC_NS):
+            yield from self._pcap_packets('>', struct.unpack('>I', head)[0] == _PCAP_MAGIC_NS)
+        else:
+            raise KnxnetException('Not a pcap or pcapng file (magic 0x{0:08x})'.format(magic_le))
+
+    def _pcap_packets(self, endian, nanoseconds):
+        header = self._read(20)
+        if header is None:
+            raise KnxnetException('Truncated capture file: no pcap header')
+        link_type = struct.unpack(endian + 'HHiIII', header)[5] & 0x0fffffff
+        record = struct.Struct(endian + 'IIII')
+        divisor = 1e9 if nanoseconds else 1e6
+        while True:
+            record_header = self._read(record.size)
+            if record_header is None:
+                return
+            seconds, fraction, captured_length, _ = record.unpack(record_header)
+            packet = self._read(captured_length)
+            if packet is None:
+                raise KnxnetException('Truncated capture file: packet without data')
+            yield seconds + fraction / divisor, link_type, packet
+
+    def _pcapng_packets(self):
+        endian = '<'
+        interfaces = []  # (link type, seconds per timestamp unit) of the section
+        block_type = _PCAPNG_SHB
+        while True:
+            if block_type == _PCAPNG_SHB:
+                length_and_magic = self._read(8)
+                if length_and_magic is None:
+                    raise KnxnetException('Truncated capture file: section header block')
+                if struct.unpack('<I', length_and_magic[4:])[0] == _PCAPNG_BYTE_ORDER_MAGIC:
+                    endian = '<'
+                elif struct.unpack('>I', length_and_magic[4:])[0] == _PCAPNG_BYTE_ORDER_MAGIC:
+                    endian = '>'
+                else:
+                    raise KnxnetException('Invalid pcapng byte-order magic')
+                block_length, = struct.unpack(endian + 'I', length_and_magic[:4])
+                self._block_body(block_length, 12)
+                interfaces = []
+            else:
+                length = self._read(4)
+                if length is None:
+                    raise KnxnetException('Truncated capture file: block without length')
+                block_length, = struct.unpack(endian + 'I', length)
+                body = self._block_body(block_length, 8)
+                if block_type == _PCAPNG_IDB:
+                    link_type, _, _ = struct.unpack_from(endian + 'HHI', body)
+                    interfaces.append((link_type, self._tsresol(body[8:], endian)))
+                elif block_type in (_PCAPNG_EPB, _PCAPNG_PB):
+                    if block_type == _PCAPNG_EPB:
+                        interface, high, low, captured_length, _ = struct.unpack_from(endian + 'IIIII', body)
+                    else:
+                        interface, _, high, low, captured_length, _ = struct.unpack_from(endian + 'HHIIII', body)
+                    link_type, resolution = self._interface(interfaces, interface)
+                    yield ((high << 32) | low) * resolution, link_type, body[20:20 + captured_length]
+                elif block_type == _PCAPNG_SPB:
+                    link_type, _ = self._interface(interfaces, 0)
+                    original_length, = struct.unpack_from(endian + 'I', body)
+                    yield None, link_type, body[4:4 + original_length]
+                # other blocks (name resolution, statistics, ...) are skipped
+            head = self._read(4)
+            if head is None:
+                return
+            block_type, = struct.unpack(endian + 'I', head)
+
+    def _block_body(self, block_length, read):
+        """
+        :param read: bytes of the block already read, block type included
+        :return: body of the block, without the trailing block length
+        """
+        if block_length < read + 4 or block_length % 4:
+            raise KnxnetException('Invalid pcapng block length {0}'.format(block_length))
+        data = self._read(block_length - read)
+        if data is None:
+            raise KnxnetException('Truncated capture file: block without body')
+        return data[:-4]
+
+    @staticmethod
+    def _tsresol(options, endian):
+        """
+        :return: seconds per timestamp unit of an interface description block
+        """
+        offset = 0
+        while offset + 4 <= len(options):
+            code, length = struct.unpack_from(endian + 'HH', options, offset)
+            if code == 0:
+                break
+            if code == _IF_TSRESOL and length >= 1:
+                value = options[offset + 4]
+                return 2 ** -(value & 0x7f) if value & 0x80 else 10 ** -value
+            offset += 4 + (length + 3) // 4 * 4
+        return 1e-6
+
+    @staticmethod
+    def _interface(interfaces, interface):
+        if interface >= len(interfaces):
+            raise KnxnetException('Packet of undescribed pcapng interface {0}'.format(interface))
+        return interfaces[interface]
+
+    def datagrams(self):
+        """
+        :return: iterator of (timestamp, (src ip, src port), (dst ip, dst port), UDP payload) of the
+                 KNXnet/IP traffic. The timestamp is None for pcapng simple packet blocks
+        """
+        for timestamp, link_type, packet in self.packets_raw():
+            self.packets += 1
+            udp = _udp(link_type, packet)
+            if udp is None:
+                continue
+            if udp is False:
+                self.skipped += 1
+                continue
+            src_addr, dst_addr, payload, multicast = udp
+            if multicast or src_addr[1] in self.ports or dst_addr[1] in self.ports:
+                yield timestamp, src_addr, dst_addr, payload
+
+    def frames(self):
+        """
+        :return: iterator of the KNXnet/IP datagrams, bytes
+        """
+        return (payload for _, _, _, payload in self.datagrams())
+
+    def decoded(self, lazy=False):
+        """
+        :return: iterator of (timestamp, decode_frame() of the datagram). Datagrams which fail to
+                 decode (not KNXnet/IP, unknown service type, truncated by the snap length) are
+                 counted in decode_errors. With lazy, the fields of a tunnelling request view are
+                 validated on access and raise a KnxnetException then
+        """
+        for timestamp, _, _, payload in self.datagrams():
+            try:
+                frame = decode_frame(payload, lazy=lazy)
+            except KnxnetException:
+                self.decode_errors += 1
+                continue
+            yield timestamp, frame
+
+
+def _udp(link_type, packet):
+    """
+    :return: (src_addr, dst_addr, payload, to the routing multicast group) of a UDP packet,
+             None if the packet is not UDP, False if it can not be read (fragment, unknown link type)
+    """
+    if link_type == LINKTYPE_ETHERNET:
+        if len(packet) < 14:
+            return None
+        offset = 12
+        ether_type = (packet[12] << 8) | packet[13]
+        while ether_type in _ETHERTYPE_VLAN and len(packet) >= offset + 6:
+            offset += 4
+            ether_type = (packet[offset] << 8) | packet[offset + 1]
+        offset += 2
+    elif link_type == LINKTYPE_LINUX_SLL:
+        if len(packet) < 16:
+            return None
+        ether_type, offset = (packet[14] << 8) | packet[15], 16
+    elif link_type == LINKTYPE_LINUX_SLL2:
+        if len(packet) < 20:
+            return None
+        ether_type, offset = (packet[0] << 8) | packet[1], 20
+    elif link_type in (LINKTYPE_NULL, LINKTYPE_LOOP):
+        if len(packet) < 4:
+            return None
+        family = struct.unpack('<I' if packet[0] else '>I', packet[:4])[0]
+        ether_type, offset = (_ETHERTYPE_IPV4 if family == socket.AF_INET else _ETHERTYPE_IPV6), 4
+    elif link_type in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6):
+        if not packet:
+            return None
+        ether_type, offset = (_ETHERTYPE_IPV4 if packet[0] >> 4 == 4 else _ETHERTYPE_IPV6), 0
+    else:
+        return False
+    if ether_type == _ETHERTYPE_IPV4:
+        return _udp_ipv4(packet, offset)
+    if ether_type == _ETHERTYPE_IPV6:
+        return _udp_ipv6(packet, offset)
+    return None
+
+
+def _udp_ipv4(packet, offset):
+    if len(packet) < offset + 20 or packet[offset] >> 4 != 4 or packet[offset + 9] != _IPPROTO_UDP:
+        return None
+    if ((packet[offset + 6] << 8) | packet[offset + 7]) & 0x3fff:  # more fragments flag or fragment offset
+        return False
+    total_length = (packet[offset + 2] << 8) | packet[offset + 3]
+    end = min(len(packet), offset + total_length) if total_length else len(packet)  # 0 with TSO
+    src_ip, dst_ip = packet[offset + 12:offset + 16], packet[offset + 16:offset + 20]
+    return _udp_payload(packet, offset + (packet[offset] & 0x0f) * 4, end,
+                        socket.inet_ntoa(src_ip), socket.inet_ntoa(dst_ip), dst_ip == _ROUTING_MULTICAST)
+
+
+def _udp_ipv6(packet, offset):
+    if len(packet) < offset + 40 or packet[offset] >> 4 != 6:
+        return None
+    next_header = packet[offset + 6]
+    end = min(len(packet), offset + 40 + ((packet[offset + 4] << 8) | packet[offset + 5]))
+    src_ip, dst_ip = packet[offset + 8:offset + 24], packet[offset + 24:offset + 40]
+    header = offset + 40
+    while next_header in _IPV6_EXTENSION_HEADERS and header + 8 <= end:
+        next_header, header = packet[header], header + (packet[header + 1] + 1) * 8
+    if next_header == 44:  # fragment header
+        return False
+    if next_header != _IPPROTO_UDP:
+        return None
+    return _udp_payload(packet, header, end, socket.inet_ntop(socket.AF_INET6, src_ip),
+                        socket.inet_ntop(socket.AF_INET6, dst_ip), False)
+
+
+def _udp_payload(packet, offset, end, src_ip, dst_ip, multicast):
+    if end < offset + 8:
+        return None
+    src_port = (packet[offset] << 8) | packet[offset + 1]
+    dst_port = (packet[offset + 2] << 8) | packet[offset + 3]
+    udp_end = min(end, offset + ((packet[offset + 4] << 8) | packet[offset + 5]))
+    return (src_ip, src_port), (dst_ip, dst_port), packet[offset + 8:udp_end], multicast
+
+
+class PcapWriter():
+    """
+    Writer of KNXnet/IP datagrams in a pcap file, as IPv4/UDP packets without link layer (LINKTYPE_RAW)
+    """
+    SRC_ADDR = ('127.0.0.1', ROUTING_PORT)
+    DST_ADDR = (ROUTING_MULTICAST_ADDR, ROUTING_PORT)
+
+    def __init__(self, file, nanoseconds=False, clock=time.time):
+        """
+        :param file: path, or binary file object open for writing
+        :param nanoseconds: nanosecond timestamps, else microseconds
+        :param clock: time source of the frames written without timestamp, in seconds since the epoch
+        """
+        self._own_file = not hasattr(file, 'write')
+        self.file = open(file, 'wb') if self._own_file else file
+        self.nanoseconds = nanoseconds
+        self.clock = clock
+        self.count = 0
+        self._identification = 0
+        self.file.write(struct.pack('<IHHiIII', _PCAP_MAGIC_NS if nanoseconds else _PCAP_MAGIC, 2, 4, 0, 0,
+                                    _SNAPLEN, LINKTYPE_RAW))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(self, frame, src_addr=SRC_ADDR, dst_addr=DST_ADDR, timestamp=None):
+        """
+        :param frame: KNXnet/IP datagram, bytes-like, or object with a frame attribute
+        :param src_addr: (IPv4 address, port) of the sender
+        :param dst_addr: (IPv4 address, port) of the receiver
+        :param timestamp: seconds since the epoch, None for now
+        """
+        frame = bytes(getattr(frame, 'frame', frame))
+        udp_length = 8 + len(frame)
+        if 20 + udp_length > _SNAPLEN:
+            raise KnxnetException('Frame of {0} bytes does not fit in an IPv4 packet'.format(len(frame)))
+        ip_header = bytearray(struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + udp_length, self._identification, 0x4000,
+                                          64, _IPPROTO_UDP, 0, socket.inet_aton(src_addr[0]),
+                                          socket.inet_aton(dst_addr[0])))
+        struct.pack_into('>H', ip_header, 10, _checksum(ip_header))
+        self._identification = (self._identification + 1) & 0xffff
+        # UDP checksum 0: not computed, allowed over IPv4
+        packet = bytes(ip_header) + struct.pack('>HHHH', src_addr[1], dst_addr[1], udp_length, 0) + frame
+        timestamp = self.clock() if timestamp is None else timestamp
+        seconds = int(timestamp)
+        units = 10 ** 9 if self.nanoseconds else 10 ** 6
+        fraction = int(round((timestamp - seconds) * units))
+        if fraction >= units:
+            seconds, fraction = seconds + 1, fraction - units
+        self.file.write(struct.pack('<IIII', seconds, fraction, len(packet), len(packet)))
+        self.file.write(packet)
+        self.count += 1
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self._own_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+def _checksum(header):
+    total = sum(struct.unpack('>{0}H'.format(len(header) // 2), header))
+    while total >> 16:
+        total = (total & 0xffff) + (total >> 16)
+    return ~total & 0xffff
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import itertools
+import logging
+
+from knxnet.knxnet import *
+from knxnet.tunnel import TunnelClient, KnxnetConnectionException
+from knxnet.dispatch import Dispatcher, EXACT, MIDDLE, MAIN
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot():
+    """
+    One tunnel of the pool, connected or waiting to be reconnected
+    """
+    def __init__(self, gateway_addr):
+        self.gateway_addr = gateway_addr
+        self.client = None
+        self.in_flight = 0
+        self.sent = 0  # requests served by this slot
+        self.failures = 0
+
+    @property
+    def connected(self):
+        return self.client is not None and self.client.connected
+
+
+class TunnelPool():
+    """
+    Tunnels to several KNXnet/IP gateways, used as one
+    Each gateway offers a few tunnel slots: the pool opens tunnels_per_gateway tunnels to each
+    gateway, sends each telegram through the least busy tunnel of the gateways routed to its
+    group address (see add_route()), and repeats it on another tunnel if its tunnel fails.
+    Failed tunnels are reconnected in the background every reconnect_interval seconds.
+    Incoming L_Data.ind are passed to the handlers once per gateway, from one of its tunnels.
+
+        pool = await TunnelPool.connect([('192.168.1.10', 3671), ('192.168.1.11', 3671)], tunnels_per_gateway=4)
+        pool.add_route('1/*', ('192.168.1.10', 3671))  # main group 1 is behind the first gateway
+        await pool.write('1/4/10', 1, 1)
+        await pool.close()
+    """
+    RECONNECT_INTERVAL = 5
+
+    def __init__(self, gateways, tunnels_per_gateway=1, reconnect_interval=RECONNECT_INTERVAL, **kwargs):
+        """
+        :param gateways: iterable of (ip, port) of the KNXnet/IP gateways
+        :param tunnels_per_gateway: tunnels opened to each gateway, at most its number of tunnel slots
+        :param reconnect_interval: seconds between two reconnection attempts of the failed tunnels
+        :param kwargs: see TunnelClient.__init__, for every tunnel
+        """
+        self.gateways = [tuple(gateway_addr) for gateway_addr in gateways]
+        if not self.gateways:
+            raise KnxnetException('The pool needs at least one gateway')
+        self.tunnels_per_gateway = tunnels_per_gateway
+        self.reconnect_interval = reconnect_interval
+        self.client_kwargs = kwargs
+        self.slots = [_Slot(gateway_addr) for gateway_addr in self.gateways for _ in range(tunnels_per_gateway)]
+        self.failovers = 0  # telegrams repeated on another tunnel
+        self.reconnections = 0
+        self._routes = {EXACT: {}, MIDDLE: {}, MAIN: {}}  # level -> key -> [gateway_addr]
+        self._route_cache = {}  # packed group address -> tuple of gateway_addr
+        self._listeners = {}  # gateway_addr -> slot whose indications are passed to the handlers
+        self._handlers = []
+        self._round_robin = itertools.count()
+        self._reconnect_task = None
+        self._disconnect_tasks = set()
+        self._closed = False
+
+    @classmethod
+    async def connect(cls, gateways, **kwargs):
+        """
+        Open the tunnels of the pool
+        Tunnels which can not be opened are retried in the background, the pool only fails if
+        none of them could be opened.
+        :param kwargs: see TunnelPool.__init__
+        :return: the connected TunnelPool
+        """
+        pool = cls(gateways, **kwargs)
+        await asyncio.gather(*[pool._open(slot) for slot in pool.slots])
+        if not any(slot.connected for slot in pool.slots):
+            await pool.close()
+            raise KnxnetException('No tunnel could be opened to {0}'.format(pool.gateways))
+        pool._schedule_reconnect()
+        return pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def connected_tunnels(self):
+        return sum(1 for slot in self.slots if slot.connected)
+
+    def add_handler(self, handler):
+        """
+        :param handler: callable receiving every incoming L_Data.ind TunnellingRequest, once per gateway
+        """
+        self._handlers.append(handler)
+
+    def remove_handler(self, handler):
+        self._handlers.remove(handler)
+
+    def add_route(self, pattern, gateway_addr):
+        """
+        Send the telegrams of a group address range through one gateway, e.g. the gateway of their line
+        Several gateways can serve the same range, the most specific range wins. Group addresses
+        without a route are sent through any gateway.
+        :param pattern: '1/4/10', '1/4/*' or '1/*', see knxnet.dispatch.Dispatcher.parse_pattern()
+        :param gateway_addr: (ip, port) of a gateway of the pool
+        """
+        gateway_addr = tuple(gateway_addr)
+        if gateway_addr not in self.gateways:
+            raise KnxnetException('{0} is not a gateway of the pool'.format(gateway_addr))
+        level, key = Dispatcher.parse_pattern(pattern)
+        if level not in self._routes:
+            raise KnxnetException('Invalid route pattern {0}'.format(pattern))
+        gateways = self._routes[level].setdefault(key, [])
+        if gateway_addr not in gateways:
+            gateways.append(gateway_addr)
+        self._route_cache.clear()
+
+    def route(self, dest_addr_group):
+        """
+        :param dest_addr_group: GroupAddress object
+        :return: tuple of the gateways serving the group address
+        """
+        gateways = self._route_cache.get(dest_addr_group.value)
+        if gateways is None:
+            gateways = tuple(self.gateways)
+            for level in (EXACT, MIDDLE, MAIN):
+                routed = self._routes[level].get(dest_addr_group.value >> level)
+                if routed:
+                    gateways = tuple(routed)
+                    break
+            self._route_cache[dest_addr_group.value] = gateways
+        return gateways
+
+    async def write(self, dest_addr_group, data, data_size=1):
+        """
+        Send a group value write through a tunnel of the gateways of dest_addr_group
+        :return: round trip time of the telegram, in seconds
+        """
+        return await self._call(dest_addr_group, lambda client, dest: client.write(dest, data, data_size))
+
+    async def write_many(self, telegrams):
+        """
+        Send many group value writes, spread across the tunnels
+        :param telegrams: iterable of (dest_addr_group, data, data_size)
+        :return: list of round trip times, in the order of telegrams
+        """
+        return await asyncio.gather(*[self.write(dest_addr_group, data, data_size)
+                                      for dest_addr_group, data, data_size in telegrams])
+
+    async def read(self, dest_addr_group, timeout=None, max_age=None):
+        """
+        Send a group value read through a tunnel of the gateways of dest_addr_group
+        :return: the data of the response
+        """
+        return await self._call(dest_addr_group, lambda client, dest: client.read(dest, timeout, max_age))
+
+    async def send(self, dest_addr_group, data, data_size, apci):
+        """
+        Send one telegram through a tunnel of the gateways of dest_addr_group, see TunnelClient.send()
+        """
+        return await self._call(dest_addr_group, lambda client, dest: client.send(dest, data, data_size, apci))
+
+    async def _call(self, dest_addr_group, request):
+        """
+        Run request(client, dest_addr_group) on the least busy tunnel, then on the next ones while tunnels fail
+        Only connection failures move the request to another tunnel: a request the gateway answered
+        with an error status may already be on the bus, and is not repeated.
+        """
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        gateways = self.route(dest_addr_group)
+        error = None
+        for _ in range(len(self.slots)):
+            slot = self._choose(gateways)
+            if slot is None:
+                break
+            slot.in_flight += 1
+            try:
+                result = await request(slot.client, dest_addr_group)
+            except (KnxnetConnectionException, OSError) as e:  # errors reported by the gateway are not retried
+                error = e
+                self._failed(slot, e)
+                self.failovers += 1
+                continue
+            finally:
+                slot.in_flight -= 1
+            slot.sent += 1
+            return result
+        if error is not None:
+            raise error
+        raise KnxnetException('No tunnel connected to {0} for {1}'.format(gateways, dest_addr_group))
+
+    def _choose(self, gateways):
+        """
+        :return: the connected slot of gateways with the fewest requests in flight, None if there is none
+        """
+        best = None
+        start = next(self._round_robin)  # rotate the ties
+        for i in range(len(self.slots)):
+            slot = self.slots[(start + i) % len(self.slots)]
+            if slot.gateway_addr not in gateways or slot.client is None:
+                continue
+            if not slot.connected:  # lost by the heartbeat or disconnected by the gateway
+                self._failed(slot, KnxnetConnectionException('Tunnel closed'))
+                continue
+            if best is None or slot.in_flight < best.in_flight:
+                best = slot
+        return best
+
+    async def _open(self, slot):
+        try:
+            client = await TunnelClient.connect(slot.gateway_addr, **self.client_kwargs)
+        except (KnxnetException, OSError, asyncio.TimeoutError) as e:
+            logger.warning('Tunnel to %s not opened: %s', slot.gateway_addr, e)
+            return False
+        if self._closed:
+            await client.disconnect()
+            return False
+        slot.client = client
+        client.add_handler(lambda frame: self._indication_received(slot, frame))
+        if not self._is_listening(slot.gateway_addr):
+            self._listeners[slot.gateway_addr] = slot
+        return True
+
+    def _is_listening(self, gateway_addr):
+        listener = self._listeners.get(gateway_addr)
+        return listener is not None and listener.connected
+
+    def _indication_received(self, slot, frame):
+        if self._listeners.get(slot.gateway_addr) is not slot:
+            return  # the other tunnels of the gateway receive the same telegrams
+        for handler in list(self._handlers):
+            try:
+                handler(frame)
+            except Exception:
+                logger.exception('Tunnelling request handler failed')
+
+    def _failed(self, slot, exc):
+        """
+        Drop the tunnel of slot, it is reconnected in the background
+        """
+        client = slot.client
+        if client is None:
+            return
+        logger.warning('Tunnel %s to %s failed: %s', client.channel_id, slot.gateway_addr, exc)
+        slot.client = None
+        slot.failures += 1
+        task = asyncio.ensure_future(self._disconnect(client))  # frees the tunnel slot of the gateway
+        self._disconnect_tasks.add(task)
+        task.add_done_callback(self._disconnect_tasks.discard)
+        if self._listeners.get(slot.gateway_addr) is slot:
+            del self._listeners[slot.gateway_addr]
+            for other in self.slots:
+                if other.gateway_addr == slot.gateway_addr and other.connected:
+                    self._listeners[slot.gateway_addr] = other
+                    break
+        self._schedule_reconnect()
+
+    @staticmethod
+    async def _disconnect(client):
+        try:
+            await client.disconnect()
+        finally:
+            if client.transport is not None:
+                client.transport.close()
+
+    def _schedule_reconnect(self):
+        if self._closed or (self._reconnect_task is not None and not self._reconnect_task.done()):
+            return
+        if all(slot.client is not None for slot in self.slots):
+            return
+        self._reconnect_task = asyncio.ensure_future(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closed:
+            await asyncio.sleep(self.reconnect_interval)
+            missing = [slot for slot in self.slots if slot.client is None]
+            if not missing:
+                return
+            opened = await asyncio.gather(*[self._open(slot) for slot in missing])
+            self.reconnections += sum(opened)
+
+    async def close(self):
+        """
+        Close every tunnel of the pool
+        """
+        self._closed = True
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        for task in list(self._disconnect_tasks):
+            task.cancel()
+        clients = [slot.client for slot in self.slots if slot.client is not None]
+        for slot in self.slots:
+            slot.client = None
+        self._listeners.clear()
+        await asyncio.gather(*[self._disconnect(client) for client in clients], *self._disconnect_tasks,
+                             return_exceptions=True)
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+
+"""
+Replay of recorded group telegrams through a live connection
+
+The telegrams of a capture (knxnet.capture, knxnet.pcap) or a list of TunnellingRequest are sent
+again through a TunnelClient, TunnelPool, SendScheduler or RoutingEndpoint, with their recorded
+relative timing scaled by speed, to reproduce the load peaks of a site against a test gateway:
+
+    with CaptureReader('site.knxcap') as capture:
+        report = await Replayer(client, speed=10).replay(capture.records())
+    print(report)  # throughput, ack latency percentiles, drops, schedule lag
+
+The telegrams are sent again with the sender's own channel id and sequence counters: only the
+destination, APCI and data of the recorded frames are replayed.
+"""
+
+import asyncio
+
+from knxnet.knxnet import *
+from knxnet.tunnel import L_DATA_REQ, L_DATA_IND
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+MAX_SPEED = None  # speed of a replay which sends the telegrams as fast as the sender takes them
+
+
+def percentile(values, p):
+    """
+    :return: the nearest rank p percentile of values, 0.0 if there is none
+    """
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+class ReplayReport():
+    """
+    Outcome of a replay
+    """
+    def __init__(self):
+        self.sent = 0  # telegrams the sender succeeded to send
+        self.dropped = 0  # telegrams the sender failed to send (no ack, tunnel lost)
+        self.skipped = 0  # recorded frames which are not group telegrams, or L_Data.con
+        self.elapsed = 0.0  # seconds from the first telegram to the last result
+        self.latencies = []  # seconds, ack round trip time of each telegram sent
+        self.lags = []  # seconds, delay of each telegram behind its scaled recorded time
+
+    @property
+    def throughput(self):
+        """
+        Telegrams sent per second
+        """
+        return self.sent / self.elapsed if self.elapsed else 0.0
+
+    def latency(self, p):
+        return percentile(self.latencies, p)
+
+    def lag(self, p):
+        return percentile(self.lags, p)
+
+    def __str__(self):
+        out = '{:<25}{:>12}\n'.format('sent', self.sent)
+        out += '{:<25}{:>12}\n'.format('dropped', self.dropped)
+        out += '{:<25}{:>12}\n'.format('skipped', self.skipped)
+        out += '{:<25}{:>12.3f}\n'.format('elapsed (s)', self.elapsed)
+        out += '{:<25}{:>12.0f}\n'.format('telegrams/s', self.throughput)
+        for p in (50, 90, 99, 100):
+            out += '{:<25}{:>12.2f}\n'.format('ack latency p{0} (ms)'.format(p), self.latency(p) * 1e3)
+        for p in (50, 99, 100):
+            out += '{:<25}{:>12.2f}\n'.format('lag p{0} (ms)'.format(p), self.lag(p) * 1e3)
+        return out
+
+
+class Replayer():
+    """
+    Sends recorded group telegrams again, at 1x, Nx or maximum speed
+    A telegram recorded t seconds after the first one is sent t / speed seconds after the start of
+    the replay. Telegrams which can not be sent on time (sender too slow, max_in_flight reached)
+    are sent as soon as possible, and their delay is reported as lag: a faithful replay has a
+    small lag. Frames without timestamp are sent back to back.
+    """
+    SPEED = 1.0
+    MAX_IN_FLIGHT = 256
+
+    def __init__(self, sender, speed=SPEED, max_in_flight=MAX_IN_FLIGHT, data_services=(L_DATA_REQ, L_DATA_IND)):
+        """
+        :param sender: object with a coroutine send(dest_addr_group, data, data_size, apci), e.g. a TunnelClient
+        :param speed: time scale of the replay, 2 for twice as fast as recorded, MAX_SPEED for no pacing
+        :param max_in_flight: telegrams waiting for the sender at once, bounds the memory of the replay
+        :param data_services: cEMI message codes replayed. L_Data.con repeat the L_Data.req of a tunnel
+                              capture and are skipped by default
+        """
+        if speed is not None and speed <= 0:
+            raise KnxnetException('Replay speed must be > 0, or MAX_SPEED')
+        self.sender = sender
+        self.speed = speed
+        self.max_in_flight = max_in_flight
+        self.data_services = frozenset(data_services)
+
+    async def replay(self, telegrams):
+        """
+        :param telegrams: iterable of frames, of (timestamp, frame) (PcapReader.decoded()) or of
+                          (timestamp, ..., frame) (CaptureReader.records()). A frame is a datagram
+                          (bytes-like) or a decoded TunnellingRequest, TunnellingRequestView or
+                          RoutingIndication. Iterated lazily, one telegram ahead of the replay
+        :return: ReplayReport object
+        """
+        loop = asyncio.get_running_loop()
+        report = ReplayReport()
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+        sending = set()
+        start = loop.time()
+        first = None  # recorded timestamp of the first telegram
+        try:
+            for item in telegrams:
+                if isinstance(item, tuple):
+                    timestamp, frame = item[0], item[-1]
+                else:
+                    timestamp, frame = None, item
+                telegram = self._telegram(frame)
+                if telegram is None:
+                    report.skipped += 1
+                    continue
+                now = loop.time()
+                due = now
+                if self.speed is not None and timestamp is not None:
+                    if first is None:
+                        first = timestamp
+                        start = now
+                    due = start + (timestamp - first) / self.speed
+                    if due > now:
+                        await asyncio.sleep(due - now)
+                await semaphore.acquire()
+                report.lags.append(max(0.0, loop.time() - due))
+                task = asyncio.ensure_future(self._send(telegram, report, semaphore))
+                sending.add(task)
+                task.add_done_callback(sending.discard)
+            if sending:
+                await asyncio.gather(*sending)
+        finally:
+            for task in sending:
+                task.cancel()
+        report.elapsed = loop.time() - start
+        return report
+
+    def _telegram(self, frame):
+        """
+        :return: (dest_addr_group, data, data_size, apci) of a group telegram to replay, else None
+        """
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            try:
+                frame = decode_frame(frame, lazy=True)
+            except KnxnetException:
+                return None
+        if getattr(frame, 'data_service', None) not in self.data_services:
+            return None  # not a cEMI frame, or not replayed
+        dest_addr_group = frame.dest_addr_group
+        if not isinstance(dest_addr_group, GroupAddress):
+            return None
+        data = frame.data
+        if not isinstance(data, int):
+            data = bytes(data)  # no view on the capture
+        return dest_addr_group, data, frame.data_size, frame.apci
+
+    async def _send(self, telegram, report, semaphore):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        try:
+            result = await self.sender.send(*telegram)
+        except (KnxnetException, OSError, asyncio.TimeoutError):
+            report.dropped += 1
+            return
+        finally:
+            semaphore.release()
+        report.sent += 1
+        # a TunnelClient returns the ack round trip time, the other senders are timed here
+        report.latencies.append(result if isinstance(result, float) else loop.time() - start)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import random
+import socket
+
+import knxnet.knxnet
+from knxnet.knxnet import *
+from knxnet.tunnel import L_DATA_IND, APCI_GROUP_VALUE_WRITE
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+logger = logging.getLogger(__name__)
+
+ROUTING_MULTICAST_ADDR = '224.0.23.12'
+ROUTING_PORT = 3671
+
+
+class RoutingEndpoint(asyncio.DatagramProtocol):
+    """
+    asyncio KNXnet/IP routing endpoint: multicast sender and receiver of routing indications
+    No connection, no ack: every routing indication on the multicast group is passed to the
+    handlers (and to the dispatcher, which decodes only the subscribed group addresses).
+    Sending is paced to max_rate indications per second, and paused when a router multicasts
+    a ROUTING_BUSY, with the random backoff of the KNXnet/IP routing specification so that
+    the senders do not all resume at once. ROUTING_LOST_MESSAGE are counted in lost_messages.
+    Datagrams are sent from a second socket, so the endpoint ignores its own looped back frames.
+
+        endpoint = await RoutingEndpoint.open()
+        endpoint.add_handler(print)
+        await endpoint.send('1/4/10', 1, 1)
+        endpoint.close()
+    """
+    MAX_RATE = 50  # routing indications per second, what a KNX TP line can absorb
+    # ROUTING_BUSY flow control, in seconds
+    BUSY_COUNT_INTERVAL = 0.01  # ROUTING_BUSY received less than 10 ms apart count once in N
+    BUSY_RANDOM_DELAY = 0.05  # extra pause after wait time: random(0, 1) * N * 50 ms
+    BUSY_SLOW_DURATION = 0.1  # N is kept N * 100 ms after the pause...
+    BUSY_DECREMENT_INTERVAL = 0.005  # ...then decremented every 5 ms
+
+    def __init__(self, group=ROUTING_MULTICAST_ADDR, port=ROUTING_PORT, max_rate=MAX_RATE, dispatcher=None,
+                 seed=None):
+        """
+        :param group: multicast address of the routing indications
+        :param port: UDP port of the routing indications
+        :param max_rate: routing indications sent per second at most, None for no pacing
+        :param dispatcher: knxnet.dispatch.Dispatcher receiving the routing indication datagrams
+        :param seed: seed of the backoff random generator
+        """
+        self.group = group
+        self.port = port
+        self.max_rate = max_rate
+        self.dispatcher = dispatcher
+        self.transport = None
+        self.sender = None  # transport of the sending socket
+        self.sent_indications = 0
+        self.received_indications = 0
+        self.received_busy = 0
+        self.lost_messages = 0  # total reported by ROUTING_LOST_MESSAGE
+        self._handlers = []
+        self._send_lock = asyncio.Lock()
+        self._next_send = 0.0
+        self._pause_until = 0.0
+        self._slow_until = 0.0
+        self._busy_count = 0  # N of the specification
+        self._last_busy = None
+        self._random = random.Random(seed)
+
+    @classmethod
+    async def open(cls, group=ROUTING_MULTICAST_ADDR, port=ROUTING_PORT, interface='0.0.0.0', loopback=True, ttl=16,
+                   **kwargs):
+        """
+        Join the multicast group and open the sending socket
+        :param port: 0 picks a free port, other endpoints of this host can then join with endpoint.port
+        :param interface: IP of the network interface, '127.0.0.1' for tests on one host
+        :param loopback: deliver the sent datagrams to the other endpoints of this host
+        :param ttl: multicast time to live
+        :param kwargs: see RoutingEndpoint.__init__
+        """
+        loop = asyncio.get_running_loop()
+        receiver = cls._multicast_socket(interface, loopback, ttl)
+        receiver.bind(('', port))
+        receiver.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP,
+                            socket.inet_aton(group) + socket.inet_aton(interface))
+        sender = cls._multicast_socket(interface, loopback, ttl)
+        sender.bind(('' if interface == '0.0.0.0' else interface, 0))
+        endpoint = cls(group, receiver.getsockname()[1], **kwargs)
+        await loop.create_datagram_endpoint(lambda: endpoint, sock=receiver)
+        endpoint.sender, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, sock=sender)
+        return endpoint
+
+    @staticmethod
+    def _multicast_socket(interface, loopback, ttl):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1 if loopback else 0)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+        sock.setblocking(False)
+        return sock
+
+    def close(self):
+        if self.sender is not None:
+            self.sender.close()
+        if self.transport is not None:
+            self.transport.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def add_handler(self, handler):
+        """
+        :param handler: callable(RoutingIndication), called for each routing indication received
+        """
+        self._handlers.append(handler)
+
+    def remove_handler(self, handler):
+        self._handlers.remove(handler)
+
+    @property
+    def paused(self):
+        """
+        True while a ROUTING_BUSY holds the sending
+        """
+        return asyncio.get_running_loop().time() < self._pause_until
+
+    async def send(self, dest_addr_group, data, data_size, apci=APCI_GROUP_VALUE_WRITE, **kwargs):
+        """
+        Multicast a routing indication
+        :param kwargs: see RoutingIndication.create_from_data()
+        """
+        await self.send_frame(RoutingIndication.create_from_data(dest_addr_group, data, data_size, apci, L_DATA_IND,
+                                                                 **kwargs).frame)
+
+    async def send_frame(self, frame):
+        """
+        Multicast one datagram, once the pacing and the ROUTING_BUSY pause allow it
+        Concurrent senders are served in order.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._send_lock:
+            while True:  # a ROUTING_BUSY may extend the pause while waiting
+                delay = max(self._next_send, self._pause_until) - loop.time()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self._sendto(frame)
+            self.sent_indications += 1
+            if self.max_rate:
+                self._next_send = loop.time() + 1 / self.max_rate
+
+    def send_busy(self, wait_time, device_state=0x00):
+        """
+        Ask the other endpoints to pause, as a router with a full queue does
+        :param wait_time: in milliseconds
+        """
+        self._sendto(RoutingBusy.create_from_data(wait_time, device_state).frame)
+
+    def send_lost_message(self, lost_messages, device_state=0x00):
+        self._sendto(RoutingLostMessage.create_from_data(lost_messages, device_state).frame)
+
+    def _sendto(self, frame):
+        self.sender.sendto(frame, (self.group, self.port))
+        metrics = knxnet.knxnet._metrics
+        if metrics is not None:
+            metrics.frame_sent(frame)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 6 or self._is_own(addr):
+            return
+        metrics = knxnet.knxnet._metrics
+        if metrics is not None:
+            metrics.frame_received(data)
+        try:
+            if data[2] == 0x05 and data[3] == 0x30:  # routing indication
+                self.received_indications += 1
+                if self.dispatcher is not None:
+                    self.dispatcher.dispatch(data)
+                if not self._handlers:
+                    return
+            frame = decode_frame(data)
+        except KnxnetException as e:
+            logger.debug('Invalid frame from %s: %s', addr, e)
+            return
+        if isinstance(frame, RoutingIndication):
+            for handler in list(self._handlers):
+                try:
+                    handler(frame)
+                except Exception:
+                    logger.exception('Routing indication handler failed')
+        elif isinstance(frame, RoutingBusy):
+            self._busy_received(frame)
+        elif isinstance(frame, RoutingLostMessage):
+            self.lost_messages += frame.lost_messages
+            logger.warning('%s lost %d routing indications', addr, frame.lost_messages)
+
+    def _is_own(self, addr):
+        if self.sender is None:
+            return False
+        ip_addr, port = self.sender.get_extra_info('sockname')[:2]
+        return addr[1] == port and (ip_addr == '0.0.0.0' or addr[0] == ip_addr)
+
+    def _busy_received(self, frame):
+        """
+        Pause wait_time, plus random(0, 1) * N * 50 ms, N counting the recent ROUTING_BUSY
+        """
+        now = asyncio.get_running_loop().time()
+        self.received_busy += 1
+        if self._busy_count and now > self._slow_until:
+            decrements = int((now - self._slow_until) / self.BUSY_DECREMENT_INTERVAL)
+            self._busy_count = max(0, self._busy_count - decrements)
+        if self._last_busy is None or now - self._last_busy > self.BUSY_COUNT_INTERVAL:
+            self._busy_count += 1
+        self._last_busy = now
+        pause = frame.wait_time / 1000 + self._random.random() * self._busy_count * self.BUSY_RANDOM_DELAY
+        self._pause_until = max(self._pause_until, now + pause)
+        self._slow_until = self._pause_until + self._busy_count * self.BUSY_SLOW_DURATION
+        logger.debug('ROUTING_BUSY: pause %.3f s (N = %d)', pause, self._busy_count)
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+"""
+Outgoing telegram scheduler
+
+A KNX TP line carries a few dozen telegrams per second: the SendScheduler queues the telegrams of
+the application, sends them paced by a token bucket per line, most urgent first, and sends only
+the last value of the writes which are still waiting for their turn:
+
+    scheduler = SendScheduler(tunnel_client, rate=20, burst=5)
+    scheduler.add_line('1/*', 'line 1.1', 30)
+    await scheduler.write('1/4/10', 1, 1, PRIORITY_ALARM)
+    scheduler.queue_depth, scheduler.wait_time_max
+"""
+
+import asyncio
+import collections
+
+from knxnet.knxnet import *
+from knxnet.tunnel import APCI_GROUP_VALUE_READ, APCI_GROUP_VALUE_WRITE
+from knxnet.dispatch import Dispatcher, EXACT, MIDDLE, MAIN
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+# priority classes, most urgent first: the KNX system, urgent, normal and low priorities
+PRIORITY_SYSTEM = 0
+PRIORITY_ALARM = 1
+PRIORITY_HIGH = 2
+PRIORITY_LOW = 3
+PRIORITIES = (PRIORITY_SYSTEM, PRIORITY_ALARM, PRIORITY_HIGH, PRIORITY_LOW)
+
+
+class _Telegram():
+    def __init__(self, dest_addr_group, data, data_size, apci, priority, queued, line):
+        self.dest_addr_group = dest_addr_group
+        self.data = data
+        self.data_size = data_size
+        self.apci = apci
+        self.priority = priority
+        self.queued = queued  # clock time of the first enqueue
+        self.line = line  # _Line whose queue holds the telegram
+        self.waiters = []  # futures of the callers, all resolved when the telegram is sent
+        self.superseded = False  # replaced by a more urgent write to the same group address
+
+
+class _Line():
+    """
+    Queues and token bucket of one KNX line
+    """
+    def __init__(self, name, rate, burst, now):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = now
+        self.queues = [collections.deque() for _ in PRIORITIES]
+        self.depth = 0  # telegrams waiting, superseded ones excluded
+        self.wakeup = asyncio.Event()
+        self.task = None
+
+    def refill(self, now):
+        if self.rate is None:
+            return
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def pop(self):
+        for queue in self.queues:
+            while queue:
+                telegram = queue.popleft()
+                if not telegram.superseded:
+                    return telegram
+        return None
+
+
+class SendScheduler():
+    """
+    Bus load aware sending of group telegrams through a TunnelClient, TunnelPool or RoutingEndpoint
+    Telegrams are queued per line and priority class. Each line sends at most rate telegrams per
+    second, with bursts of burst telegrams, the most urgent class first and in order within a class.
+    A write to a group address which already has a write waiting in the queue replaces its value
+    (last write wins): the superseded value is never sent and both callers get the result of the
+    telegram actually sent.
+    The priority class orders the queues, the cEMI priority of the telegrams is left to the sender.
+    """
+    RATE = 20  # telegrams per second, about half of what a TP line can carry
+    BURST = 5
+
+    def __init__(self, sender, rate=RATE, burst=BURST, clock=None, sleep=asyncio.sleep):
+        """
+        :param sender: object with a coroutine send(dest_addr_group, data, data_size, apci)
+        :param rate: telegrams per second of the lines which have no rate of their own, None for no pacing
+        :param burst: telegrams sent back to back after an idle period
+        :param clock: time source of the token buckets, in seconds, None for the time of the event loop
+        :param sleep: coroutine waiting for the next token, given the seconds to wait on clock
+        """
+        self.sender = sender
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.dispatched = 0  # telegrams handed to the sender
+        self.sent = 0  # telegrams the sender succeeded to send
+        self.coalesced = 0  # writes replaced by a later one before being sent
+        self.failed = 0
+        self.wait_time_total = 0.0  # seconds between enqueue and dispatch, summed over the dispatched telegrams
+        self.wait_time_max = 0.0
+        self._lines = {}  # name -> _Line
+        self._line_config = {}  # name -> (rate, burst)
+        self._routes = {EXACT: {}, MIDDLE: {}, MAIN: {}}  # level -> key -> line name
+        self._route_cache = {}  # packed group address -> line name
+        self._pending_writes = {}  # GroupAddress -> _Telegram waiting in a queue
+        self._sending = set()
+        self._idle = None  # asyncio.Event set when nothing is queued nor being sent, created by join()
+        self._closed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def add_line(self, pattern, name, rate, burst=None):
+        """
+        Pace the group addresses of pattern in the line name, e.g. the group addresses of one TP line
+        Group addresses without a line are paced together, in the line None.
+        :param pattern: '1/4/10', '1/4/*' or '1/*', see knxnet.dispatch.Dispatcher.parse_pattern()
+        :param rate: telegrams per second of the line, None for no pacing
+        :param burst: None for the burst of the scheduler
+        """
+        level, key = Dispatcher.parse_pattern(pattern)
+        if level not in self._routes:
+            raise KnxnetException('Invalid line pattern {0}'.format(pattern))
+        self._routes[level][key] = name
+        self._route_cache.clear()
+        self._line_config[name] = (rate, self.burst if burst is None else burst)
+        line = self._lines.get(name)
+        if line is not None:
+            line.rate, line.burst = self._line_config[name]
+
+    def line(self, dest_addr_group):
+        """
+        :param dest_addr_group: GroupAddress object
+        :return: name of the line of the group address
+        """
+        name = self._route_cache.get(dest_addr_group.value, self)
+        if name is self:
+            name = None
+            for level in (EXACT, MIDDLE, MAIN):
+                routed = self._routes[level].get(dest_addr_group.value >> level, self)
+                if routed is not self:
+                    name = routed
+                    break
+            self._route_cache[dest_addr_group.value] = name
+        return name
+
+    @property
+    def queue_depth(self):
+        """
+        Telegrams waiting to be sent, in all the lines
+        """
+        return sum(line.depth for line in self._lines.values())
+
+    def depth(self, line=None, priority=None):
+        """
+        :return: telegrams waiting in a line, in one priority class or in all of them
+        """
+        line = self._lines.get(line)
+        if line is None:
+            return 0
+        if priority is None:
+            return line.depth
+        return sum(1 for telegram in line.queues[priority] if not telegram.superseded)
+
+    @property
+    def wait_time_avg(self):
+        return self.wait_time_total / self.dispatched if self.dispatched else 0.0
+
+    async def write(self, dest_addr_group, data, data_size=1, priority=PRIORITY_LOW):
+        """
+        Queue a group value write, coalesced with the write to the same group address already waiting
+        :return: result of the sender once the telegram is sent (round trip time of a TunnelClient)
+        """
+        return await self.send(dest_addr_group, data, data_size, APCI_GROUP_VALUE_WRITE, priority)
+
+    async def read(self, dest_addr_group, priority=PRIORITY_LOW):
+        """
+        Queue a group value read, the response is received by the handlers of the sender
+        """
+        return await self.send(dest_addr_group, 0, 1, APCI_GROUP_VALUE_READ, priority)
+
+    async def send(self, dest_addr_group, data, data_size, apci, priority=PRIORITY_LOW):
+        """
+        Queue one telegram and wait until it is sent
+        """
+        if self._closed:
+            raise KnxnetException('Scheduler is closed')
+        if priority not in PRIORITIES:
+            raise KnxnetException('Priority must be one of {0}'.format(PRIORITIES))
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        line = self._get_line(self.line(dest_addr_group))
+        pending = self._pending_writes.get(dest_addr_group) if apci == APCI_GROUP_VALUE_WRITE else None
+        if pending is not None and pending.priority <= priority:
+            pending.data, pending.data_size = data, data_size
+            pending.waiters.append(waiter)
+            self.coalesced += 1
+        else:
+            telegram = _Telegram(dest_addr_group, data, data_size, apci, priority, self._now(), line)
+            if pending is not None:  # more urgent than the waiting write: it takes its place
+                pending.superseded = True
+                pending.line.depth -= 1  # not line if add_line() routed the group address elsewhere since
+                telegram.queued = pending.queued
+                telegram.waiters = pending.waiters
+                self.coalesced += 1
+            telegram.waiters.append(waiter)
+            if apci == APCI_GROUP_VALUE_WRITE:
+                self._pending_writes[dest_addr_group] = telegram
+            line.queues[priority].append(telegram)
+            line.depth += 1
+            line.wakeup.set()
+        return await waiter
+
+    def _now(self):
+        return asyncio.get_running_loop().time() if self.clock is None else self.clock()
+
+    def _get_line(self, name):
+        line = self._lines.get(name)
+        if line is None:
+            rate, burst = self._line_config.get(name, (self.rate, self.burst))
+            line = self._lines[name] = _Line(name, rate, burst, self._now())
+            line.task = asyncio.ensure_future(self._run(line))
+        return line
+
+    async def _run(self, line):
+        """
+        Send the telegrams of a line as the tokens of its bucket allow
+        """
+        while True:
+            if not line.depth:
+                line.wakeup.clear()
+                await line.wakeup.wait()
+                continue
+            now = self._now()
+            line.refill(now)
+            if line.rate is not None and line.tokens < 1:
+                # the telegram is picked once the token is there: late urgent telegrams and writes still coalesce
+                await self.sleep((1 - line.tokens) / line.rate)
+                continue
+            telegram = line.pop()
+            line.depth -= 1
+            if self._pending_writes.get(telegram.dest_addr_group) is telegram:
+                del self._pending_writes[telegram.dest_addr_group]
+            if line.rate is not None:
+                line.tokens -= 1
+            wait_time = now - telegram.queued
+            self.dispatched += 1
+            self.wait_time_total += wait_time
+            self.wait_time_max = max(self.wait_time_max, wait_time)
+            task = asyncio.ensure_future(self._send(telegram))
+            self._sending.add(task)
+            task.add_done_callback(self._sent)
+
+    def _sent(self, task):
+        self._sending.discard(task)
+        if self._idle is not None and not self._sending and not self.queue_depth:
+            self._idle.set()
+
+    async def _send(self, telegram):
+        try:
+            result = await self.sender.send(telegram.dest_addr_group, telegram.data, telegram.data_size,
+                                            telegram.apci)
+        except Exception as e:
+            self.failed += 1
+            for waiter in telegram.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+        self.sent += 1
+        for waiter in telegram.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def join(self):
+        """
+        Wait until every queued telegram is sent
+        """
+        if self._idle is None:
+            self._idle = asyncio.Event()
+        while (self.queue_depth or self._sending) and not self._closed:
+            self._idle.clear()
+            await self._idle.wait()
+
+    async def close(self):
+        """
+        Stop the lines, the telegrams still queued fail with a KnxnetException
+        """
+        self._closed = True
+        if self._idle is not None:
+            self._idle.set()
+        for line in self._lines.values():
+            line.task.cancel()
+            while line.depth:
+                telegram = line.pop()
+                line.depth -= 1
+                for waiter in telegram.waiters:
+                    if not waiter.done():
+                        waiter.set_exception(KnxnetException('Scheduler closed'))
+        self._pending_writes.clear()
+        await asyncio.gather(*[line.task for line in self._lines.values()], *self._sending, return_exceptions=True)
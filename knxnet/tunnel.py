@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+
+import knxnet.knxnet
+from knxnet.knxnet import *
+from knxnet.knxnet import _check_data_width
+from knxnet.capture import RECEIVED, SENT
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+logger = logging.getLogger(__name__)
+
+L_DATA_REQ = 0x11
+L_DATA_IND = 0x29
+L_DATA_CON = 0x2e
+
+APCI_GROUP_VALUE_READ = 0x0
+APCI_GROUP_VALUE_RESPONSE = 0x1
+APCI_GROUP_VALUE_WRITE = 0x2
+
+
+class KnxnetConnectionException(KnxnetException):
+    """
+    The tunnel failed: not connected, lost, closed by the gateway, or a request was never acked
+    A request which failed with it can be repeated on another tunnel, unlike one which the gateway
+    answered with an error status.
+    """
+    pass
+
+
+class TunnelClient(asyncio.DatagramProtocol):
+    """
+    asyncio KNXnet/IP tunnelling client
+    Handles the connect / disconnect handshake, the heartbeat, the sequence counters and the
+    tunnelling acks. Incoming L_Data.ind telegrams are passed to the handlers. Each client
+    owns one UDP endpoint, so one event loop can drive many tunnels.
+    With window_size > 1, up to window_size tunnelling requests are in flight at once and their
+    acks are matched by sequence counter (the specification itself is stop-and-wait: window_size=1).
+
+        client = await TunnelClient.connect(('192.168.1.10', 3671))
+        await client.write('1/4/10', 1, 1)
+        value = await client.read('1/4/10')
+        await client.disconnect()
+    """
+    KNXNET_PORT = 3671
+    # timeouts from the KNXnet/IP tunnelling specification, in seconds
+    CONNECT_REQUEST_TIMEOUT = 10
+    CONNECTION_STATE_REQUEST_TIMEOUT = 10
+    HEARTBEAT_INTERVAL = 60
+    HEARTBEAT_RETRIES = 3
+    TUNNELLING_REQUEST_TIMEOUT = 1
+    TUNNELLING_REQUEST_RETRIES = 2
+    READ_TIMEOUT = 2
+    # half of the 8 bits sequence counter space, so that a late ack can not match a wrapped around request
+    MAX_WINDOW_SIZE = 128
+
+    def __init__(self, gateway_addr, heartbeat_interval=HEARTBEAT_INTERVAL,
+                 ack_timeout=TUNNELLING_REQUEST_TIMEOUT, read_timeout=READ_TIMEOUT, nat=True,
+                 window_size=1, retries=TUNNELLING_REQUEST_RETRIES, process_image=None, capture=None):
+        """
+        :param gateway_addr: (ip, port) of the KNXnet/IP gateway
+        :param heartbeat_interval: seconds between two connection state requests
+        :param ack_timeout: seconds to wait for a tunnelling ack before repeating the request
+        :param read_timeout: seconds to wait for the group value response of a read
+        :param nat: announce ('0.0.0.0', 0) endpoints so the gateway answers to the datagrams source
+        :param window_size: number of tunnelling requests in flight (waiting for their ack)
+        :param retries: number of transmissions of a tunnelling request before giving up
+        :param process_image: knxnet.image.ProcessImage kept up to date with the group values of the tunnel,
+                              which serves read() while its values are fresh
+        :param capture: knxnet.capture.CaptureWriter recording every datagram sent and received
+        """
+        if window_size < 1 or window_size > self.MAX_WINDOW_SIZE:
+            raise KnxnetException('Window size must be 1 <= window_size <= {0}'.format(self.MAX_WINDOW_SIZE))
+        self.gateway_addr = gateway_addr
+        self.heartbeat_interval = heartbeat_interval
+        self.ack_timeout = ack_timeout
+        self.read_timeout = read_timeout
+        self.nat = nat
+        self.window_size = window_size
+        self.retries = retries
+        self.process_image = process_image
+        self.capture = capture
+        self.transport = None
+        self.channel_id = None
+        self.sequence_counter = 0x0  # next sequence counter we send
+        self.connected = False
+        self._expected_sequence_counter = 0x0  # next sequence counter we expect from the gateway
+        self._endpoint = None
+        self._pending = {}  # response key -> future
+        self._read_waiters = {}  # GroupAddress -> list of futures
+        self._handlers = []
+        self._window = asyncio.Semaphore(window_size)
+        self._heartbeat_task = None
+        self._templates = TunnellingRequestCache()
+
+    @classmethod
+    async def connect(cls, gateway_addr, local_addr=None, **kwargs):
+        """
+        Open the UDP endpoint and the tunnel connection
+        :param gateway_addr: (ip, port) of the KNXnet/IP gateway
+        :param local_addr: optional (ip, port) to bind
+        :param kwargs: see TunnelClient.__init__
+        :return: the connected TunnelClient
+        """
+        loop = asyncio.get_running_loop()
+        client = cls(gateway_addr, **kwargs)
+        await loop.create_datagram_endpoint(lambda: client, local_addr=local_addr, remote_addr=gateway_addr)
+        try:
+            await client._open()
+        except BaseException:
+            client.transport.close()
+            raise
+        return client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    def add_handler(self, handler):
+        """
+        :param handler: callable receiving every incoming L_Data.ind TunnellingRequest
+        """
+        self._handlers.append(handler)
+
+    def remove_handler(self, handler):
+        self._handlers.remove(handler)
+
+    async def write(self, dest_addr_group, data, data_size=1):
+        """
+        Send a group value write and wait for its tunnelling ack
+        :param dest_addr_group: GroupAddress object, or string
+        :return: round trip time of the telegram, in seconds
+        """
+        return await self.send(dest_addr_group, data, data_size, APCI_GROUP_VALUE_WRITE)
+
+    async def write_many(self, telegrams):
+        """
+        Send many group value writes, pipelined up to window_size
+        :param telegrams: iterable of (dest_addr_group, data, data_size)
+        :return: list of round trip times, in the order of telegrams
+        """
+        return await asyncio.gather(*[self.write(dest_addr_group, data, data_size)
+                                      for dest_addr_group, data, data_size in telegrams])
+
+    async def read(self, dest_addr_group, timeout=None, max_age=None):
+        """
+        Send a group value read and wait for the group value response
+        With a process image, its value is returned instead while it is fresh enough.
+        :param dest_addr_group: GroupAddress object, or string
+        :param max_age: freshness window of the process image, in seconds, None for its max_age
+        :return: the data of the response
+        """
+        if not isinstance(dest_addr_group, GroupAddress):
+            dest_addr_group = GroupAddress.from_str(dest_addr_group)
+        if self.process_image is not None:
+            data = self.process_image.read(dest_addr_group, max_age)
+            if data is not None:
+                return data
+        waiter = asyncio.get_running_loop().create_future()
+        self._read_waiters.setdefault(dest_addr_group, []).append(waiter)
+        try:
+            await self.send(dest_addr_group, 0, 1, APCI_GROUP_VALUE_READ)
+            response = await asyncio.wait_for(waiter, self.read_timeout if timeout is None else timeout)
+        finally:
+            waiters = self._read_waiters.get(dest_addr_group)
+            if waiters is not None and waiter in waiters:
+                waiters.remove(waiter)
+                if not waiters:
+                    del self._read_waiters[dest_addr_group]
+        return response.data
+
+    async def send(self, dest_addr_group, data, data_size, apci):
+        """
+        Send one L_Data.req tunnelling request, retransmitted if it is not acked in time
+        Waits for a free slot in the window, then for the ack matching its sequence counter.
+        Int data wider than data_size - 1 bytes is rejected before anything is sent, the process
+        image could not hold it once the telegram is acked.
+        :return: round trip time between the last transmission and the ack, in seconds
+        """
+        _check_data_width(data, data_size)
+        async with self._window:
+            if not self.connected:
+                raise KnxnetConnectionException('Tunnel is not connected')
+            sequence_counter = self.sequence_counter
+            self.sequence_counter = (sequence_counter + 1) & 0xff
+            frame = self._templates.frame(dest_addr_group, self.channel_id, data, data_size, apci, L_DATA_REQ,
+                                          sequence_counter)
+            key = (ServiceTypeDescriptor.TUNNELLING_ACK, self.channel_id, sequence_counter)
+            loop = asyncio.get_running_loop()
+            for _ in range(self.retries):
+                start = loop.time()
+                try:
+                    ack = await self._request(frame, key, self.ack_timeout)
+                    round_trip_time = loop.time() - start
+                    break
+                except asyncio.TimeoutError:
+                    continue
+            else:
+                raise KnxnetConnectionException('No tunnelling ack for sequence counter {0}'.format(sequence_counter))
+            if ack.status != 0:
+                raise KnxnetException('Tunnelling ack error status {0}'.format(hex(ack.status)))
+            if self.process_image is not None and apci == APCI_GROUP_VALUE_WRITE:
+                self.process_image.set(dest_addr_group, data, data_size)
+            metrics = knxnet.knxnet._metrics
+            if metrics is not None:
+                metrics.ack_received(round_trip_time)
+            return round_trip_time
+
+    async def disconnect(self):
+        """
+        Close the tunnel connection and the UDP endpoint
+        """
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        if self.connected:
+            self.connected = False
+            frame = create_frame(ServiceTypeDescriptor.DISCONNECT_REQUEST, self.channel_id, self._endpoint).frame
+            try:
+                await self._request(frame, (ServiceTypeDescriptor.DISCONNECT_RESPONSE, self.channel_id),
+                                    self.CONNECTION_STATE_REQUEST_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning('No disconnect response from %s', self.gateway_addr)
+        if self.transport is not None:
+            self.transport.close()
+
+    async def _open(self):
+        if self.nat:
+            self._endpoint = Hpai.from_data('0.0.0.0', 0)
+        else:
+            self._endpoint = Hpai.from_data(*self.transport.get_extra_info('sockname')[:2])
+        frame = create_frame(ServiceTypeDescriptor.CONNECTION_REQUEST, self._endpoint, self._endpoint).frame
+        response = await self._request(frame, (ServiceTypeDescriptor.CONNECTION_RESPONSE,),
+                                       self.CONNECT_REQUEST_TIMEOUT)
+        if response.status != 0:
+            raise KnxnetException('Connection refused, status {0}'.format(hex(response.status)))
+        self.channel_id = response.channel_id
+        self.sequence_counter = 0x0
+        self._expected_sequence_counter = 0x0
+        self.connected = True
+        self._heartbeat_task = asyncio.ensure_future(self._heartbeat())
+
+    async def _heartbeat(self):
+        frame = create_frame(ServiceTypeDescriptor.CONNECTION_STATE_REQUEST, self.channel_id, self._endpoint).frame
+        key = (ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE, self.channel_id)
+        while self.connected:
+            await asyncio.sleep(self.heartbeat_interval)
+            for _ in range(self.HEARTBEAT_RETRIES):
+                try:
+                    response = await self._request(frame, key, self.CONNECTION_STATE_REQUEST_TIMEOUT)
+                except asyncio.TimeoutError:
+                    continue
+                if response.status == 0:
+                    break
+            else:
+                logger.warning('Tunnel %s to %s lost', self.channel_id, self.gateway_addr)
+                self._heartbeat_task = None
+                await self.disconnect()
+                self._abort(KnxnetConnectionException('Connection lost'))
+                return
+
+    async def _request(self, frame, key, timeout):
+        """
+        Send frame and wait for the response matching key
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            self._sendto(frame)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def _abort(self, exc):
+        self.connected = False
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(exc)
+        for waiters in self._read_waiters.values():
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_exception(exc)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+        self._abort(exc or KnxnetConnectionException('Tunnel closed'))
+
+    def datagram_received(self, data, addr):
+        metrics = knxnet.knxnet._metrics
+        if metrics is not None:
+            metrics.frame_received(data)
+        if self.capture is not None:
+            self.capture.write(data, RECEIVED, self.channel_id or 0)
+        try:
+            frame = decode_frame(data)
+        except KnxnetException as e:
+            logger.debug('Invalid frame from %s: %s', addr, e)
+            return
+        service_type_descriptor = frame.header.service_type_descriptor
+        if service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST:
+            self._tunnelling_request_received(frame)
+        elif service_type_descriptor is ServiceTypeDescriptor.DISCONNECT_REQUEST:
+            if frame.channel_id == self.channel_id:
+                self._sendto(create_frame(ServiceTypeDescriptor.DISCONNECT_RESPONSE, self.channel_id, 0).frame)
+                self._abort(KnxnetConnectionException('Disconnected by the gateway'))
+        else:
+            if service_type_descriptor is ServiceTypeDescriptor.CONNECTION_RESPONSE:
+                key = (service_type_descriptor,)
+            elif service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_ACK:
+                key = (service_type_descriptor, frame.channel_id, frame.sequence_counter)
+            else:
+                key = (service_type_descriptor, frame.channel_id)
+            future = self._pending.get(key)
+            if future is not None and not future.done():
+                future.set_result(frame)
+
+    def _tunnelling_request_received(self, frame):
+        if frame.channel_id != self.channel_id:
+            return
+        sequence_counter = frame.sequence_counter
+        if sequence_counter == self._expected_sequence_counter:
+            self._send_ack(sequence_counter)
+            self._expected_sequence_counter = (sequence_counter + 1) & 0xff
+        elif sequence_counter == (self._expected_sequence_counter - 1) & 0xff:
+            self._send_ack(sequence_counter)  # our previous ack was lost: ack again, do not process twice
+            return
+        else:
+            return
+        if frame.data_service != L_DATA_IND:
+            return
+        if self.process_image is not None:
+            self.process_image.update(frame)
+        if frame.apci == APCI_GROUP_VALUE_RESPONSE:
+            for waiter in self._read_waiters.pop(frame.dest_addr_group, ()):
+                if not waiter.done():
+                    waiter.set_result(frame)
+        for handler in list(self._handlers):
+            try:
+                handler(frame)
+            except Exception:
+                logger.exception('Tunnelling request handler failed')
+
+    def _send_ack(self, sequence_counter):
+        self._sendto(create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, self.channel_id, 0, sequence_counter).frame)
+
+    def _sendto(self, frame):
+        self.transport.sendto(frame)
+        metrics = knxnet.knxnet._metrics
+        if metrics is not None:
+            metrics.frame_sent(frame)
+        if self.capture is not None:
+            self.capture.write(frame, SENT, self.channel_id or 0)
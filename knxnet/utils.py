@@ -1,5 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import struct
+import warnings
+
+try:
+    import numpy
+except ImportError:  # numpy is only required by the array codecs
+    numpy = None
+
 __author__ = "Adrien Lescourt"
 __copyright__ = "HES-SO 2015, Project EMG4B"
 __credits__ = ["Adrien Lescourt"]
@@ -8,20 +16,97 @@ __email__ = "adrien.lescourt@gmail.com"
 __status__ = "Prototype"
 
 
-class GroupAddress():
-    def __init__(self, main_group, middle_group, sub_group):
-        self.main_group = main_group
-        self.middle_group = middle_group
-        self.sub_group = sub_group
+class _InternedAddress():
+    """
+    Immutable KNX address identified by its packed 16 bits value
+    Instances are interned: there is at most one object per class and address value,
+    so they are cheap to create repeatedly and can be used as dict keys or set members.
+    """
+    __slots__ = ('_value',)
+    _LAYOUT = ()  # (name, shift, max value) of each component in the packed 16 bits address
+    _interned = None  # address value -> instance, one table per subclass
+
+    def __new__(cls, *components):
+        value = 0
+        for component, (name, shift, max_value) in zip(components, cls._LAYOUT):
+            if component < 0 or component > max_value:
+                raise KnxnetUtilsException('{0} must be 0 <= {1} <= {2}'.format(
+                    name, name.lower().replace(' ', '_'), max_value))
+            value |= component << shift
+        return cls.from_int(value)
+
+    @classmethod
+    def from_int(cls, value):
+        """
+        Get the address object from its packed 16 bits value
+        """
+        address = cls._interned.get(value)
+        if address is None:
+            if value < 0 or value > 0xFFFF:
+                raise KnxnetUtilsException('Address must be two bytes')
+            address = object.__new__(cls)
+            object.__setattr__(address, '_value', value)
+            address = cls._interned.setdefault(value, address)
+        return address
+
+    @property
+    def value(self):
+        """
+        Packed 16 bits address
+        """
+        return self._value
+
+    def __int__(self):
+        return self._value
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} is immutable'.format(self.__class__.__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError('{0} is immutable'.format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return self.__class__.from_int, (self._value,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __eq__(self, other):
+        return self is other or (isinstance(other, self.__class__) and self._value == other._value)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+class GroupAddress(_InternedAddress):
+    __slots__ = ()
+    _LAYOUT = (('Main group', 11, 31), ('Middle group', 8, 7), ('Sub group', 0, 255))
+    _interned = {}
+
+    def __new__(cls, main_group, middle_group, sub_group):
+        return super().__new__(cls, main_group, middle_group, sub_group)
+
+    @property
+    def main_group(self):
+        return self._value >> 11
+
+    @property
+    def middle_group(self):
+        return (self._value >> 8) & 0x7
+
+    @property
+    def sub_group(self):
+        return self._value & 0xFF
 
     @property
     def frame(self):
-        out = bytearray()
-        b = self.main_group << 3
-        b |= self.middle_group
-        out.append(b)
-        out.append(self.sub_group)
-        return out
+        return bytearray((self._value >> 8, self._value & 0xFF))
 
     @classmethod
     def from_str(cls, group_address_str):
@@ -30,7 +115,7 @@ class GroupAddress():
         :param group_address_str: eg: '1/4/10'
         """
         groups = group_address_str.split('/')
-        if len(groups) is not 3:
+        if len(groups) != 3:
             raise KnxnetUtilsException('Format must be x/y/z')
         main_group = int(groups[0])
         middle_group = int(groups[1])
@@ -38,10 +123,10 @@ class GroupAddress():
         if main_group < 0 or main_group > 31:
             raise KnxnetUtilsException('Main group must be 0 <= main_group < 32')
         if middle_group < 0 or middle_group > 7:
-            raise KnxnetUtilsException('Main group must be 0 <= main_group < 8')
+            raise KnxnetUtilsException('Middle group must be 0 <= middle_group < 8')
         if sub_group < 0 or sub_group > 255:
-            raise KnxnetUtilsException('Main group must be 0 <= main_group < 256')
-        return cls(main_group, middle_group, sub_group)
+            raise KnxnetUtilsException('Sub group must be 0 <= sub_group < 256')
+        return cls.from_int((main_group << 11) | (middle_group << 8) | sub_group)
 
     @classmethod
     def from_full_address(cls, address):
@@ -62,10 +147,40 @@ class GroupAddress():
         """
         if len(group_address_bytes) > 2:
             raise KnxnetUtilsException('Group address must be two bytes')
-        main_group = group_address_bytes[0] >> 3
-        middle_group = group_address_bytes[0] & 0x7
-        sub_group = group_address_bytes[1]
-        return cls(main_group, middle_group, sub_group)
+        return cls.from_int((group_address_bytes[0] << 8) | group_address_bytes[1])
+
+    @staticmethod
+    def array_from_components(main_group, middle_group, sub_group):
+        """
+        Pack arrays of group components into 16 bits group addresses, in one vectorized call
+        :return: numpy uint16 array
+        """
+        return _pack_array((main_group, middle_group, sub_group), GroupAddress._LAYOUT)
+
+    @staticmethod
+    def array_to_components(group_addresses):
+        """
+        Unpack 16 bits group addresses (numpy array, array('H'), list...)
+        :return: (main_group, middle_group, sub_group) numpy arrays
+        """
+        return _unpack_array(group_addresses, GroupAddress._LAYOUT)
+
+    @staticmethod
+    def array_from_str(group_address_strs):
+        """
+        Parse many group address strings at once
+        :param group_address_strs: iterable of strings, eg: ['1/4/10', '2/0/1']
+        :return: numpy uint16 array of packed group addresses
+        """
+        return _array_from_str(group_address_strs, '/', GroupAddress._LAYOUT)
+
+    @staticmethod
+    def array_to_str(group_addresses):
+        """
+        Format many 16 bits group addresses at once
+        :return: numpy array of strings, eg: ['1/4/10', '2/0/1']
+        """
+        return _array_to_str(group_addresses, '/', GroupAddress._LAYOUT)
 
     def __repr__(self):
         return 'KNX group address: {0}/{1}/{2}'.format(self.main_group, self.middle_group, self.sub_group)
@@ -73,25 +188,29 @@ class GroupAddress():
     def __str__(self):
         return '{0}/{1}/{2}'.format(self.main_group, self.middle_group, self.sub_group)
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.__dict__ == other.__dict__
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
+class IndividualAddress(_InternedAddress):
+    __slots__ = ()
+    _LAYOUT = (('Area', 12, 15), ('Line', 8, 15), ('Bus device', 0, 255))
+    _interned = {}
+
+    def __new__(cls, area, line, bus_device):
+        return super().__new__(cls, area, line, bus_device)
+
+    @property
+    def area(self):
+        return self._value >> 12
 
+    @property
+    def line(self):
+        return (self._value >> 8) & 0xF
 
-class IndividualAddress():
-    def __init__(self, area, line, bus_device):
-        self.area = area
-        self.line = line
-        self.bus_device = bus_device
+    @property
+    def bus_device(self):
+        return self._value & 0xFF
 
     def get_bytes(self):
-        b = self.area << 4
-        b |= self.line
-        b <<= 8
-        b |= self.bus_device
-        return b
+        return self._value
 
     @classmethod
     def from_str(cls, individual_address):
@@ -100,7 +219,7 @@ class IndividualAddress():
         :param individual_address: as string (eg: 4.0.10)
         """
         data = individual_address.split('.')
-        if len(data) is not 3:
+        if len(data) != 3:
             raise KnxnetUtilsException('Format must be x.y.z')
         area = int(data[0])
         line = int(data[1])
@@ -110,8 +229,8 @@ class IndividualAddress():
         if line < 0 or line > 15:
             raise KnxnetUtilsException('Line must be 0 <= line < 16')
         if bus_device < 0 or bus_device > 255:
-            raise KnxnetUtilsException('Line must be 0 <= bus_device < 256')
-        return cls(area, line, bus_device)
+            raise KnxnetUtilsException('Bus device must be 0 <= bus_device < 256')
+        return cls.from_int((area << 12) | (line << 8) | bus_device)
 
     @classmethod
     def from_full_address(cls, address):
@@ -132,10 +251,40 @@ class IndividualAddress():
         """
         if individual_address > 0xFFFF:
             raise KnxnetUtilsException('Physical address must be two bytes')
-        area = (individual_address >> 12) & 0xF
-        line = (individual_address >> 8) & 0xF
-        bus_device = individual_address & 0xFF
-        return cls(area, line, bus_device)
+        return cls.from_int(individual_address)
+
+    @staticmethod
+    def array_from_components(area, line, bus_device):
+        """
+        Pack arrays of area, line and bus device into 16 bits individual addresses, in one vectorized call
+        :return: numpy uint16 array
+        """
+        return _pack_array((area, line, bus_device), IndividualAddress._LAYOUT)
+
+    @staticmethod
+    def array_to_components(individual_addresses):
+        """
+        Unpack 16 bits individual addresses (numpy array, array('H'), list...)
+        :return: (area, line, bus_device) numpy arrays
+        """
+        return _unpack_array(individual_addresses, IndividualAddress._LAYOUT)
+
+    @staticmethod
+    def array_from_str(individual_address_strs):
+        """
+        Parse many individual address strings at once
+        :param individual_address_strs: iterable of strings, eg: ['4.0.10', '1.1.1']
+        :return: numpy uint16 array of packed individual addresses
+        """
+        return _array_from_str(individual_address_strs, '.', IndividualAddress._LAYOUT)
+
+    @staticmethod
+    def array_to_str(individual_addresses):
+        """
+        Format many 16 bits individual addresses at once
+        :return: numpy array of strings, eg: ['4.0.10', '1.1.1']
+        """
+        return _array_to_str(individual_addresses, '.', IndividualAddress._LAYOUT)
 
     def __repr__(self):
         return 'KNX Physical address: {0}.{1}.{2}'.format(self.area, self.line, self.bus_device)
@@ -143,19 +292,18 @@ class IndividualAddress():
     def __str__(self):
         return '{0}.{1}.{2}'.format(self.area, self.line, self.bus_device)
 
-    def __eq__(self, other):
-        return isinstance(other, self.__class__) and self.__dict__ == other.__dict__
-
-    def __ne__(self, other):
-        return not self.__eq__(other)
-
 
 class Hpai():
+    # structure length, host protocol code, IPv4 address (4 bytes), port
+    LAYOUT = 'BB4BH'
+    _STRUCT = struct.Struct('>' + LAYOUT)
+
     def __init__(self, ip_addr, port, structure_length, host_protocol_code):
         self.structure_length = structure_length
         self.host_protocol_code = host_protocol_code
         self.ip_addr = ip_addr
         self.port = port
+        self._ip_cache = None  # (ip_addr, parsed ip bytes)
 
     @classmethod
     def from_data(cls, ip_addr, port, structure_length=0x08, host_protocol_code=0x01):
@@ -168,36 +316,129 @@ class Hpai():
         return cls(ip_addr, port, structure_length, host_protocol_code)
 
     @classmethod
-    def from_frame(cls, hpai_bytes):
-        structure_length = hpai_bytes[0]
-        host_protocol_code = hpai_bytes[1]
-        ip_addr = str(hpai_bytes[2]) + '.'
-        ip_addr += str(hpai_bytes[3]) + '.'
-        ip_addr += str(hpai_bytes[4]) + '.'
-        ip_addr += str(hpai_bytes[5])
-        port = (hpai_bytes[6] << 8) | hpai_bytes[7]
+    def from_frame(cls, hpai_bytes, offset=0):
+        """
+        :param hpai_bytes: buffer holding the 8 bytes HPAI
+        :param offset: position of the HPAI in the buffer
+        """
+        structure_length = hpai_bytes[offset]
+        host_protocol_code = hpai_bytes[offset + 1]
+        ip_addr = '{0}.{1}.{2}.{3}'.format(hpai_bytes[offset + 2], hpai_bytes[offset + 3],
+                                           hpai_bytes[offset + 4], hpai_bytes[offset + 5])
+        port = (hpai_bytes[offset + 6] << 8) | hpai_bytes[offset + 7]
         return cls(ip_addr, port, structure_length, host_protocol_code)
 
+    def fields(self):
+        """
+        HPAI values in the order of Hpai.LAYOUT, to be packed in a larger frame
+        """
+        if self._ip_cache is None or self._ip_cache[0] != self.ip_addr:
+            fields = self.ip_addr.split('.')
+            if len(fields) != 4:
+                raise KnxnetUtilsException('Invalid IP address')
+            ip_bytes = tuple(int(field) for field in fields)
+            for field_int in ip_bytes:
+                if field_int < 0 or field_int > 255:
+                    raise KnxnetUtilsException('Invalid IP address')
+            self._ip_cache = (self.ip_addr, ip_bytes)
+        return (self.structure_length, self.host_protocol_code) + self._ip_cache[1] + (self.port & 0xFFFF,)
+
     @property
     def frame(self):
-        out = bytearray()
-        out.append(self.structure_length)
-        out.append(self.host_protocol_code)
-        fields = self.ip_addr.split('.')
-        if len(fields) != 4:
-            raise KnxnetUtilsException('Invalid IP address')
-        for field in fields:
-            field_int = int(field)
-            if field_int > 255:
-                raise KnxnetUtilsException('Invalid IP address')
-            out.append(field_int)
-        out.append((self.port >> 8) & 0xFF)
-        out.append(self.port & 0xFF)
+        out = bytearray(Hpai._STRUCT.size)
+        Hpai._STRUCT.pack_into(out, 0, *self.fields())
         return out
 
+    def encode_into(self, buffer, offset=0):
+        """
+        Write the 8 bytes HPAI directly into a caller-supplied buffer
+        :return: number of bytes written
+        """
+        Hpai._STRUCT.pack_into(buffer, offset, *self.fields())
+        return Hpai._STRUCT.size
+
     def __str__(self):
         return self.ip_addr + ':' + str(self.port)
 
 
 class KnxnetUtilsException(Exception):
     pass
+
+
+def _require_numpy():
+    if numpy is None:
+        raise KnxnetUtilsException('Address array codecs require numpy')
+
+
+def _pack_array(components, layout):
+    """
+    Check the component ranges in bulk and pack them into 16 bits addresses
+    """
+    _require_numpy()
+    out = numpy.zeros(numpy.broadcast(*components).shape, dtype=numpy.uint16)
+    for values, (name, shift, max_value) in zip(components, layout):
+        values = numpy.asarray(values, dtype=numpy.int64)
+        invalid = (values < 0) | (values > max_value)
+        if invalid.any():
+            raise KnxnetUtilsException('{0} must be 0 <= {1} <= {2} (index {3})'.format(
+                name, name.lower().replace(' ', '_'), max_value, int(numpy.argmax(invalid))))
+        out |= (values << shift).astype(numpy.uint16)
+    return out
+
+
+def _unpack_array(addresses, layout):
+    _require_numpy()
+    addresses = numpy.asarray(addresses)
+    if addresses.dtype.kind not in 'iu':
+        raise KnxnetUtilsException('Addresses must be integers')
+    if addresses.size and (addresses.min() < 0 or addresses.max() > 0xFFFF):
+        raise KnxnetUtilsException('Addresses must be two bytes')
+    addresses = addresses.astype(numpy.uint16)
+    return tuple((addresses >> shift) & max_value for _, shift, max_value in layout)
+
+
+def _array_from_str(address_strs, separator, layout):
+    """
+    Parse all the address strings with a single split / int conversion, then check and pack them in bulk
+    """
+    _require_numpy()
+    address_strs = numpy.asarray(address_strs, dtype=str)
+    if address_strs.size == 0:
+        return numpy.zeros(0, dtype=numpy.uint16)
+    # exactly three non-empty decimal fields per string, so that the joined text splits back address by address
+    invalid = (numpy.char.count(address_strs, separator) != 2) | \
+        ~numpy.char.isdecimal(numpy.char.replace(address_strs, separator, '')) | \
+        (numpy.char.find(address_strs, separator * 2) >= 0) | \
+        numpy.char.startswith(address_strs, separator) | numpy.char.endswith(address_strs, separator)
+    if invalid.any():
+        raise KnxnetUtilsException('Format must be x{0}y{0}z (index {1})'.format(separator, int(numpy.argmax(invalid))))
+    text = ' '.join(address_strs.tolist()).replace(separator, ' ')
+    try:
+        with warnings.catch_warnings():
+            # older numpy only warn and stop at the first token which is not an integer, caught by the size check
+            warnings.simplefilter('ignore', DeprecationWarning)
+            values = numpy.fromstring(text, dtype=numpy.int64, sep=' ')
+    except ValueError:
+        raise KnxnetUtilsException('Format must be x{0}y{0}z'.format(separator))
+    if values.size != 3 * address_strs.size:
+        raise KnxnetUtilsException('Format must be x{0}y{0}z'.format(separator))
+    values = values.reshape(-1, 3)
+    return _pack_array((values[:, 0], values[:, 1], values[:, 2]), layout)
+
+
+_DECIMAL_STRS = None
+
+
+def _array_to_str(addresses, separator, layout):
+    """
+    Format the addresses by indexing a table of precomputed decimal strings
+    """
+    global _DECIMAL_STRS
+    if _DECIMAL_STRS is None:
+        _require_numpy()
+        _DECIMAL_STRS = numpy.array([str(i) for i in range(256)])
+    components = _unpack_array(addresses, layout)
+    out = _DECIMAL_STRS[components[0]]
+    for values in components[1:]:
+        out = numpy.char.add(numpy.char.add(out, separator), _DECIMAL_STRS[values])
+    return out
@@ -24,8 +24,18 @@ setup(
     license="HES-SO 2015, Project EMG4B",
     keywords="KNX",
     packages=['knxnet', 'tests'],
+    python_requires='>=3.8',
+    extras_require={
+        'numpy': ['numpy'],
+    },
     long_description=read('README.md'),
     classifiers=[
         "Development Status :: 3 - Alpha",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
+        "Programming Language :: Python :: 3.8",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
     ],
 )
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import struct
+import tempfile
+import unittest
+from knxnet.knxnet import *
+from knxnet.knxnet import numpy
+from knxnet.capture import *
+from knxnet.gateway import GatewayEmulator
+from knxnet.tunnel import TunnelClient
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_frame(i):
+    if i % 5 == 0:
+        return create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0, i & 0xff).frame
+    return create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/{0}/{1}'.format(i % 8, i % 10), 0x07,
+                        i & 0xff, 2, 0x2, 0x29, i & 0xff).frame
+
+
+class CaptureTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'bus.knxcap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, start, stop, **kwargs):
+        with CaptureWriter(self.path, index_interval=16, **kwargs) as capture:
+            for i in range(start, stop):
+                capture.write(sample_frame(i), SENT if i % 2 else RECEIVED, i % 3, timestamp=1000.0 + i)
+
+    def test_write_read(self):
+        print()
+        print('Test capture file.....', end='')
+        self.write(0, 100)
+        with CaptureReader(self.path) as capture:
+            self.assertEqual(len(capture), 100)
+            self.assertEqual((capture.start_time, capture.end_time), (1000.0, 1099.0))
+            records = list(capture.records())
+            self.assertEqual([timestamp for timestamp, _, _, _ in records], [1000.0 + i for i in range(100)])
+            self.assertEqual([(direction, tunnel) for _, direction, tunnel, _ in records[:3]],
+                             [(RECEIVED, 0), (SENT, 1), (RECEIVED, 2)])
+            frame = records[1][3]
+            self.assertIsInstance(frame, memoryview)
+            self.assertEqual(decode_frame(frame).frame, sample_frame(1))
+            del records, frame
+            # time range
+            self.assertEqual([timestamp for timestamp, _, _, _ in capture.records(1040.0, 1043.0)],
+                             [1040.0, 1041.0, 1042.0])
+            # group address, only the blocks which hold it are walked
+            frames = list(capture.frames(dest_addr_group='1/3/3'))
+            self.assertEqual(len(frames), 3)
+            self.assertTrue(all(str(decode_frame(frame).dest_addr_group) == '1/3/3' for frame in frames))
+            self.assertEqual(list(capture.frames(1000.0, 1020.0, GroupAddress(1, 3, 3))), frames[:1])
+            self.assertEqual(list(capture.records(dest_addr_group='2/0/0')), [])
+            del frames
+            if numpy is not None:
+                columns = decode_frames(capture.buffer, capture.frame_offsets())
+                self.assertEqual(len(columns), 100)
+        print('Success')
+
+    def test_close_with_views(self):
+        print()
+        print('Test capture file closed while its frames are used.....', end='')
+        self.write(0, 20)
+        capture = CaptureReader(self.path)
+        frame = next(capture.frames())
+        headers = struct.iter_unpack('>H', capture.buffer[:len(capture.buffer) & ~1])
+        exported = struct.iter_unpack('>H', capture.buffer)  # holds an export of buffer itself
+        if numpy is not None:
+            array = numpy.frombuffer(capture.buffer, dtype=numpy.uint8)
+        capture.close()
+        self.assertTrue(capture._file.closed)
+        self.assertEqual(decode_frame(frame).frame, sample_frame(0))
+        self.assertEqual(len(list(headers)), len(capture.buffer) // 2)
+        if numpy is not None:
+            self.assertEqual(bytes(array[:8]), MAGIC)
+            del array
+        del frame, headers, exported
+        capture.close()  # twice
+        print('Success')
+
+    def test_append_and_recover(self):
+        print()
+        print('Test capture file append and recovery.....', end='')
+        self.write(0, 40)
+        self.write(40, 50)  # appended after the footer of the first writer
+        writer = CaptureWriter(self.path, index_interval=16)
+        for i in range(50, 70):
+            writer.write(sample_frame(i), timestamp=1000.0 + i)
+        writer.write(sample_frame(70), timestamp=900.0)  # clock going back
+        writer.flush()
+        # crashed: no footer, and a truncated record
+        with open(self.path, 'ab') as f:
+            f.write(b'\x01\x00\x00')
+        with CaptureReader(self.path) as capture:
+            self.assertEqual(len(capture), 71)
+            self.assertEqual(list(capture.records(1069.0))[-1][0], 1069.0)
+        writer._file.close()
+        self.write(71, 80)
+        with CaptureReader(self.path) as capture:
+            timestamps = [timestamp for timestamp, _, _, _ in capture.records()]
+            self.assertEqual(len(timestamps), 80)
+            self.assertEqual(timestamps, sorted(timestamps))
+            self.assertEqual(len(list(capture.records(dest_addr_group='1/3/3'))), 2)
+        with open(self.path, 'wb') as f:
+            f.write(b'not a capture file')
+        self.assertRaises(KnxnetException, CaptureReader, self.path)
+        self.assertRaises(KnxnetException, CaptureWriter, self.path)
+        print('Success')
+
+
+class TunnelCaptureTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_tunnel_client_capture(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tunnel.knxcap')
+            gateway = await GatewayEmulator.start()
+            with CaptureWriter(path) as capture:
+                async with await TunnelClient.connect(gateway.addr, capture=capture) as client:
+                    await client.write('1/4/10', 0xab, 2)
+                    await asyncio.sleep(0.01)
+            gateway.close()
+            with CaptureReader(path) as capture:
+                services = [(direction, decode_frame(frame).header.service_type_descriptor)
+                            for _, direction, _, frame in capture.records()]
+                self.assertEqual(services[:2], [(SENT, ServiceTypeDescriptor.CONNECTION_REQUEST),
+                                                (RECEIVED, ServiceTypeDescriptor.CONNECTION_RESPONSE)])
+                self.assertIn((SENT, ServiceTypeDescriptor.TUNNELLING_REQUEST), services)
+                self.assertIn((RECEIVED, ServiceTypeDescriptor.TUNNELLING_ACK), services)
+                self.assertEqual(len(list(capture.records(dest_addr_group='1/4/10'))), 2)  # L_Data.req and .con
+                del services
+
+
+if __name__ == '__main__':
+    unittest.main()
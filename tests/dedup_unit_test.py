@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from knxnet.knxnet import *
+from knxnet.dedup import *
+from knxnet.dispatch import Dispatcher
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class Clock():
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeduplicatorTestCase(unittest.TestCase):
+
+    def test_windows(self):
+        print()
+        print('Test duplicated telegram suppression.....', end='')
+        clock = Clock()
+        deduplicator = Deduplicator(window=0.2, repeat_window=2.0, clock=clock)
+        request = TunnellingRequest.create_from_data('1/4/10', 0x07, 0xab, 2, source_addr='1.1.5')
+        repeated = TunnellingRequest.create_from_data('1/4/10', 0x07, 0xab, 2, source_addr='1.1.5', repeat=True)
+        routed = RoutingIndication.create_from_data('1/4/10', 0xab, 2, source_addr='1.1.5')
+        self.assertTrue(deduplicator.accept(request))
+        clock.now += 0.1
+        self.assertFalse(deduplicator.accept(routed))  # same telegram through a router
+        self.assertFalse(deduplicator.accept(repeated))
+        clock.now += 1.0
+        self.assertFalse(deduplicator.accept(repeated))  # still in the repeat window
+        self.assertTrue(deduplicator.accept(request))  # written again
+        clock.now += 0.1
+        self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, 0xac, 2,
+                                                                              source_addr='1.1.5')))
+        self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, 0xac, 2,
+                                                                              source_addr='1.1.6')))
+        self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, 0xac, 2, apci=0x1,
+                                                                              source_addr='1.1.6')))
+        self.assertEqual((deduplicator.accepted, deduplicator.suppressed, deduplicator.suppressed_repeats), (5, 3, 2))
+        self.assertEqual(len(deduplicator), 4)  # one entry per source, destination, APCI and data
+        # lazy views and extended frames
+        frame = TunnellingRequest.create_from_data('1/4/11', 0x07, bytes(range(20)), 21).frame
+        self.assertTrue(deduplicator.accept(decode_frame(frame, lazy=True)))
+        self.assertFalse(deduplicator.accept(decode_frame(frame)))
+        print('Success')
+
+    def test_interleaved_sources(self):
+        print()
+        print('Test duplicated telegram suppression with interleaved sources.....', end='')
+        clock = Clock()
+        deduplicator = Deduplicator(window=0.2, repeat_window=2.0, clock=clock)
+        first = TunnellingRequest.create_from_data('1/4/10', 0x07, 0x01, 2, source_addr='1.1.5')
+        second = TunnellingRequest.create_from_data('1/4/10', 0x07, 0x02, 2, source_addr='1.1.6')
+        self.assertTrue(deduplicator.accept(first))
+        self.assertTrue(deduplicator.accept(second))
+        clock.now += 0.05
+        self.assertFalse(deduplicator.accept(first))  # copies of both, through another tunnel
+        self.assertFalse(deduplicator.accept(second))
+        self.assertEqual((deduplicator.accepted, deduplicator.suppressed), (2, 2))
+        # the entries expire once older than both windows
+        clock.now += 2.0
+        self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/11', 0x07, 0x01, 2)))
+        self.assertEqual(len(deduplicator), 1)
+        # and the table never holds more than capacity entries, the oldest are evicted
+        deduplicator = Deduplicator(clock=clock, capacity=3)
+        for i in range(5):
+            self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, i, 2)))
+        self.assertEqual(len(deduplicator), 3)
+        self.assertFalse(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, 4, 2)))
+        self.assertTrue(deduplicator.accept(TunnellingRequest.create_from_data('1/4/10', 0x07, 0, 2)))
+        print('Success')
+
+    def test_dispatcher(self):
+        print()
+        print('Test duplicated telegram suppression before dispatch.....', end='')
+        received = []
+        dispatcher = Dispatcher(deduplicator=Deduplicator())
+        dispatcher.subscribe('1/*', received.append)
+        frame = TunnellingRequest.create_from_data('1/4/10', 0x07, 0xab, 2).frame
+        self.assertEqual(dispatcher.dispatch(frame), 1)
+        self.assertEqual(dispatcher.dispatch(frame), 0)
+        self.assertEqual(dispatcher.dispatch_request(decode_frame(frame)), 0)
+        handler = Deduplicator().filter(received.append)
+        handler(decode_frame(frame))
+        handler(decode_frame(frame))
+        self.assertEqual(len(received), 2)
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
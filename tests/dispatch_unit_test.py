@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from knxnet.knxnet import *
+from knxnet.dispatch import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def request_frame(dest_addr_group, data=0x1):
+    return bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, dest_addr_group, 0x07, data, 2, 0x2, 0x29).frame)
+
+
+class DispatcherTestCase(unittest.TestCase):
+
+    def test_subscriptions(self):
+        print()
+        print('Test exact, range and wildcard subscriptions.....', end='')
+        dispatcher = Dispatcher()
+        calls = []
+
+        def handler(name):
+            return lambda request: calls.append((name, str(request.dest_addr_group)))
+
+        exact, middle, main, wildcard = handler('exact'), handler('middle'), handler('main'), handler('wildcard')
+        dispatcher.subscribe('1/4/10', exact)
+        dispatcher.subscribe('1/4/*', middle)
+        dispatcher.subscribe('1/*/*', main)
+        dispatcher.subscribe('*', wildcard)
+        self.assertEqual(dispatcher.dispatch(request_frame('1/4/10')), 4)
+        self.assertEqual(calls, [('exact', '1/4/10'), ('middle', '1/4/10'), ('main', '1/4/10'),
+                                 ('wildcard', '1/4/10')])
+        del calls[:]
+        self.assertEqual(dispatcher.dispatch(request_frame('1/5/10')), 2)
+        self.assertEqual(dispatcher.dispatch(request_frame('2/4/10')), 1)
+        self.assertEqual(calls, [('main', '1/5/10'), ('wildcard', '1/5/10'), ('wildcard', '2/4/10')])
+        dispatcher.unsubscribe('*', wildcard)
+        dispatcher.unsubscribe(GroupAddress(1, 4, 10), exact)
+        self.assertEqual(dispatcher.dispatch(request_frame('2/4/10')), 0)
+        self.assertEqual(dispatcher.handlers(GroupAddress(1, 4, 10).value), (middle, main))
+        print('Success')
+
+        print('Test invalid subscription patterns.....', end='')
+        for pattern in ('1/*/10', '*/4/10', '1/4/10/2', '32/*', 'a/b'):
+            self.assertRaises(KnxnetException, dispatcher.subscribe, pattern, exact)
+        print('Success')
+
+    def test_no_decode_without_subscribers(self):
+        print()
+        print('Test frames without subscribers are not decoded.....', end='')
+        dispatcher = Dispatcher()
+        received = []
+        dispatcher.subscribe('1/4/10', received.append)
+        invalid = bytearray(request_frame('1/4/11'))
+        invalid[18] = 9  # data size past the end, decode_frame would raise
+        self.assertEqual(dispatcher.dispatch(invalid), 0)
+        self.assertEqual(dispatcher.dispatch(bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0).frame)), 0)
+        self.assertEqual(dispatcher.dispatch(bytes(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                                                                IndividualAddress(1, 4, 10), 0x07, 0x1, 1).frame)), 0)
+        self.assertEqual(received, [])
+        frame = TunnellingRequest.create_from_data('1/4/10', 0x07, 0x0c33, 3,
+                                                   additional_info=bytes([0x03, 0x02, 0xab, 0xcd])).frame
+        self.assertEqual(dispatcher.dispatch(frame), 1)
+        self.assertEqual(received[0].data, 0x0c33)
+        print('Success')
+
+        print('Test lazy dispatch and decoded requests.....', end='')
+        dispatcher = Dispatcher(lazy=True)
+        received = []
+        dispatcher.subscribe('1/4/10', received.append)
+        dispatcher.dispatch(request_frame('1/4/10', 0xab))
+        self.assertIsInstance(received[0], TunnellingRequestView)
+        self.assertEqual(received[0].data, 0xab)
+        self.assertEqual(dispatcher.dispatch_request(decode_frame(request_frame('1/4/10'))), 1)
+        self.assertEqual(dispatcher.dispatch_request(decode_frame(request_frame('1/4/11'))), 0)
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
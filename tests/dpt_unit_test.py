@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import datetime
+import unittest
+from knxnet.knxnet import *
+from knxnet.dpt import *
+from knxnet.dpt import numpy
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class DptTestCase(unittest.TestCase):
+
+    def test_codecs(self):
+        print()
+        print('Test datapoint type codecs.....', end='')
+        # (dpt id, value, raw data, data size)
+        cases = [('1.001', True, 0x01, 1),
+                 ('2', (True, 0), 0x02, 1),
+                 ('3.007', (True, 5), 0x0d, 1),
+                 ('4', 'K', 0x4b, 2),
+                 ('5', 200, 0xc8, 2),
+                 ('5.001', 100, 0xff, 2),
+                 ('6', -2, 0xfe, 2),
+                 ('7', 0xabcd, 0xabcd, 3),
+                 ('8', -32768, 0x8000, 3),
+                 ('9.001', 21.5, 0x0c33, 3),
+                 ('9', -30.0, 0x8a24, 3),
+                 ('10', (1, 12, 30, 15), 0x2c1e0f, 4),
+                 ('11', datetime.date(2024, 2, 29), 0x1d0218, 4),
+                 ('12', 0xdeadbeef, 0xdeadbeef, 5),
+                 ('13.010', -1, 0xffffffff, 5),
+                 ('14', 21.5, 0x41ac0000, 5),
+                 ('16', 'KNX is OK', int.from_bytes(b'KNX is OK'.ljust(14, b'\x00'), 'big'), 15),
+                 ('17', 63, 0x3f, 2),
+                 ('18', (True, 10), 0x8a, 2),
+                 ('232.600', (255, 128, 0), 0xff8000, 4)]
+        for dpt_id, value, data, data_size in cases:
+            dpt = DEFAULT_REGISTRY.get(dpt_id)
+            self.assertEqual(dpt.data_size, data_size, dpt_id)
+            self.assertEqual(dpt.encode(value), data, dpt_id)
+            self.assertEqual(dpt.decode(data), value, dpt_id)
+        self.assertAlmostEqual(DEFAULT_REGISTRY.get('5.001').decode(0x80), 50.2, 1)
+        self.assertAlmostEqual(DEFAULT_REGISTRY.get('9').decode(DEFAULT_REGISTRY.get('9').encode(1234.56)), 1234.56, 0)
+        print('Success')
+
+        print('Test invalid datapoint type values.....', end='')
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('5').encode, 256)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('8').encode, 32768)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('9').encode, 700000.0)
+        for value in (float('nan'), float('inf'), float('-inf')):
+            self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('9').encode, value)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('17').encode, 64)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('17').encode, 200)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('17').encode, -1)
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get('16').encode, 'longer than 14 chars')
+        self.assertRaises(KnxnetDptException, DEFAULT_REGISTRY.get, '999')
+        print('Success')
+
+    def test_registry(self):
+        print()
+        print('Test datapoint types of group addresses.....', end='')
+        registry = DptRegistry(STANDARD_DPTS)
+        registry.assign('1/4/10', '9.001')
+        self.assertIs(registry.get_for_group(GroupAddress(1, 4, 10)), registry.get('9'))
+        self.assertIs(registry.resolve('14', '1/4/10'), registry.get('14'))
+        self.assertRaises(KnxnetDptException, registry.get_for_group, '1/4/11')
+        registry.unassign('1/4/10')
+        self.assertRaises(KnxnetDptException, registry.get_for_group, '1/4/10')
+        self.assertIn('232', registry)
+        print('Success')
+
+    def test_tunnelling_request_values(self):
+        print()
+        print('Test tunnelling request values.....', end='')
+        registry = DptRegistry(STANDARD_DPTS)
+        registry.assign('1/4/10', '9.001')
+        registry.assign('1/4/11', '232.600')
+        registry.assign('1/4/12', '16')
+        for dest, value, data_size in (('1/4/10', 21.5, 3), ('1/4/11', (1, 2, 3), 4), ('1/4/12', 'KNX is OK', 15)):
+            request = TunnellingRequest.create_from_value(dest, 0x07, value, registry=registry)
+            self.assertEqual(request.data_size, data_size)
+            self.assertEqual(len(request.frame), 20 + data_size)
+            decoded = decode_frame(request.frame)
+            self.assertEqual(decoded.data, request.data)
+            self.assertEqual(decoded.value(registry=registry), value)
+        request = TunnellingRequest.create_from_value('1/4/13', 0x07, -1, '13')
+        self.assertEqual(decode_frame(request.frame).value('13'), -1)
+        self.assertRaises(KnxnetDptException, TunnellingRequest.create_from_value, '1/4/13', 0x07, -1)
+        print('Success')
+
+        print('Test tunnelling request data size mismatch.....', end='')
+        frame = bytearray(request.frame)
+        frame[18] = 6  # one more byte than the frame holds
+        self.assertRaises(KnxnetException, decode_frame, frame)
+        print('Success')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_array_codecs(self):
+        print()
+        print('Test DPT 9 and DPT 14 array codecs.....', end='')
+        dpt_9 = DEFAULT_REGISTRY.get('9')
+        raw = numpy.arange(0x10000, dtype=numpy.uint32)
+        values = dpt_9.decode_array(raw)
+        self.assertEqual(list(values[::257]), [dpt_9.decode(int(data)) for data in raw[::257]])
+        values = numpy.array([0.0, 21.5, -30.0, 1234.56, -671088.64, 670760.96])
+        self.assertEqual(list(dpt_9.encode_array(values)), [dpt_9.encode(value) for value in values])
+        self.assertRaises(KnxnetDptException, dpt_9.encode_array, [700000.0])
+        self.assertRaises(KnxnetDptException, dpt_9.encode_array, [numpy.nan])
+        dpt_14 = DEFAULT_REGISTRY.get('14')
+        values = numpy.array([0.0, 21.5, -1.25e10], dtype=numpy.float32)
+        raw = dpt_14.encode_array(values)
+        self.assertEqual(list(raw), [dpt_14.encode(float(value)) for value in values])
+        self.assertEqual(list(dpt_14.decode_array(raw)), list(values))
+        self.assertIsNone(DEFAULT_REGISTRY.get('16').decode_array)
+        print('Success')
+
+        print('Test columnar decode to values.....', end='')
+        registry = DptRegistry(STANDARD_DPTS)
+        registry.assign('1/4/10', '9.001')
+        registry.assign('1/4/11', '14')
+        registry.assign('1/4/12', '16')
+        frames = [TunnellingRequest.create_from_value('1/4/10', 0x07, 21.5, registry=registry).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0).frame,
+                  TunnellingRequest.create_from_value('1/4/11', 0x07, -2.5, registry=registry).frame,
+                  TunnellingRequest.create_from_value('1/4/12', 0x07, 'KNX', registry=registry).frame,
+                  TunnellingRequest.create_from_value('1/4/13', 0x07, 12.5, '9').frame]
+        columns = decode_frames(frames)
+        values = columns.values(registry=registry)
+        self.assertEqual(list(values[[0, 2]]), [21.5, -2.5])
+        self.assertTrue(numpy.isnan(values[[1, 3, 4]]).all())
+        values = columns.values('9')
+        self.assertEqual(list(values[[0, 4]]), [21.5, 12.5])
+        self.assertTrue(numpy.isnan(values[[1, 2, 3]]).all())
+        self.assertRaises(KnxnetException, columns.values, '16')
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from knxnet.knxnet import *
+from knxnet.gateway import *
+from knxnet.tunnel import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class GatewayEmulatorTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncTearDown(self):
+        self.gateway.close()
+
+    async def test_tunnel_slots(self):
+        self.gateway = await GatewayEmulator.start(tunnel_slots=2)
+        client_1 = await TunnelClient.connect(self.gateway.addr)
+        client_2 = await TunnelClient.connect(self.gateway.addr)
+        self.assertNotEqual(client_1.channel_id, client_2.channel_id)
+        with self.assertRaises(KnxnetException):
+            await TunnelClient.connect(self.gateway.addr)
+        await client_1.disconnect()
+        self.assertEqual(len(self.gateway.tunnels), 1)
+        client_3 = await TunnelClient.connect(self.gateway.addr)
+        await client_2.disconnect()
+        await client_3.disconnect()
+        self.assertEqual(self.gateway.tunnels, {})
+
+    async def test_bus_between_tunnels(self):
+        self.gateway = await GatewayEmulator.start(tunnel_slots=3)
+        writer = await TunnelClient.connect(self.gateway.addr)
+        reader = await TunnelClient.connect(self.gateway.addr)
+        indications = []
+        reader.add_handler(indications.append)
+        confirmations = []
+        writer._handlers.append(confirmations.append)  # L_Data.con are acked but not dispatched
+        await writer.write('1/4/10', 0xab, 2)
+        self.assertEqual(await reader.read('1/4/10'), 0xab)
+        await asyncio.sleep(0.02)
+        self.assertEqual([(str(i.dest_addr_group), i.apci, i.data) for i in indications],
+                         [('1/4/10', APCI_GROUP_VALUE_WRITE, 0xab), ('1/4/10', APCI_GROUP_VALUE_RESPONSE, 0xab)])
+        await writer.disconnect()
+        await reader.disconnect()
+
+    async def test_ack_delay_and_loss(self):
+        self.gateway = await GatewayEmulator.start(ack_delay=0.01, loss_rate=0.2, seed=1)
+        async with await TunnelClient.connect(self.gateway.addr, window_size=4, ack_timeout=0.05,
+                                              retries=10) as client:
+            round_trip_times = await client.write_many([('1/4/{0}'.format(i), i, 2) for i in range(40)])
+        self.assertEqual(len(round_trip_times), 40)
+        self.assertTrue(min(round_trip_times) >= 0.009)
+        self.assertGreater(self.gateway.dropped_requests, 0)
+        # with a window, the requests following a lost one arrive out of sequence and are retransmitted too
+        self.assertGreaterEqual(self.gateway.received_requests - self.gateway.dropped_requests -
+                                self.gateway.discarded_requests, 40)
+        for i in range(40):
+            self.assertEqual(self.gateway.values[GroupAddress(1, 4, i)], (i, 2))
+
+    async def test_connection_state(self):
+        self.gateway = await GatewayEmulator.start()
+        async with await TunnelClient.connect(self.gateway.addr, heartbeat_interval=0.01) as client:
+            await asyncio.sleep(0.05)
+            self.assertTrue(client.connected)
+            del self.gateway.tunnels[client.channel_id]  # the gateway forgets the tunnel
+            client.CONNECTION_STATE_REQUEST_TIMEOUT = 0.01
+            await asyncio.sleep(0.1)
+            self.assertFalse(client.connected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from knxnet.knxnet import *
+from knxnet.dpt import DptRegistry, STANDARD_DPTS
+from knxnet.image import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class Clock():
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class ProcessImageTestCase(unittest.TestCase):
+
+    def test_update(self):
+        print()
+        print('Test process image update.....', end='')
+        clock = Clock()
+        image = ProcessImage(clock=clock)
+        self.assertEqual(len(image), 0)
+        self.assertTrue(image.update(TunnellingRequest.create_from_data('1/4/10', 0x07, 0x0c33, 3,
+                                                                        source_addr='1.1.5')))
+        self.assertTrue(image.update(RoutingIndication.create_from_data('1/4/11', 0xff, 1)))
+        self.assertFalse(image.update(TunnellingRequest.create_from_data('1/4/12', 0x07, 0, 1, apci=0x0)))
+        self.assertEqual(len(image), 2)
+        self.assertEqual(list(image), [GroupAddress(1, 4, 10).value, GroupAddress(1, 4, 11).value])
+        self.assertIn('1/4/10', image)
+        self.assertNotIn(GroupAddress(1, 4, 12), image)
+        self.assertEqual(image.get('1/4/10'), (0x0c33, 3))
+        self.assertEqual(image.get('1/4/11'), (0x3f, 1))  # 6 bits
+        self.assertIsNone(image.get('1/4/12'))
+        self.assertEqual(image.source_addr('1/4/10'), IndividualAddress(1, 1, 5))
+        self.assertEqual(image.timestamp('1/4/10'), 100.0)
+        clock.now = 102.5
+        self.assertEqual(image.age('1/4/10'), 2.5)
+        self.assertEqual(image.value('1/4/10', '9'), 21.5)
+        # payloads which do not fit in the arrays, extended frames are copied out of the datagram
+        image.update(TunnellingRequest.create_from_value('1/4/13', 0x07, 'KNX is OK', '16'))
+        self.assertEqual(image.value('1/4/13', '16'), 'KNX is OK')
+        request = decode_frame(TunnellingRequest.create_from_data('1/4/14', 0x07, bytes(range(20)), 21).frame)
+        image.update(request)
+        self.assertEqual(image.get('1/4/14'), (bytes(range(20)), 21))
+        image.update(TunnellingRequest.create_from_data('1/4/14', 0x07, 1, 2))
+        self.assertEqual(image.get('1/4/14'), (1, 2))
+        image.invalidate('1/4/14')
+        self.assertNotIn('1/4/14', image)
+        image.clear()
+        self.assertEqual(len(image), 0)
+        self.assertRaises(KnxnetException, image.set, '1/4/10', 0, 0)
+        self.assertRaises(KnxnetException, image.set, '1/4/10', 1 << 64, 9)  # wider than 8 bytes
+        self.assertRaises(KnxnetException, image.set, '1/4/10', 0x1ff, 2)
+        self.assertRaises(KnxnetException, image.set, '1/4/10', -1, 3)
+        image.set('1/4/10', (1 << 64) - 1, 9)
+        self.assertEqual(image.get('1/4/10'), ((1 << 64) - 1, 9))
+        print('Success')
+
+    def test_read(self):
+        print()
+        print('Test process image reads.....', end='')
+        clock = Clock()
+        registry = DptRegistry(STANDARD_DPTS)
+        registry.assign('1/4/10', '9.001')
+        image = ProcessImage(max_age=10, clock=clock)
+        self.assertIsNone(image.read('1/4/10'))
+        image.set('1/4/10', 0x0c33, 3)
+        clock.now += 10
+        self.assertEqual(image.read('1/4/10'), 0x0c33)
+        self.assertEqual(image.value('1/4/10', registry=registry), 21.5)
+        self.assertIsNone(image.read('1/4/10', max_age=5))
+        clock.now += 1
+        self.assertIsNone(image.read('1/4/10'))
+        self.assertEqual((image.hits, image.misses), (1, 3))
+        self.assertIsNone(image.value('1/4/11'))
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
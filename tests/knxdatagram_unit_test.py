@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import pickle
 import unittest
+from array import array
 from knxnet.knxnet import *
+from knxnet.knxnet import numpy
 from knxnet.utils import *
 
 __author__ = "Adrien Lescourt"
@@ -114,6 +117,69 @@ class KnxdatagramTestCase(unittest.TestCase):
                           IndividualAddress.from_str, addr_str)
         print('Success')
 
+    def test_addr_value_objects(self):
+        print()
+        print('Test interned, hashable and immutable addresses.....', end='')
+        group_addr = GroupAddress.from_str('1/4/10')
+        self.assertIs(group_addr, GroupAddress(1, 4, 10))
+        self.assertIs(group_addr, GroupAddress.from_bytes(bytearray([0x0c, 0x0a])))
+        self.assertIs(group_addr, GroupAddress.from_int(0x0c0a))
+        self.assertIs(group_addr, pickle.loads(pickle.dumps(group_addr)))
+        self.assertEqual(group_addr.value, 0x0c0a)
+        self.assertEqual(int(group_addr), 0x0c0a)
+        self.assertEqual({group_addr: 'handler'}[GroupAddress.from_str('1/4/10')], 'handler')
+        self.assertRaises(AttributeError, setattr, group_addr, 'main_group', 2)
+        self.assertFalse(hasattr(group_addr, '__dict__'))
+        self.assertRaises(KnxnetUtilsException, GroupAddress, 32, 0, 0)
+        self.assertRaises(KnxnetUtilsException, GroupAddress.from_int, 0x10000)
+
+        individual_addr = IndividualAddress.from_str('5.12.7')
+        self.assertIs(individual_addr, IndividualAddress(5, 12, 7))
+        self.assertIs(individual_addr, IndividualAddress.from_bytes(0x5c07))
+        self.assertEqual(len({individual_addr, IndividualAddress.from_int(0x5c07), IndividualAddress(1, 1, 1)}), 2)
+        self.assertNotEqual(individual_addr, GroupAddress.from_int(0x5c07))
+        self.assertRaises(AttributeError, setattr, individual_addr, 'area', 2)
+        self.assertRaises(KnxnetUtilsException, IndividualAddress, 1, 16, 0)
+        print('Success')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_addr_array_translation(self):
+        print()
+        print('Test group address array translation.....', end='')
+        addr_strs = ['0/0/0', '1/1/1', '1/4/10', '31/7/255']
+        addrs = GroupAddress.array_from_str(addr_strs)
+        self.assertEqual(addrs.dtype, numpy.uint16)
+        self.assertEqual(list(addrs), [0x0000, 0x0901, 0x0c0a, 0xffff])
+        self.assertEqual(list(GroupAddress.array_to_str(addrs)), addr_strs)
+        main_group, middle_group, sub_group = GroupAddress.array_to_components(array('H', addrs))
+        self.assertEqual(list(main_group), [0, 1, 1, 31])
+        self.assertEqual(list(middle_group), [0, 1, 4, 7])
+        self.assertEqual(list(sub_group), [0, 1, 10, 255])
+        self.assertEqual(list(GroupAddress.array_from_components(main_group, middle_group, sub_group)), list(addrs))
+        for addr_str in ('1/-1/10', '32/1/10', '1/1/256', '1/1', '1/a/1'):
+            self.assertRaises(KnxnetUtilsException, GroupAddress.array_from_str, ['1/1/1', addr_str])
+        # fields of the right total count, but not three per address
+        for addr_strs in (['1 2/3/4', '5//6'], ['1/2/3 4', '/5/6'], ['1/2/3', '4/5/6/'], ['1/2/3', '1.2/3/4']):
+            with self.assertRaises(KnxnetUtilsException) as context:
+                GroupAddress.array_from_str(addr_strs)
+            self.assertIn('(index {0})'.format(1 if addr_strs[0] == '1/2/3' else 0), str(context.exception))
+        self.assertRaises(KnxnetUtilsException, GroupAddress.array_from_components, [1, 2], [1, 8], [1, 1])
+        self.assertRaises(KnxnetUtilsException, GroupAddress.array_to_str, [0x10000])
+        print('Success')
+
+        print('Test individual address array translation.....', end='')
+        addr_strs = ['0.0.0', '1.1.1', '5.12.7']
+        addrs = IndividualAddress.array_from_str(addr_strs)
+        self.assertEqual(list(addrs), [0x0000, 0x1101, 0x5c07])
+        self.assertEqual(list(IndividualAddress.array_to_str(addrs)), addr_strs)
+        area, line, bus_device = IndividualAddress.array_to_components(addrs)
+        self.assertEqual(list(area), [0, 1, 5])
+        self.assertEqual(list(line), [0, 1, 12])
+        self.assertEqual(list(bus_device), [0, 1, 7])
+        for addr_str in ('-1.1.3', '1.16.0', '1.1.256', '1.1', '1..1', '1.1.1 ', '1.1/1.1'):
+            self.assertRaises(KnxnetUtilsException, IndividualAddress.array_from_str, [addr_str])
+        print('Success')
+
     def test_tunneling_request(self):
         print()
         print('Test tunnelling request frame creation, 1 byte data.....', end='')
@@ -217,6 +283,228 @@ class KnxdatagramTestCase(unittest.TestCase):
         self.assertEqual(t2_tunnel_req.data_size, t2_data_size)
         print('Success')
 
+    def test_tunnelling_request_cemi(self):
+        print()
+        print('Test tunnelling request cEMI control fields and source address.....', end='')
+        request = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2)
+        self.assertEqual((request.control_field_1, request.control_field_2), (0xbc, 0xe0))
+        self.assertEqual(str(request.source_addr), '0.0.0')
+        self.assertEqual(request.priority, TunnellingRequest.PRIORITY_LOW)
+        self.assertEqual((request.repeat, request.hop_count, request.extended_frame), (False, 6, False))
+        additional_info = bytes([0x03, 0x02, 0xab, 0xcd, 0x04, 0x00])
+        request = TunnellingRequest.create_from_data('1/4/10', 0x07, 0x0c33, 3, 0x2, 0x29, 0x01, '1.1.5',
+                                                     TunnellingRequest.PRIORITY_SYSTEM, True, 5, additional_info)
+        frame = request.frame
+        self.assertEqual(len(frame), 20 + len(additional_info) + 3)
+        self.assertEqual(frame[11:18], bytes([0x06]) + additional_info)
+        self.assertEqual(frame[18:20], bytes([0x90, 0xd0]))  # control fields
+        decoded = decode_frame(frame)
+        self.assertEqual(decoded.source_addr, IndividualAddress(1, 1, 5))
+        self.assertEqual(decoded.dest_addr_group, GroupAddress(1, 4, 10))
+        self.assertEqual(decoded.priority, TunnellingRequest.PRIORITY_SYSTEM)
+        self.assertEqual((decoded.repeat, decoded.hop_count, decoded.ack_request, decoded.confirm_error),
+                         (True, 5, False, False))
+        self.assertEqual((decoded.data, decoded.data_size, decoded.sequence_counter), (0x0c33, 3, 0x01))
+        self.assertEqual([(type_id, bytes(data)) for type_id, data in decoded.additional_info_blocks()],
+                         [(0x03, b'\xab\xcd'), (0x04, b'')])
+        self.assertEqual(decoded.frame, frame)
+        print('Success')
+
+        print('Test tunnelling request individual destination.....', end='')
+        request = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, IndividualAddress(1, 1, 20), 0x07, 0x1, 1)
+        self.assertEqual(request.control_field_2, 0x60)
+        self.assertEqual(decode_frame(request.frame).dest_addr_group, IndividualAddress(1, 1, 20))
+        print('Success')
+
+        print('Test tunnelling request extended frame.....', end='')
+        payload = bytes(range(200))
+        request = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, payload, 201)
+        self.assertTrue(request.extended_frame)
+        frame = request.frame
+        self.assertEqual(len(frame), 20 + 201)
+        decoded = decode_frame(frame)
+        self.assertTrue(decoded.extended_frame)
+        self.assertIsInstance(decoded.data, memoryview)
+        self.assertEqual(decoded.payload, payload)
+        frame[21] = 0xff  # the payload is a view over the datagram, not a copy
+        self.assertEqual(decoded.data[0], 0xff)
+        self.assertEqual(decoded.frame, frame)
+        self.assertEqual(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0x0c33, 3).payload,
+                         b'\x0c\x33')
+        self.assertRaises(KnxnetException,
+                          create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, payload, 20).encode_into,
+                          bytearray(64))
+        print('Success')
+
+    def test_lazy_decode(self):
+        print()
+        print('Test lazy tunnelling request views.....', end='')
+        frames = [create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2, 0x2, 0x29, 0x05).frame,
+                  TunnellingRequest.create_from_data('1/4/11', 0x07, 0x0c33, 3, source_addr='1.1.5',
+                                                     additional_info=bytes([0x03, 0x02, 0xab, 0xcd])).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/12', 0x07, bytes(range(30)), 31).frame]
+        for frame in frames:
+            view = decode_frame(frame, lazy=True)
+            self.assertIsInstance(view, TunnellingRequestView)
+            request = decode_frame(frame)
+            for name in ('channel_id', 'sequence_counter', 'data_service', 'control_field_1', 'control_field_2',
+                         'data_size', 'apci', 'dest_addr_group', 'source_addr', 'data'):
+                self.assertEqual(getattr(view, name), getattr(request, name), name)
+            self.assertEqual(view.header.frame_length, len(frame))
+            self.assertIs(view.dest_addr_group, view.dest_addr_group)
+            self.assertEqual(view.materialize().frame, frame)
+            self.assertIs(view.materialize(), view.materialize())
+        self.assertEqual(decode_frame(frames[1], lazy=True).value('9'), 21.5)
+        ack = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0).frame
+        self.assertIsInstance(decode_frame(ack, lazy=True), TunnellingAck)
+        print('Success')
+
+        print('Test lazy views of invalid frames.....', end='')
+        self.assertRaises(KnxnetException, decode_frame, frames[0][:-1], True)
+        frame = bytearray(frames[0])
+        frame[18] = 4  # data size past the end of the frame
+        view = decode_frame(frame, lazy=True)
+        self.assertEqual(str(view.dest_addr_group), '1/4/10')
+        self.assertRaises(KnxnetException, getattr, view, 'data')
+        self.assertRaises(KnxnetException, view.materialize)
+        frame = bytearray(frames[0])
+        frame[11] = 0x20  # additional info length past the end of the frame
+        self.assertRaises(KnxnetException, decode_frame, frame, True)
+        # any single byte corruption: the fields decode or raise a KnxnetException
+        for offset in range(len(frames[1])):
+            for value in range(256):
+                frame = bytearray(frames[1])
+                frame[offset] = value
+                try:
+                    view = decode_frame(frame, lazy=True)
+                except KnxnetException:
+                    continue
+                for name in ('channel_id', 'sequence_counter', 'data_service', 'control_field_1', 'control_field_2',
+                             'data_size', 'apci', 'dest_addr_group', 'source_addr', 'data'):
+                    try:
+                        getattr(view, name)
+                    except KnxnetException:
+                        pass
+        print('Success')
+
+    def test_decode_buffer_types(self):
+        print()
+        print('Test frame decode from bytes, bytearray and memoryview.....', end='')
+        frame = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x12, 0xab, 2).frame
+        for buffer in (bytes(frame), bytearray(frame), memoryview(bytes(frame))):
+            tunnel_req = decode_frame(buffer)
+            self.assertEqual(tunnel_req.header.service_type_descriptor, ServiceTypeDescriptor.TUNNELLING_REQUEST)
+            self.assertEqual(tunnel_req.channel_id, 0x12)
+            self.assertEqual(str(tunnel_req.dest_addr_group), '1/4/10')
+            self.assertEqual(tunnel_req.data, 0xab)
+            self.assertEqual(tunnel_req.apci, 0x2)
+        frame = create_frame(ServiceTypeDescriptor.CONNECTION_REQUEST, ('127.0.0.1', 3672), ('10.11.12.13', 3673)).frame
+        connection_request = decode_frame(memoryview(frame))
+        self.assertEqual(connection_request.data_endpoint.ip_addr, '10.11.12.13')
+        self.assertEqual(connection_request.data_endpoint.port, 3673)
+        print('Success')
+
+        print('Test invalid frame decode.....', end='')
+        self.assertRaises(KnxnetException, decode_frame, None)
+        self.assertRaises(KnxnetException, decode_frame, bytes([0x06, 0x10, 0x04]))
+        self.assertRaises(KnxnetException, decode_frame, bytes([0x06, 0x10, 0x09, 0x99, 0x00, 0x06]))
+        self.assertRaises(KnxnetException, decode_frame, bytes(frame[:-1]))
+        print('Success')
+
+    def test_encode_into(self):
+        print()
+        print('Test frame encoding into a caller-supplied buffer.....', end='')
+        frames = [create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x12, 0xab, 2),
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x12, 0x01, 1, 0x2, 0x11, 0x05),
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x12, 0),
+                  create_frame(ServiceTypeDescriptor.CONNECTION_REQUEST, ('127.0.0.1', 3672), ('10.11.12.13', 3673))]
+        buffer = bytearray(128)
+        offset = 3
+        for knxnet_frame in frames:
+            written = knxnet_frame.encode_into(buffer, offset)
+            self.assertEqual(written, len(knxnet_frame.frame))
+            self.assertEqual(buffer[offset:offset + written], knxnet_frame.frame)
+            offset += written
+        self.assertRaises(KnxnetException,
+                          create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x12, 0xab, 0).encode_into,
+                          buffer)
+        print('Success')
+
+    @unittest.skipIf(numpy is None, 'numpy is not installed')
+    def test_decode_frames(self):
+        print()
+        print('Test columnar decode of many frames.....', end='')
+        frames = [create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 0xab, 2, 0x2, 0x29, 0x05).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '31/7/255', 0x09, 0x01, 1).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/11', 0x09, 0x0c33, 3).frame,
+                  create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/12', 0x09, 0x41ac0000, 5).frame]
+        for columns in (decode_frames(frames), decode_frames(b''.join(frames)),
+                        decode_frames(memoryview(b''.join(frames)), [0, 22, 32, 53, 76])):
+            self.assertEqual(len(columns), 5)
+            self.assertEqual(list(columns.service_type_descriptor), [0x0420, 0x0421, 0x0420, 0x0420, 0x0420])
+            self.assertEqual(list(columns.channel_id), [0x07, 0, 0x09, 0x09, 0x09])
+            self.assertEqual(list(columns.sequence_counter), [0x05, 0, 0, 0, 0])
+            self.assertEqual(list(columns.data_service), [0x29, 0, 0x11, 0x11, 0x11])
+            self.assertEqual(list(columns.dest_addr_group), [0x0c0a, 0, 0xffff, 0x0c0b, 0x0c0c])
+            self.assertEqual(list(columns.apci), [0x2, 0, 0x2, 0x2, 0x2])
+            self.assertEqual(list(columns.data_size), [2, 0, 1, 3, 5])
+            self.assertEqual(list(columns.data), [0xab, 0, 0x01, 0x0c33, 0x41ac0000])
+            self.assertEqual(list(columns.priority), [0x3, 0, 0x3, 0x3, 0x3])
+            self.assertEqual(list(columns.hop_count), [6, 0, 6, 6, 6])
+        print('Success')
+
+        print('Test columnar decode of cEMI fields.....', end='')
+        frames = [TunnellingRequest.create_from_data('1/4/10', 0x07, 0x0c33, 3, source_addr='1.1.5',
+                                                     priority=TunnellingRequest.PRIORITY_URGENT, hop_count=4,
+                                                     additional_info=bytes([0x03, 0x02, 0xab, 0xcd])).frame,
+                  TunnellingRequest.create_from_data('1/4/11', 0x07, bytes(range(100)), 101).frame]
+        columns = decode_frames(frames)
+        self.assertEqual(list(columns.dest_addr_group), [0x0c0a, 0x0c0b])
+        self.assertEqual(list(columns.source_addr), [0x1105, 0])
+        self.assertEqual(list(columns.priority), [TunnellingRequest.PRIORITY_URGENT, TunnellingRequest.PRIORITY_LOW])
+        self.assertEqual(list(columns.hop_count), [4, 6])
+        self.assertEqual(list(columns.data_size), [3, 101])
+        self.assertEqual(list(columns.data), [0x0c33, 0])
+        print('Success')
+
+        print('Test columnar decode of invalid frames.....', end='')
+        self.assertRaises(KnxnetException, decode_frames, [frames[0][:-1]])
+        self.assertRaises(KnxnetException, decode_frames, b''.join(frames)[:-1])
+        self.assertRaises(KnxnetException, decode_frames, [bytes([0x06, 0x10, 0x09, 0x99, 0x00, 0x06])])
+        print('Success')
+
+    def test_tunnelling_request_templates(self):
+        print()
+        print('Test tunnelling request templates.....', end='')
+        cache = TunnellingRequestCache(max_templates=2)
+        for data, sequence_counter in ((0x00, 0x00), (0xab, 0x01), (0xff, 0xff)):
+            expected = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                                    '1/4/10', 0x12, data, 2, 0x2, 0x11, sequence_counter).frame
+            self.assertEqual(cache.frame('1/4/10', 0x12, data, 2, sequence_counter=sequence_counter), expected)
+            expected = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                                    GroupAddress(2, 0, 1), 0x12, data & 0x3f, 1, 0x1, 0x29, sequence_counter).frame
+            self.assertEqual(cache.frame(GroupAddress(2, 0, 1), 0x12, data, 1, 0x1, 0x29, sequence_counter), expected)
+        template = cache.get('1/4/10', 0x12, 2)
+        buffer = bytearray(64)
+        self.assertEqual(template.encode_into(buffer, 5, 0x42, 0x07), len(template))
+        self.assertEqual(decode_frame(buffer[5:5 + len(template)]).data, 0x42)
+        self.assertEqual(decode_frame(buffer[5:5 + len(template)]).sequence_counter, 0x07)
+        self.assertEqual(TunnellingRequestTemplate('1/4/10', 0x12, 5).frame(0x41ac0000, 0x08),
+                         create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST,
+                                      '1/4/10', 0x12, 0x41ac0000, 5, 0x2, 0x11, 0x08).frame)
+        print('Success')
+
+        print('Test tunnelling request templates LRU bound.....', end='')
+        cache.get('3/0/0', 0x12, 2)  # evicts the least recently used: 2/0/1
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get('1/4/10', 0x12, 2), template)
+        cache.get('3/0/1', 0x12, 2)
+        cache.get('3/0/2', 0x12, 2)  # evicts 1/4/10
+        self.assertIsNot(cache.get('1/4/10', 0x12, 2), template)
+        self.assertRaises(KnxnetException, cache.get, '1/4/10', 0x12, 0)
+        print('Success')
+
     def test_tunnel_ack(self):
         print()
         print('Test tunnel ack frame creation.....', end='')
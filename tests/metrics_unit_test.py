@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from knxnet.knxnet import *
+from knxnet.gateway import GatewayEmulator
+from knxnet.metrics import *
+from knxnet.tunnel import TunnelClient
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class MetricsTestCase(unittest.TestCase):
+
+    def tearDown(self):
+        uninstall()
+
+    def test_disabled(self):
+        print()
+        print('Test metrics disabled.....', end='')
+        self.assertIsNone(installed())
+        collector = MetricsCollector()
+        frame = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0, 1)
+        decode_frame(frame.frame)
+        self.assertEqual((collector.encoded, collector.decoded), ({}, {}))
+        print('Success')
+
+    def test_codec(self):
+        print()
+        print('Test metrics encode and decode.....', end='')
+        collector = install()
+        self.assertIs(installed(), collector)
+        request = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/10', 0x07, 1, 1).frame
+        ack = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0, 1).frame
+        for _ in range(3):
+            decode_frame(request)
+        decode_frame(request, lazy=True)
+        decode_frame(ack)
+        for invalid in (request[:4], request[:-1] + b'\x00\x00', ack[:8]):
+            with self.assertRaises(KnxnetException):
+                decode_frame(invalid)
+        self.assertEqual(collector.encoded, {'TUNNELLING_REQUEST': 1, 'TUNNELLING_ACK': 1})
+        self.assertEqual(collector.decoded, {'TUNNELLING_REQUEST': 4, 'TUNNELLING_ACK': 1})
+        self.assertEqual(collector.decode_errors, {'Frame size is < 6': 1,
+                                                   'Invalid frame: effective total length != announced total length': 1,
+                                                   'Tunnelling ack length must be 10 bytes': 1})
+        self.assertEqual(collector.decode_time['TUNNELLING_REQUEST'].count, 4)
+        self.assertGreater(collector.encode_time['TUNNELLING_ACK'].sum, 0)
+        snapshot = collector.snapshot()
+        self.assertEqual(snapshot['decoded']['TUNNELLING_ACK'], 1)
+        self.assertEqual(snapshot['decode_time']['TUNNELLING_REQUEST']['buckets'][-1], (float('inf'), 4))
+        collector.reset()
+        self.assertEqual(collector.decoded, {})
+        uninstall()
+        decode_frame(ack)
+        self.assertEqual(collector.decoded, {})
+        print('Success')
+
+    def test_histogram(self):
+        print()
+        print('Test metrics histogram.....', end='')
+        histogram = Histogram((0.1, 0.5, 1.0))
+        for value in (0.05, 0.1, 0.3, 2.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative_counts(), [(0.1, 2), (0.5, 3), (1.0, 3), (float('inf'), 4)])
+        self.assertAlmostEqual(histogram.mean, 2.45 / 4)
+        print('Success')
+
+    def test_prometheus(self):
+        print()
+        print('Test metrics Prometheus rendering.....', end='')
+        collector = install(MetricsCollector(codec_buckets=(0.001,), round_trip_buckets=(0.01,)))
+        create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0, 1)
+        collector.frame_sent(b'\x06\x10\x04\x21\x00\x0a\x04\x07\x01\x00')
+        collector.ack_received(0.002)
+        collector.decode_errors['a "quoted"\nreason'] = 2
+        lines = collector.render_prometheus().splitlines()
+        self.assertIn('# TYPE knxnet_encoded_frames_total counter', lines)
+        self.assertIn('knxnet_encoded_frames_total{service_type="TUNNELLING_ACK"} 1', lines)
+        self.assertIn('knxnet_frames_total{direction="sent",service_type="TUNNELLING_ACK"} 1', lines)
+        self.assertIn('knxnet_bytes_total{direction="sent"} 10', lines)
+        self.assertIn('knxnet_decode_errors_total{reason="a \\"quoted\\"\\nreason"} 2', lines)
+        self.assertIn('knxnet_encode_seconds_bucket{service_type="TUNNELLING_ACK",le="+Inf"} 1', lines)
+        self.assertIn('knxnet_ack_round_trip_seconds_bucket{le="0.01"} 1', lines)
+        self.assertIn('knxnet_ack_round_trip_seconds_sum 0.002', lines)
+        self.assertIn('knxnet_ack_round_trip_seconds_count 1', lines)
+        for line in lines:
+            if not line.startswith('#'):
+                float(line.rsplit(' ', 1)[1].replace('+Inf', 'inf'))
+        print('Success')
+
+
+class TransportMetricsTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def tearDown(self):
+        uninstall()
+
+    async def test_tunnel_client(self):
+        gateway = await GatewayEmulator.start(confirm=False)
+        collector = install()
+        async with await TunnelClient.connect(gateway.addr) as client:
+            await client.write('1/4/10', 0xab, 2)
+            await client.write('1/4/11', 0xcd, 2)
+        gateway.close()
+        self.assertEqual(collector.frames[('sent', 'TUNNELLING_REQUEST')], 2)
+        self.assertEqual(collector.frames[('received', 'TUNNELLING_ACK')], 2)
+        self.assertEqual(collector.frames[('sent', 'CONNECTION_REQUEST')], 1)
+        self.assertEqual(collector.round_trip.count, 2)
+        self.assertGreater(collector.bytes['sent'], 2 * 21)
+        self.assertGreater(collector.bytes['received'], 2 * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
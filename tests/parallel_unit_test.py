@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from knxnet.knxnet import *
+from knxnet.knxnet import numpy
+from knxnet.parallel import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_archive(number):
+    frames = []
+    for i in range(number):
+        if i % 7 == 0:
+            frames.append(create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 0x07, 0, i & 0xff).frame)
+        elif i % 11 == 0:
+            # extended frame whose payload looks like KNXnet/IP headers, to fool the resynchronisation
+            payload = bytes([0x06, 0x10, 0x04, 0x21, 0x00, 0x06]) * 5
+            frames.append(TunnellingRequest.create_from_data('1/4/10', 0x07, payload, len(payload) + 1).frame)
+        else:
+            frames.append(create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '{0}/0/{1}'.format(i % 32, i % 256),
+                                       0x07, i & 0xff, 2, 0x2, 0x29, i & 0xff).frame)
+    return b''.join(bytes(frame) for frame in frames)
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class ParallelDecodeTestCase(unittest.TestCase):
+
+    def assertColumnsEqual(self, columns, expected):
+        self.assertEqual(len(columns), len(expected))
+        for field in FrameColumns._FIELDS:
+            self.assertTrue(numpy.array_equal(getattr(columns, field), getattr(expected, field)), field)
+
+    def test_parallel_decode(self):
+        print()
+        print('Test parallel decode of an archive.....', end='')
+        archive = sample_archive(3000)
+        expected = decode_frames(archive)
+        with ProcessPoolExecutor(2) as executor:
+            for chunks in (1, 3, 16, 200):
+                self.assertColumnsEqual(decode_frames_parallel(archive, chunks=chunks, executor=executor), expected)
+            self.assertColumnsEqual(decode_frames_parallel(archive, expected.offset, chunks=5, executor=executor),
+                                    expected)
+            self.assertEqual(len(decode_frames_parallel(b'', executor=executor)), 0)
+            self.assertRaises(KnxnetException, decode_frames_parallel, archive[:-1], chunks=4, executor=executor)
+        self.assertColumnsEqual(decode_frames_parallel(archive, workers=2), expected)
+        print('Success')
+
+    def test_chunk_edges_in_extended_frames(self):
+        print()
+        print('Test parallel decode with chunk edges in extended frames.....', end='')
+        frames = []
+        for i in range(400):
+            if i % 5 == 1:
+                # SYNC_FRAMES headers then an invalid one: the worker gives up on its chunk
+                payload = bytes([0x06, 0x10, 0x04, 0x21, 0x00, 0x06]) * 4 + bytes([0x06, 0x10, 0x04, 0x21, 0x00, 0x00])
+                frames.append(TunnellingRequest.create_from_data('2/1/{0}'.format(i % 256), 0x07, payload,
+                                                                 len(payload) + 1).frame)
+            elif i % 3:
+                payload = bytes((i + j) & 0xff for j in range(150 + i % 67))
+                frames.append(TunnellingRequest.create_from_data('2/1/{0}'.format(i % 256), 0x07, payload,
+                                                                 len(payload) + 1).frame)
+            else:
+                frames.append(TunnellingRequest.create_from_data('2/1/{0}'.format(i % 256), 0x07, i & 0x3f, 1).frame)
+        archive = b''.join(bytes(frame) for frame in frames)
+        expected = decode_frames(archive)
+        extended = [(offset, offset + length) for offset, length in zip(expected.offset, expected.frame_length)
+                    if length > 50]
+        with ProcessPoolExecutor(2) as executor:
+            for chunks in (7, 64, 333):
+                edges = [len(archive) * i // chunks for i in range(1, chunks)]
+                self.assertTrue(any(start < edge < end for edge in edges for start, end in extended))
+                self.assertColumnsEqual(decode_frames_parallel(archive, chunks=chunks, executor=executor), expected)
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
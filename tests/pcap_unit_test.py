@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import socket
+import struct
+import tempfile
+import unittest
+from knxnet.knxnet import *
+from knxnet.pcap import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def sample_frame(i):
+    return create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, '1/4/{0}'.format(i % 256), 0x07,
+                        i & 0xff, 2, 0x2, 0x29, i & 0xff).frame
+
+
+def udp_ipv4(payload, src_port, dst_port, dst_ip='192.168.1.10', flags_fragment=0x4000):
+    udp = struct.pack('>HHHH', src_port, dst_port, 8 + len(payload), 0) + payload
+    return struct.pack('>BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, flags_fragment, 64, 17, 0,
+                       socket.inet_aton('192.168.1.20'), socket.inet_aton(dst_ip)) + udp
+
+
+def ethernet(packet, vlan=False):
+    header = b'\x01\x00\x5e\x00\x17\x0c' + b'\x02\x00\x00\x00\x00\x01'
+    if vlan:
+        header += b'\x81\x00\x00\x07'
+    return header + b'\x08\x00' + packet
+
+
+def pcapng_block(endian, block_type, body):
+    body += b'\x00' * (-len(body) % 4)
+    length = 12 + len(body)
+    return struct.pack(endian + 'II', block_type, length) + body + struct.pack(endian + 'I', length)
+
+
+def pcapng_section(endian, packets, tsresol=None):
+    """
+    :param packets: list of (timestamp in units of tsresol, ethernet packet)
+    """
+    shb = struct.pack(endian + 'IHHq', 0x1a2b3c4d, 1, 0, -1)
+    options = b''
+    if tsresol is not None:
+        options = struct.pack(endian + 'HH', 9, 1) + bytes([tsresol]) + b'\x00' * 3 + struct.pack(endian + 'HH', 0, 0)
+    idb = struct.pack(endian + 'HHI', LINKTYPE_ETHERNET, 0, 65535) + options
+    blocks = pcapng_block(endian, 0x0a0d0d0a, shb) + pcapng_block(endian, 1, idb)
+    blocks += pcapng_block(endian, 4, b'\x00' * 8)  # name resolution block, skipped
+    for timestamp, packet in packets:
+        blocks += pcapng_block(endian, 6, struct.pack(endian + 'IIIII', 0, timestamp >> 32, timestamp & 0xffffffff,
+                                                      len(packet), len(packet)) + packet)
+    return blocks
+
+
+class ReadCountingFile(io.RawIOBase):
+    """
+    Non-seekable file which records the largest read
+    """
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+        self.max_read = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        self.max_read = max(self.max_read, size)
+        return self.data.read(size)
+
+
+class PcapTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'export.pcap')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_write_read(self):
+        print()
+        print('Test pcap export and import.....', end='')
+        with PcapWriter(self.path) as capture:
+            for i in range(50):
+                capture.write(sample_frame(i), ('192.168.1.20', 50000), ('192.168.1.10', 3671), 1500000000.5 + i)
+            capture.write(decode_frame(sample_frame(50)), timestamp=1500000100.25)  # frame object, multicast
+        self.assertEqual(capture.count, 51)
+        with PcapReader(self.path) as capture:
+            datagrams = list(capture.datagrams())
+        self.assertEqual(len(datagrams), 51)
+        self.assertEqual(datagrams[0][:3], (1500000000.5, ('192.168.1.20', 50000), ('192.168.1.10', 3671)))
+        self.assertEqual([frame for _, _, _, frame in datagrams], [sample_frame(i) for i in range(51)])
+        self.assertEqual(datagrams[50][0], 1500000100.25)
+        self.assertEqual(datagrams[50][2], ('224.0.23.12', 3671))
+        with open(self.path, 'rb') as f:
+            packet = f.read()[24 + 16:24 + 16 + 20]
+        self.assertEqual(sum(struct.unpack('>10H', packet)) % 0xffff, 0)  # valid IPv4 header checksum
+        print('Success')
+
+    def test_nanoseconds(self):
+        print()
+        print('Test pcap nanosecond timestamps.....', end='')
+        with PcapWriter(self.path, nanoseconds=True) as capture:
+            capture.write(sample_frame(1), timestamp=1500000000.123456789)
+            capture.write(sample_frame(2), timestamp=1500000000.9999999999)  # rounded to the next second
+        with PcapReader(self.path) as capture:
+            timestamps = [timestamp for timestamp, _ in capture.decoded()]
+        self.assertAlmostEqual(timestamps[0], 1500000000.123456789, places=6)
+        self.assertEqual(timestamps[1], 1500000001.0)
+        print('Success')
+
+    def test_pcapng(self):
+        print()
+        print('Test pcapng import.....', end='')
+        other = ethernet(udp_ipv4(b'not knx', 53000, 53))
+        fragment = ethernet(udp_ipv4(sample_frame(9), 50000, 3671, flags_fragment=0x2000))
+        tcp = ethernet(udp_ipv4(sample_frame(9), 50000, 3671)[:9] + b'\x06' + udp_ipv4(sample_frame(9), 50000, 3671)[10:])
+        data = pcapng_section('<', [(1000000, ethernet(udp_ipv4(sample_frame(1), 50000, 3671))),
+                                    (2000000, other),
+                                    (3000000, fragment),
+                                    (4000000, tcp),
+                                    (5000000, ethernet(udp_ipv4(sample_frame(2), 3671, 3671, '224.0.23.12'), vlan=True))])
+        # second section, big endian, nanosecond timestamps, routing on a non-standard port
+        data += pcapng_section('>', [(6 * 10 ** 9, ethernet(udp_ipv4(sample_frame(3), 40000, 40000, '224.0.23.12'))),
+                                     (7 * 10 ** 9, ethernet(udp_ipv4(b'\x06\x10\xff\xff\x00\x06', 50000, 3671)))],
+                               tsresol=9)
+        source = ReadCountingFile(data)
+        capture = PcapReader(source)
+        decoded = list(capture.decoded())
+        self.assertEqual([timestamp for timestamp, _ in decoded], [1.0, 5.0, 6.0])
+        self.assertEqual([frame.frame for _, frame in decoded], [sample_frame(1), sample_frame(2), sample_frame(3)])
+        self.assertEqual(capture.packets, 7)
+        self.assertEqual(capture.skipped, 1)  # the fragment
+        self.assertEqual(capture.decode_errors, 1)  # unknown service type
+        self.assertLess(source.max_read, 200)  # one block at a time
+        print('Success')
+
+    def test_decode_errors(self):
+        print()
+        print('Test pcap import of invalid datagrams.....', end='')
+        oversized_additional_info = bytearray(sample_frame(3))
+        oversized_additional_info[11] = 0x20
+        with PcapWriter(self.path) as capture:
+            capture.write(sample_frame(1), timestamp=1.0)
+            capture.write(bytes(sample_frame(2))[:-1], timestamp=2.0)  # truncated by the snap length
+            capture.write(bytes(oversized_additional_info), timestamp=3.0)
+            capture.write(b'\x06\x10', timestamp=4.0)
+            capture.write(sample_frame(5), timestamp=5.0)
+        for lazy in (False, True):
+            with PcapReader(self.path) as capture:
+                decoded = list(capture.decoded(lazy=lazy))
+            self.assertEqual([timestamp for timestamp, _ in decoded], [1.0, 5.0])
+            self.assertEqual([str(frame.dest_addr_group) for _, frame in decoded], ['1/4/1', '1/4/5'])
+            self.assertEqual(capture.decode_errors, 3)
+        self.assertIsInstance(decoded[0][1], TunnellingRequestView)
+        print('Success')
+
+    def test_invalid_file(self):
+        print()
+        print('Test pcap invalid file.....', end='')
+        self.assertEqual(list(PcapReader(io.BytesIO(b''))), [])
+        with self.assertRaises(KnxnetException):
+            list(PcapReader(io.BytesIO(b'not a capture file')))
+        with PcapWriter(self.path) as capture:
+            capture.write(sample_frame(1))
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        with self.assertRaises(KnxnetException):
+            list(PcapReader(io.BytesIO(data[:-3])))  # truncated packet
+        print('Success')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from knxnet.knxnet import *
+from knxnet.gateway import *
+from knxnet.pool import *
+from knxnet.tunnel import KnxnetConnectionException
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class TunnelPoolTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.gateway_1 = await GatewayEmulator.start(tunnel_slots=3, ack_delay=0.005)
+        self.gateway_2 = await GatewayEmulator.start(tunnel_slots=2, ack_delay=0.005)
+        self.pool = await TunnelPool.connect([self.gateway_1.addr, self.gateway_2.addr], tunnels_per_gateway=2,
+                                             reconnect_interval=0.05, ack_timeout=0.05, retries=1)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.gateway_1.close()
+        self.gateway_2.close()
+
+    async def test_routes(self):
+        self.assertEqual(self.pool.connected_tunnels, 4)
+        self.pool.add_route('1/*', self.gateway_1.addr)
+        self.pool.add_route('1/4/*', self.gateway_2.addr)
+        self.pool.add_route('2/*', self.gateway_2.addr)
+        self.assertRaises(KnxnetException, self.pool.add_route, '*', self.gateway_1.addr)
+        self.assertRaises(KnxnetException, self.pool.add_route, '1/*', ('127.0.0.1', 1))
+        await self.pool.write_many([('1/0/{0}'.format(i), i, 2) for i in range(20)] +
+                                   [('1/4/10', 0xab, 2), ('2/0/1', 0xcd, 2), ('3/0/1', 0xef, 2)])
+        self.assertNotIn(GroupAddress(1, 0, 1), self.gateway_2.values)
+        self.assertNotIn(GroupAddress(1, 4, 10), self.gateway_1.values)
+        self.assertEqual(self.gateway_2.values[GroupAddress(2, 0, 1)], (0xcd, 2))
+        # load balanced across the tunnels of gateway 1
+        self.assertTrue(all(slot.sent >= 5 for slot in self.pool.slots if slot.gateway_addr == self.gateway_1.addr))
+        self.assertEqual(await self.pool.read('1/4/10'), 0xab)
+
+    async def test_indications_once_per_gateway(self):
+        received = []
+        self.pool.add_handler(received.append)
+        client = await TunnelClient.connect(self.gateway_1.addr)  # third tunnel of gateway 1
+        await client.write('1/4/10', 0x01, 1)
+        await client.disconnect()
+        await asyncio.sleep(0.02)
+        self.assertEqual([str(frame.dest_addr_group) for frame in received], ['1/4/10'])
+
+    async def test_failover_and_reconnect(self):
+        self.pool.add_route('1/*', self.gateway_1.addr)
+        received = []
+        self.pool.add_handler(received.append)
+        for channel_id in list(self.gateway_1.tunnels)[:1]:
+            del self.gateway_1.tunnels[channel_id]  # the gateway forgot the tunnel, its requests are not acked
+        await self.pool.write_many([('1/0/{0}'.format(i), i, 2) for i in range(10)])
+        self.assertEqual(len(self.gateway_1.values), 10)
+        self.assertGreaterEqual(self.pool.failovers, 1)
+        self.assertEqual(self.pool.connected_tunnels, 3)
+        await asyncio.sleep(0.15)
+        self.assertEqual(self.pool.connected_tunnels, 4)
+        self.assertEqual(self.pool.reconnections, 1)
+        self.assertEqual(len(self.gateway_1.tunnels), 2)
+        await self.pool.write_many([('1/0/{0}'.format(i), i, 2) for i in range(10)])
+        # the indications of gateway 1 still reach the handlers once
+        client = await TunnelClient.connect(self.gateway_1.addr)
+        await client.write('1/4/10', 0x01, 1)
+        await client.disconnect()
+        await asyncio.sleep(0.02)
+        self.assertEqual([str(frame.dest_addr_group) for frame in received].count('1/4/10'), 1)
+
+    async def test_gateway_error_not_repeated(self):
+        sent = []
+
+        async def rejected(dest_addr_group, data, data_size):
+            sent.append(dest_addr_group)
+            raise KnxnetException('Tunnelling ack error status 0x29')
+
+        for slot in self.pool.slots:
+            slot.client.write = rejected
+        with self.assertRaises(KnxnetException) as context:
+            await self.pool.write('1/0/1', 1, 1)
+        self.assertNotIsInstance(context.exception, KnxnetConnectionException)
+        self.assertEqual(len(sent), 1)  # not repeated on another tunnel
+        self.assertEqual(self.pool.failovers, 0)
+        self.assertEqual(self.pool.connected_tunnels, 4)
+
+    async def test_no_tunnel(self):
+        self.pool.add_route('1/*', self.gateway_1.addr)
+        self.gateway_1.tunnels.clear()
+        with self.assertRaises(KnxnetException):
+            await self.pool.write('1/0/1', 1, 1)
+        self.assertEqual(self.pool.connected_tunnels, 2)
+        gateway = await GatewayEmulator.start(tunnel_slots=0)
+        with self.assertRaises(KnxnetException):
+            await TunnelPool.connect([gateway.addr])
+        gateway.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
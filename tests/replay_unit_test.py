@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import tempfile
+import unittest
+from knxnet.knxnet import *
+from knxnet.capture import *
+from knxnet.gateway import *
+from knxnet.replay import *
+from knxnet.tunnel import TunnelClient
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+def recorded_request(i, data_service=0x11):
+    # channel id and sequence counter of another session, the gateway would discard them
+    return TunnellingRequest.create_from_data('1/0/{0}'.format(i), 99, i, 2, 0x2, data_service, (200 + i) & 0xff)
+
+
+class ReplayTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.gateway = await GatewayEmulator.start(tunnel_slots=2, confirm=False)
+        self.client = await TunnelClient.connect(self.gateway.addr, window_size=4, ack_timeout=0.05, retries=2)
+
+    async def asyncTearDown(self):
+        await self.client.disconnect()
+        self.gateway.close()
+
+    async def test_replay_requests(self):
+        telegrams = [(100.0 + i * 0.01, recorded_request(i)) for i in range(20)]
+        telegrams.insert(5, (100.05, recorded_request(50, 0x2e)))  # L_Data.con, skipped
+        telegrams.insert(6, (100.05, create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 99, 0, 7)))
+        report = await Replayer(self.client, speed=2).replay(telegrams)
+        self.assertEqual((report.sent, report.dropped, report.skipped), (20, 0, 2))
+        self.assertEqual(self.gateway.discarded_requests, 0)
+        self.assertEqual(self.gateway.values[GroupAddress(1, 0, 19)], (19, 2))
+        self.assertGreaterEqual(report.elapsed, 0.095)  # 0.19 s recorded, at twice the speed
+        self.assertLess(report.elapsed, 1.0)
+        self.assertEqual(len(report.latencies), 20)
+        self.assertLessEqual(report.latency(50), report.latency(100))
+        self.assertGreater(report.throughput, 0)
+        self.assertIn('ack latency p99 (ms)', str(report))
+
+    async def test_max_speed(self):
+        report = await Replayer(self.client, speed=MAX_SPEED).replay(
+            (3600.0 * i, recorded_request(i).frame) for i in range(50))  # one telegram per hour
+        self.assertEqual(report.sent, 50)
+        self.assertLess(report.elapsed, 1.0)
+        self.assertEqual(len(self.gateway.values), 50)
+        self.assertRaises(KnxnetException, Replayer, self.client, 0)
+
+    async def test_replay_capture(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'site.knxcap')
+            with CaptureWriter(path) as capture:
+                for i in range(10):
+                    capture.write(recorded_request(i).frame, SENT, 99, 100.0 + i * 0.001)
+                    capture.write(create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, 99, 0, i).frame, RECEIVED, 99,
+                                  100.0 + i * 0.001)
+            with CaptureReader(path) as capture:
+                report = await Replayer(self.client, speed=1).replay(capture.records())
+        self.assertEqual((report.sent, report.skipped), (10, 10))
+        self.assertEqual(self.gateway.values[GroupAddress(1, 0, 9)], (9, 2))
+
+    async def test_drops(self):
+        self.gateway.tunnels.clear()  # the gateway forgot the tunnel, its requests are not acked
+        report = await Replayer(self.client, speed=MAX_SPEED).replay([recorded_request(i) for i in range(3)])
+        self.assertEqual((report.sent, report.dropped), (0, 3))
+        self.assertEqual(report.latency(99), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
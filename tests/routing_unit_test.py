@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from knxnet.knxnet import *
+from knxnet.dispatch import Dispatcher
+from knxnet.routing import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class RoutingFramesTestCase(unittest.TestCase):
+
+    def test_routing_indication(self):
+        print()
+        print('Test routing indication frame.....', end='')
+        frame = bytes([0x06, 0x10, 0x05, 0x30, 0x00, 0x12,  # header
+                       0x29, 0x00, 0xbc, 0xe0, 0x11, 0x05, 0x0c, 0x0a,  # cEMI
+                       0x02, 0x00, 0x80, 0xab])
+        indication = RoutingIndication.create_from_data('1/4/10', 0xab, 2, source_addr='1.1.5')
+        self.assertEqual(indication.frame, frame)
+        decoded = decode_frame(frame)
+        self.assertIsInstance(decoded, RoutingIndication)
+        self.assertEqual((str(decoded.dest_addr_group), str(decoded.source_addr)), ('1/4/10', '1.1.5'))
+        self.assertEqual((decoded.data, decoded.data_size, decoded.apci, decoded.data_service), (0xab, 2, 0x2, 0x29))
+        indication = RoutingIndication.create_from_value('1/4/11', 21.5, '9', additional_info=bytes([0x03, 0x00]),
+                                                         priority=RoutingIndication.PRIORITY_URGENT)
+        decoded = decode_frame(indication.frame)
+        self.assertEqual(decoded.value('9'), 21.5)
+        self.assertEqual(decoded.priority, RoutingIndication.PRIORITY_URGENT)
+        self.assertEqual(decoded.frame, indication.frame)
+        self.assertRaises(KnxnetException, decode_frame, frame[:-1])
+        print('Success')
+
+    def test_routing_flow_control_frames(self):
+        print()
+        print('Test routing busy and lost message frames.....', end='')
+        frame = bytes([0x06, 0x10, 0x05, 0x32, 0x00, 0x0c, 0x06, 0x01, 0x00, 0x64, 0x00, 0x00])
+        self.assertEqual(RoutingBusy.create_from_data(100, 0x01).frame, frame)
+        busy = decode_frame(frame)
+        self.assertEqual((busy.device_state, busy.wait_time, busy.control_field), (0x01, 100, 0x0000))
+        frame = bytes([0x06, 0x10, 0x05, 0x31, 0x00, 0x0a, 0x04, 0x00, 0x01, 0x02])
+        self.assertEqual(RoutingLostMessage.create_from_data(0x0102).frame, frame)
+        self.assertEqual(decode_frame(frame).lost_messages, 0x0102)
+        print('Success')
+
+
+class RoutingEndpointTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.endpoint_1 = await RoutingEndpoint.open(port=0, interface='127.0.0.1', max_rate=None, seed=1)
+        self.endpoint_2 = await RoutingEndpoint.open(port=self.endpoint_1.port, interface='127.0.0.1',
+                                                     max_rate=None, seed=2)
+
+    async def asyncTearDown(self):
+        self.endpoint_1.close()
+        self.endpoint_2.close()
+
+    async def test_send_receive(self):
+        received_1, received_2 = [], []
+        self.endpoint_1.add_handler(received_1.append)
+        self.endpoint_2.add_handler(received_2.append)
+        dispatched = []
+        self.endpoint_2.dispatcher = Dispatcher()
+        self.endpoint_2.dispatcher.subscribe('1/4/*', dispatched.append)
+        for i in range(20):
+            await self.endpoint_1.send('1/4/{0}'.format(i), i, 2)
+        await self.endpoint_2.send('2/0/0', 1, 1)
+        await asyncio.sleep(0.05)
+        self.assertEqual([(str(i.dest_addr_group), i.data) for i in received_2],
+                         [('1/4/{0}'.format(i), i) for i in range(20)])
+        self.assertEqual(len(dispatched), 20)
+        self.assertEqual([str(i.dest_addr_group) for i in received_1], ['2/0/0'])  # own frames are ignored
+        self.assertEqual((self.endpoint_1.sent_indications, self.endpoint_2.received_indications), (20, 20))
+
+    async def test_invalid_indication(self):
+        received = []
+        dispatched = []
+
+        def failing(indication):
+            raise ValueError('handler bug')
+
+        self.endpoint_2.add_handler(failing)
+        self.endpoint_2.add_handler(received.append)
+        self.endpoint_2.dispatcher = Dispatcher()
+        self.endpoint_2.dispatcher.subscribe('1/4/*', dispatched.append)
+        frame = bytearray(RoutingIndication.create_from_data('1/4/10', 0xab, 2).frame)
+        frame[14] = 3  # data size, does not match the frame length
+        with self.assertLogs('knxnet.routing', 'DEBUG') as logs:
+            self.endpoint_2.datagram_received(bytes(frame), ('127.0.0.2', 3671))
+            await self.endpoint_1.send('1/4/10', 0xab, 2)
+            await asyncio.sleep(0.05)
+        self.assertEqual([indication.data for indication in received], [0xab])  # after the failing handler
+        self.assertEqual(len(dispatched), 1)
+        self.assertEqual(self.endpoint_2.received_indications, 2)
+        self.assertTrue(any('Invalid frame' in line for line in logs.output))
+        self.assertTrue(any('handler failed' in line for line in logs.output))
+
+    async def test_pacing(self):
+        self.endpoint_1.max_rate = 100
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*[self.endpoint_1.send('1/4/10', i, 2) for i in range(6)])
+        self.assertGreaterEqual(loop.time() - start, 0.045)
+
+    async def test_routing_busy(self):
+        loop = asyncio.get_running_loop()
+        self.endpoint_2.send_busy(50)
+        await asyncio.sleep(0.01)
+        self.assertEqual(self.endpoint_1.received_busy, 1)
+        self.assertEqual(self.endpoint_2.received_busy, 0)  # own frame
+        self.assertTrue(self.endpoint_1.paused)
+        start = loop.time()
+        await self.endpoint_1.send('1/4/10', 1, 1)
+        self.assertGreaterEqual(loop.time() - start, 0.035)
+        self.assertFalse(self.endpoint_1.paused)
+        # busy frames in a row increase N, and the random part of the pause with it
+        for i in range(3):
+            self.endpoint_2.send_busy(10)
+            await asyncio.sleep(0.015)
+        self.assertEqual(self.endpoint_1._busy_count, 4)
+
+    async def test_lost_message(self):
+        self.endpoint_2.send_lost_message(3)
+        self.endpoint_2.send_lost_message(2)
+        await asyncio.sleep(0.02)
+        self.assertEqual(self.endpoint_1.lost_messages, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from knxnet.knxnet import *
+from knxnet.gateway import *
+from knxnet.tunnel import TunnelClient
+from knxnet.scheduler import *
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class SenderStandIn():
+    """
+    Records the telegrams, as a TunnelClient would send them
+    """
+
+    def __init__(self, fail=False, clock=None):
+        self.fail = fail
+        self.clock = clock
+        self.sent = []  # (clock time, group address string, data, apci)
+
+    async def send(self, dest_addr_group, data, data_size, apci):
+        if self.fail:
+            raise KnxnetException('No tunnelling ack')
+        now = asyncio.get_running_loop().time() if self.clock is None else self.clock()
+        self.sent.append((now, str(dest_addr_group), data, apci))
+        return 0.001
+
+
+class VirtualClock():
+    """
+    Clock and sleep of a SendScheduler, the time only moves with advance()
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleepers = []  # (wake up time, future)
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        future = asyncio.get_running_loop().create_future()
+        self.sleepers.append((self.now + delay, future))
+        await future
+
+    async def advance(self, seconds):
+        self.now += seconds
+        for wakeup, future in list(self.sleepers):
+            if wakeup <= self.now + 1e-09:
+                self.sleepers.remove((wakeup, future))
+                if not future.done():
+                    future.set_result(None)
+        for _ in range(10):  # let the woken lines dispatch and the senders run
+            await asyncio.sleep(0)
+
+
+class SendSchedulerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sender = SenderStandIn()
+
+    async def test_pacing(self):
+        clock = VirtualClock()
+        sender = SenderStandIn(clock=clock)
+        async with SendScheduler(sender, rate=20, burst=2, clock=clock, sleep=clock.sleep) as scheduler:
+            writes = asyncio.gather(*[scheduler.write('1/4/{0}'.format(i), i, 2) for i in range(6)])
+            await clock.advance(0)
+            self.assertEqual(len(sender.sent), 2)  # burst
+            self.assertEqual(scheduler.queue_depth, 4)
+            for _ in range(4):
+                await clock.advance(0.05)
+            await writes
+            # an idle second refills the bucket up to the burst, not beyond
+            await clock.advance(1.0)
+            writes = asyncio.gather(*[scheduler.write('1/5/{0}'.format(i), i, 2) for i in range(3)])
+            await clock.advance(0)
+            self.assertEqual(len(sender.sent), 8)
+            await clock.advance(0.05)
+            await writes
+        times = [sent[0] for sent in sender.sent]
+        expected = [0.0, 0.0, 0.05, 0.1, 0.15, 0.2, 1.2, 1.2, 1.25]
+        self.assertEqual(len(times), len(expected))
+        for time, expected_time in zip(times, expected):
+            self.assertAlmostEqual(time, expected_time)
+        self.assertEqual(scheduler.sent, 9)
+        self.assertAlmostEqual(scheduler.wait_time_max, 0.2)
+        self.assertAlmostEqual(scheduler.wait_time_avg, (0.05 + 0.1 + 0.15 + 0.2 + 0.05) / 9)
+
+    async def test_join(self):
+        clock = VirtualClock()
+        async with SendScheduler(self.sender, rate=20, burst=1, clock=clock, sleep=clock.sleep) as scheduler:
+            await scheduler.join()  # nothing queued
+            writes = [asyncio.ensure_future(scheduler.write('1/4/{0}'.format(i), i, 2)) for i in range(3)]
+            join = asyncio.ensure_future(scheduler.join())
+            await clock.advance(0)
+            await clock.advance(0.05)
+            self.assertFalse(join.done())
+            self.assertEqual(scheduler.sent, 2)
+            await clock.advance(0.05)
+            await asyncio.wait_for(join, 1)
+            self.assertEqual((scheduler.queue_depth, scheduler.sent), (0, 3))
+            await asyncio.gather(*writes)
+            # close() releases the callers of join()
+            pending = asyncio.ensure_future(scheduler.write('1/4/3', 3, 2))
+            join = asyncio.ensure_future(scheduler.join())
+            await asyncio.sleep(0)
+            await scheduler.close()
+            await asyncio.wait_for(join, 1)
+            with self.assertRaises(KnxnetException):
+                await pending
+
+    async def test_priorities(self):
+        async with SendScheduler(self.sender, rate=100, burst=1) as scheduler:
+            tasks = [asyncio.ensure_future(scheduler.write('1/4/{0}'.format(i), i, 2)) for i in range(3)]
+            tasks.append(asyncio.ensure_future(scheduler.write('1/4/3', 3, 2, PRIORITY_ALARM)))
+            tasks.append(asyncio.ensure_future(scheduler.read('1/4/4', PRIORITY_SYSTEM)))
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queue_depth, 5)
+            self.assertEqual(scheduler.depth(priority=PRIORITY_LOW), 3)
+            await asyncio.gather(*tasks)
+        self.assertEqual([sent[1] for sent in self.sender.sent], ['1/4/4', '1/4/3', '1/4/0', '1/4/1', '1/4/2'])
+        self.assertEqual(self.sender.sent[0][3], 0x0)
+
+    async def test_coalescing(self):
+        async with SendScheduler(self.sender, rate=100, burst=1) as scheduler:
+            first = asyncio.ensure_future(scheduler.write('1/4/0', 0, 2))
+            results = asyncio.gather(*[scheduler.write('1/4/10', i, 2) for i in range(3)])
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queue_depth, 2)
+            await asyncio.gather(first, results)
+            self.assertEqual(results.result(), [0.001] * 3)
+            # a more urgent write takes the place of the waiting one
+            writes = [asyncio.ensure_future(scheduler.write('1/4/0', 0, 2)),
+                      asyncio.ensure_future(scheduler.write('1/4/10', 3, 2)),
+                      asyncio.ensure_future(scheduler.write('1/4/11', 4, 2)),
+                      asyncio.ensure_future(scheduler.write('1/4/11', 5, 2, PRIORITY_HIGH))]
+            await asyncio.gather(*writes)
+        self.assertEqual([(sent[1], sent[2]) for sent in self.sender.sent],
+                         [('1/4/0', 0), ('1/4/10', 2), ('1/4/11', 5), ('1/4/0', 0), ('1/4/10', 3)])
+        self.assertEqual(scheduler.coalesced, 3)
+        self.assertEqual(scheduler.queue_depth, 0)
+
+    async def test_line_added_while_queued(self):
+        clock = VirtualClock()
+        async with SendScheduler(self.sender, rate=1, burst=0, clock=clock, sleep=clock.sleep) as scheduler:
+            low = asyncio.ensure_future(scheduler.write('1/4/10', 1, 2))
+            await clock.advance(0)
+            scheduler.add_line('1/*', 'L1', None)
+            alarm = asyncio.ensure_future(scheduler.write('1/4/10', 2, 2, PRIORITY_ALARM))
+            await clock.advance(0)
+            self.assertEqual((scheduler.depth(None), scheduler.depth('L1')), (0, 0))
+            self.assertEqual(await asyncio.wait_for(asyncio.gather(low, alarm), 1), [0.001, 0.001])
+            await asyncio.wait_for(scheduler.join(), 1)
+        self.assertEqual([(sent[1], sent[2]) for sent in self.sender.sent], [('1/4/10', 2)])
+        self.assertEqual(scheduler.coalesced, 1)
+
+    async def test_lines(self):
+        async with SendScheduler(self.sender, rate=5, burst=1) as scheduler:
+            scheduler.add_line('2/*', 'line 2', None)
+            self.assertEqual((scheduler.line(GroupAddress(2, 1, 1)), scheduler.line(GroupAddress(1, 1, 1))),
+                             ('line 2', None))
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            slow = asyncio.gather(*[scheduler.write('1/0/{0}'.format(i), i, 2) for i in range(3)])
+            await asyncio.gather(*[scheduler.write('2/0/{0}'.format(i), i, 2) for i in range(20)])
+            self.assertLess(loop.time() - start, 0.15)  # not paced, not held by the paced line
+            self.assertEqual(scheduler.depth(None), 2)
+            await slow
+            await scheduler.join()
+        self.assertRaises(KnxnetException, scheduler.add_line, '*', 'all', 10)
+
+    async def test_failures(self):
+        scheduler = SendScheduler(SenderStandIn(fail=True), rate=10, burst=1)
+        with self.assertRaises(KnxnetException):
+            await scheduler.write('1/4/10', 1, 1)
+        self.assertEqual(scheduler.failed, 1)
+        pending = asyncio.ensure_future(scheduler.write('1/4/11', 1, 1))
+        await asyncio.sleep(0)
+        await scheduler.close()
+        with self.assertRaises(KnxnetException):
+            await pending
+        with self.assertRaises(KnxnetException):
+            await scheduler.write('1/4/11', 1, 1)
+
+    async def test_tunnel_client(self):
+        gateway = await GatewayEmulator.start()
+        try:
+            async with await TunnelClient.connect(gateway.addr) as client:
+                async with SendScheduler(client, rate=200) as scheduler:
+                    await asyncio.gather(*[scheduler.write('1/4/10', i, 2) for i in range(10)])
+            self.assertEqual(gateway.values[GroupAddress(1, 4, 10)], (9, 2))
+            self.assertEqual(gateway.received_requests, 1)
+        finally:
+            gateway.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
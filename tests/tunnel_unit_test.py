@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from knxnet.knxnet import *
+from knxnet.tunnel import *
+from knxnet.image import ProcessImage
+
+__author__ = "Adrien Lescourt"
+__copyright__ = "HES-SO 2015, Project EMG4B"
+__credits__ = ["Adrien Lescourt"]
+__version__ = "1.0.2"
+__email__ = "adrien.lescourt@gmail.com"
+__status__ = "Prototype"
+
+
+class GatewayStandIn(asyncio.DatagramProtocol):
+    """
+    Minimal local gateway: one tunnel, acks every request and answers reads with the last written value
+    """
+
+    def __init__(self, channel_id=0x15, drop_first_requests=0, ack_delay=0):
+        self.channel_id = channel_id
+        self.drop_first_requests = drop_first_requests
+        self.ack_delay = ack_delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.transport = None
+        self.received = []
+        self.values = {}
+        self.client_addr = None
+        self.sequence_counter = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def send_indication(self, dest_addr_group, data, data_size, apci=0x2):
+        frame = create_frame(ServiceTypeDescriptor.TUNNELLING_REQUEST, dest_addr_group, self.channel_id,
+                             data, data_size, apci, 0x29, self.sequence_counter)
+        self.sequence_counter = (self.sequence_counter + 1) & 0xff
+        self.transport.sendto(frame.frame, self.client_addr)
+
+    def send_ack(self, frame, addr):
+        self.in_flight -= 1
+        self.transport.sendto(frame, addr)
+
+    def datagram_received(self, data, addr):
+        self.client_addr = addr
+        frame = decode_frame(data)
+        self.received.append(frame)
+        service_type_descriptor = frame.header.service_type_descriptor
+        if service_type_descriptor is ServiceTypeDescriptor.CONNECTION_REQUEST:
+            response = create_frame(ServiceTypeDescriptor.CONNECTION_RESPONSE, self.channel_id, 0, ('0.0.0.0', 0))
+        elif service_type_descriptor is ServiceTypeDescriptor.CONNECTION_STATE_REQUEST:
+            response = create_frame(ServiceTypeDescriptor.CONNECTION_STATE_RESPONSE, frame.channel_id, 0)
+        elif service_type_descriptor is ServiceTypeDescriptor.DISCONNECT_REQUEST:
+            response = create_frame(ServiceTypeDescriptor.DISCONNECT_RESPONSE, frame.channel_id, 0)
+        elif service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST:
+            if self.drop_first_requests:
+                self.drop_first_requests -= 1
+                return
+            response = create_frame(ServiceTypeDescriptor.TUNNELLING_ACK, frame.channel_id, 0,
+                                    frame.sequence_counter)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            asyncio.get_running_loop().call_later(self.ack_delay, self.send_ack, response.frame, addr)
+            if frame.apci == APCI_GROUP_VALUE_WRITE:
+                self.values[frame.dest_addr_group] = (frame.data, frame.data_size)
+            elif frame.apci == APCI_GROUP_VALUE_READ:
+                data, data_size = self.values.get(frame.dest_addr_group, (0, 1))
+                self.send_indication(frame.dest_addr_group, data, data_size, APCI_GROUP_VALUE_RESPONSE)
+            return
+        else:
+            return
+        self.transport.sendto(response.frame, addr)
+
+
+class TunnelClientTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        loop = asyncio.get_running_loop()
+        self.gateway = GatewayStandIn()
+        self.gateway_transport, _ = await loop.create_datagram_endpoint(lambda: self.gateway,
+                                                                        local_addr=('127.0.0.1', 0))
+        self.gateway_addr = self.gateway_transport.get_extra_info('sockname')
+
+    async def asyncTearDown(self):
+        self.gateway_transport.close()
+
+    async def test_connect_write_read_disconnect(self):
+        client = await TunnelClient.connect(self.gateway_addr)
+        self.assertTrue(client.connected)
+        self.assertEqual(client.channel_id, 0x15)
+        await client.write('1/4/10', 0xab, 2)
+        await client.write(GroupAddress(1, 4, 11), 1, 1)
+        self.assertEqual(client.sequence_counter, 2)
+        self.assertEqual(await client.read('1/4/10'), 0xab)
+        self.assertEqual(await client.read('1/4/11'), 1)
+        await client.disconnect()
+        self.assertFalse(client.connected)
+        services = [frame.header.service_type_descriptor for frame in self.gateway.received]
+        self.assertEqual(services[0], ServiceTypeDescriptor.CONNECTION_REQUEST)
+        self.assertEqual(services[-1], ServiceTypeDescriptor.DISCONNECT_REQUEST)
+        # every indication sent by the gateway is acked with its sequence counter
+        acks = [frame for frame in self.gateway.received
+                if frame.header.service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_ACK]
+        self.assertEqual([ack.sequence_counter for ack in acks], [0, 1])
+
+    async def test_indication_dispatch(self):
+        received = []
+        async with await TunnelClient.connect(self.gateway_addr) as client:
+            client.add_handler(received.append)
+            await client.write('1/4/10', 0x01, 1)  # lets the gateway learn the client address
+            self.gateway.send_indication('2/0/1', 0x42, 2)
+            self.gateway.sequence_counter = 0  # repeated indication, must be acked but not dispatched again
+            self.gateway.send_indication('2/0/1', 0x42, 2)
+            await asyncio.sleep(0.05)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(str(received[0].dest_addr_group), '2/0/1')
+        self.assertEqual(received[0].data, 0x42)
+
+    async def test_process_image(self):
+        image = ProcessImage(max_age=60)
+        async with await TunnelClient.connect(self.gateway_addr, process_image=image) as client:
+            await client.write('1/4/10', 0xab, 2)
+            self.gateway.send_indication('2/0/1', 0x42, 2)
+            await asyncio.sleep(0.05)
+            self.assertEqual(await client.read('1/4/10'), 0xab)  # served from the image
+            self.assertEqual(await client.read('2/0/1'), 0x42)
+            reads = [frame for frame in self.gateway.received if frame.header.service_type_descriptor is
+                     ServiceTypeDescriptor.TUNNELLING_REQUEST and frame.apci == APCI_GROUP_VALUE_READ]
+            self.assertEqual(reads, [])
+            self.gateway.values[GroupAddress(1, 4, 10)] = (0xcd, 2)
+            self.assertEqual(await client.read('1/4/10', max_age=0), 0xcd)  # stale: read on the bus
+        self.assertEqual(image.get('1/4/10'), (0xcd, 2))  # updated by the response
+        self.assertEqual((image.hits, image.misses), (2, 1))
+
+    async def test_data_wider_than_data_size(self):
+        image = ProcessImage(max_age=60)
+        async with await TunnelClient.connect(self.gateway_addr, process_image=image) as client:
+            with self.assertRaises(KnxnetException):
+                await client.send('1/4/10', 0x1ff, 2, APCI_GROUP_VALUE_WRITE)
+            self.assertEqual(client.sequence_counter, 0)
+            await client.send('1/4/10', 0xff, 2, APCI_GROUP_VALUE_WRITE)
+        requests = [frame for frame in self.gateway.received
+                    if frame.header.service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST]
+        self.assertEqual([(request.sequence_counter, request.data) for request in requests], [(0, 0xff)])
+        self.assertEqual(image.get('1/4/10'), (0xff, 2))
+
+    async def test_repeat_unacked_request(self):
+        self.gateway.drop_first_requests = 1
+        async with await TunnelClient.connect(self.gateway_addr, ack_timeout=0.05) as client:
+            await client.write('1/4/10', 0x01, 1)
+            requests = [frame for frame in self.gateway.received
+                        if frame.header.service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST]
+            self.assertEqual([request.sequence_counter for request in requests], [0, 0])
+            self.gateway.drop_first_requests = 2
+            with self.assertRaises(KnxnetException):
+                await client.write('1/4/10', 0x01, 1)
+
+    async def test_sliding_window(self):
+        self.gateway.ack_delay = 0.01
+        async with await TunnelClient.connect(self.gateway_addr, window_size=8) as client:
+            telegrams = [('1/4/{0}'.format(i % 256), i & 0xff, 2) for i in range(300)]
+            round_trip_times = await client.write_many(telegrams)
+            self.assertEqual(client.sequence_counter, 300 & 0xff)
+        self.assertEqual(len(round_trip_times), 300)
+        self.assertTrue(all(rtt >= 0.005 for rtt in round_trip_times))
+        self.assertEqual(self.gateway.max_in_flight, 8)
+        requests = [frame for frame in self.gateway.received
+                    if frame.header.service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST]
+        self.assertEqual([request.sequence_counter for request in requests], [i & 0xff for i in range(300)])
+        self.assertRaises(KnxnetException, TunnelClient, self.gateway_addr, window_size=129)
+
+    async def test_sliding_window_retransmit(self):
+        self.gateway.drop_first_requests = 2
+        async with await TunnelClient.connect(self.gateway_addr, window_size=4, ack_timeout=0.05) as client:
+            await client.write_many([('1/4/10', i, 2) for i in range(6)])
+        requests = [frame for frame in self.gateway.received
+                    if frame.header.service_type_descriptor is ServiceTypeDescriptor.TUNNELLING_REQUEST]
+        self.assertEqual(sorted(request.sequence_counter for request in requests), [0, 0, 1, 1, 2, 3, 4, 5])
+
+    async def test_heartbeat(self):
+        async with await TunnelClient.connect(self.gateway_addr, heartbeat_interval=0.02) as client:
+            await asyncio.sleep(0.1)
+            self.assertTrue(client.connected)
+        states = [frame for frame in self.gateway.received
+                  if frame.header.service_type_descriptor is ServiceTypeDescriptor.CONNECTION_STATE_REQUEST]
+        self.assertGreater(len(states), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()